@@ -104,8 +104,9 @@ namespace Gordon360.Static.Names
          * All other event types are not appropiate for the 360 events feed.
          * end_after parameter  limits to request to events from the current academic year.
          * state parameter fetches only confirmed events
+         * The 25LiveEventsURL app setting replaces the 25Live address, e.g. with a stand-in serving generated feeds for benchmarks.
          */
-        public static string ALL_EVENTS_REQUEST = "https://25live.collegenet.com/25live/data/gordon/run/events.xml?/&event_type_id=14+57&state=2&end_after=" + Helpers.GetFirstEventDate() + "&scope=extended";
+        public static string ALL_EVENTS_REQUEST = (System.Web.Configuration.WebConfigurationManager.AppSettings["25LiveEventsURL"] ?? "https://25live.collegenet.com/25live/data/gordon/run/events.xml") + "?/&event_type_id=14+57&state=2&end_after=" + Helpers.GetFirstEventDate() + "&scope=extended";
     }
 
     public static class SQLQuery
@@ -0,0 +1,230 @@
+"""Record and replay the api traffic of a test run.
+
+A cassette is a sqlite file of request/response pairs.  In record mode every
+request made through the pytest_components sessions goes to the server as
+usual and the pair is stored; in replay mode responses come from the
+cassette and the server is never contacted, so assertions can be iterated on
+in seconds.
+
+Interactions are looked up by a sha1 of the method, the url path and sorted
+query, the Authorization header and the normalized request body (json keys
+sorted, form fields sorted, passwords and multipart boundaries dropped), plus
+an ordinal counting earlier requests with the same key in the run.  The
+ordinal lets a GET before and after a POST replay different bodies.  The
+host is not part of the key, so a cassette recorded against one host
+replays for any hostURL.  The (key, ordinal) primary key keeps lookups to a
+single index probe however many interactions the cassette holds.
+
+Enable it with pytest --cassette PATH [--cassette-mode record|replay], or the
+GORDON360_CASSETTE and GORDON360_CASSETTE_MODE environment variables.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+# Form fields left out of the key, so passwords never reach the cassette.
+SECRET_FIELDS = {'password'}
+# Bodies smaller than this are stored uncompressed.
+COMPRESS_THRESHOLD = 256
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS interactions (
+    key TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    elapsed REAL NOT NULL,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (key, ordinal)
+) WITHOUT ROWID
+'''
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised in replay mode for a request the cassette has no answer for."""
+
+
+def normalizeBody(body, contentType):
+    """Return the request body in a canonical form for the lookup key."""
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    elif not isinstance(body, bytes):
+        # A streamed upload; it cannot be read without consuming it.
+        return b'<stream>'
+    contentType = (contentType or '').lower()
+    if contentType.startswith('application/json'):
+        try:
+            return json.dumps(json.loads(body), sort_keys=True,
+                separators=(',', ':')).encode('utf-8')
+        except ValueError:
+            return body
+    if contentType.startswith('application/x-www-form-urlencoded'):
+        fields = [(name, value) for name, value in \
+            parse_qsl(body.decode('utf-8'), keep_blank_values=True) \
+            if name not in SECRET_FIELDS]
+        return urlencode(sorted(fields)).encode('utf-8')
+    if contentType.startswith('multipart/form-data'):
+        boundary = contentType.partition('boundary=')[2].strip('"')
+        if boundary:
+            return body.replace(boundary.encode('ascii'), b'')
+    return body
+
+def interactionKey(method, url, body=None, contentType=None,
+        authorization=None):
+    """Return the lookup key of a request, without its ordinal.
+
+    Args:
+        method (str): HTTP verb.
+        url (str): full url of the request.
+        body (bytes or str): request body.
+        contentType (str): Content-Type header of the request.
+        authorization (str): Authorization header of the request.
+
+    Returns:
+        str: hex sha1 digest.
+    """
+    parts = urlsplit(url)
+    path = '/' + '/'.join(segment for segment in parts.path.split('/') \
+        if segment)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    digest = hashlib.sha1()
+    for field in (method.upper(), path, query, authorization or ''):
+        digest.update(field.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(normalizeBody(body, contentType))
+    return digest.hexdigest()
+
+
+class Cassette:
+    """A sqlite store of recorded interactions."""
+
+    def __init__(self, path, mode=REPLAY):
+        """
+        Args:
+            path (str): cassette file; created when recording.
+            mode (str): RECORD or REPLAY.
+        """
+        if mode not in MODES:
+            raise ValueError('cassette mode must be one of ' + ', '.join(MODES))
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._ordinals = {}
+        if mode == REPLAY:
+            # Fail at startup rather than on the first request.
+            self._db = sqlite3.connect('file:{0}?mode=ro'.format(path),
+                uri=True, check_same_thread=False)
+        else:
+            self._db = sqlite3.connect(path, timeout=30,
+                check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(_SCHEMA)
+            self._db.commit()
+
+    def nextOrdinal(self, key):
+        """Return how many earlier requests in this run had the same key."""
+        with self._lock:
+            ordinal = self._ordinals.get(key, 0)
+            self._ordinals[key] = ordinal + 1
+            return ordinal
+
+    def store(self, key, ordinal, method, url, response, elapsed):
+        body = response.content or b''
+        compressed = len(body) >= COMPRESS_THRESHOLD
+        if compressed:
+            body = zlib.compress(body)
+        row = (key, ordinal, method, url, response.status_code,
+            response.reason, json.dumps(dict(response.headers)), body,
+            int(compressed), elapsed, time.time())
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO interactions VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+            self._db.commit()
+
+    def find(self, key, ordinal):
+        """Return the stored row for (key, ordinal), falling back to the last
+        one recorded for the key when the run repeats a request more often
+        than the recording did.  None if the key was never recorded."""
+        with self._lock:
+            row = self._db.execute('SELECT status, reason, headers, body, '
+                'compressed, elapsed FROM interactions WHERE key = ? AND '
+                'ordinal <= ? ORDER BY ordinal DESC LIMIT 1',
+                (key, ordinal)).fetchone()
+        return row
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM interactions').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter that records to or replays from a Cassette."""
+
+    def __init__(self, cassette, **kwargs):
+        HTTPAdapter.__init__(self, **kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        key = interactionKey(request.method, request.url, request.body,
+            request.headers.get('Content-Type'),
+            request.headers.get('Authorization'))
+        ordinal = self.cassette.nextOrdinal(key)
+        if self.cassette.mode == REPLAY:
+            row = self.cassette.find(key, ordinal)
+            if row is None:
+                raise CassetteMissError('{0} {1} is not in cassette {2}'\
+                    .format(request.method, request.url, self.cassette.path),
+                    request=request)
+            return self._replay(request, row)
+        start = time.perf_counter()
+        response = HTTPAdapter.send(self, request, **kwargs)
+        # Reading the body here is what requests would do next anyway.
+        response.content
+        self.cassette.store(key, ordinal, request.method, request.url,
+            response, time.perf_counter() - start)
+        return response
+
+    def _replay(self, request, row):
+        status, reason, headers, body, compressed, elapsed = row
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        # The body is stored decoded; the headers must not claim otherwise.
+        response.headers.pop('Content-Encoding', None)
+        response._content = zlib.decompress(body) if compressed else body
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(seconds=elapsed)
+        return response
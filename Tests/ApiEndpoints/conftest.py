@@ -0,0 +1,370 @@
+import fnmatch
+import datetime
+import inspect
+import json
+import sys
+
+import pytest
+
+import cassette as cassettes
+import latency_baseline
+import pytest_components as api
+import response_schemas as schemas
+import test_gordon360_pytest as control
+
+
+# # # # # # # # #
+# Command Line  #
+# # # # # # # # #
+
+def pytest_addoption(parser):
+    group = parser.getgroup('gordon360')
+    group.addoption('--pool-size', type=int, default=None,
+        help='Connections kept alive per host by pooled sessions '
+             '(default: GORDON360_POOL_SIZE or {0}).'.format(api.POOL_SIZE))
+    group.addoption('--resource-map', default=None, metavar='PATH',
+        help='Write the shared server resources of every collected test to '
+             'PATH as json.')
+    group.addoption('--shard', default=None, metavar='PATH',
+        help='Run only the test ids listed in the json file PATH, in that '
+             'order.  Used by gordon_360_parallel.py.')
+    group.addoption('--latency-report', default='latency_report.json',
+        metavar='PATH', help='Where to write the per-endpoint latency report '
+             '(default: latency_report.json).  An empty value disables it.')
+    group.addoption('--save-latency-baseline', default=None, metavar='PATH',
+        help='Save this run\'s latencies as the baseline in PATH.')
+    group.addoption('--latency-baseline', default=None, metavar='PATH',
+        help='Compare this run\'s latencies with the baseline in PATH.')
+    group.addoption('--latency-threshold', type=float,
+        default=latency_baseline.DEFAULT_THRESHOLD, metavar='FRACTION',
+        help='Allowed growth of an endpoint\'s p95 over the baseline '
+             '(default: %(default)s).')
+    group.addoption('--latency-alpha', type=float,
+        default=latency_baseline.DEFAULT_ALPHA,
+        help='Significance level of the regression test '
+             '(default: %(default)s).')
+    group.addoption('--latency-gate', choices=['warn', 'fail'], default='warn',
+        help='Whether a latency regression only warns or fails the run '
+             '(default: warn).')
+    group.addoption('--cassette', default=None, metavar='PATH',
+        help='Record the run\'s requests and responses to, or replay them '
+             'from, the cassette file PATH (see cassette.py).')
+    group.addoption('--cassette-mode', choices=cassettes.MODES,
+        default=cassettes.REPLAY,
+        help='Whether --cassette records or replays (default: replay).')
+    group.addoption('--check-schemas', choices=['off', 'warn', 'fail'],
+        default='warn', help='Check every 2xx response against the schema of '
+             'its route in response_schemas.py, and fail the test or only '
+             'warn when it does not match (default: warn, until a run '
+             'against a real host is clean).')
+    group.addoption('--caching-check', action='store_true',
+        help='Also run test_allcaching_pytest.py, which probes every GET route '
+             'for conditional request and compression support.  Its requests '
+             'are not part of the latency report.')
+    group.addoption('--caching-report', default='caching_report.json',
+        metavar='PATH', help='Where test_allcaching_pytest.py writes which '
+             'routes support conditional requests and compression, and the '
+             'bytes they waste (default: caching_report.json).  The report '
+             'already at PATH is the one progress is measured against.  An '
+             'empty value disables it.')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'resource(*names): shared server '
+        'state the test reads or changes; tests sharing a resource never run '
+        'concurrently.')
+    config.addinivalue_line('markers', 'caching: probes every GET route for '
+        'HTTP caching support; only runs with --caching-check.')
+    poolSize = config.getoption('--pool-size')
+    if poolSize is not None:
+        api.POOL_SIZE = poolSize
+    cassettePath = config.getoption('--cassette')
+    if cassettePath is not None:
+        api.useCassette(cassettePath, config.getoption('--cassette-mode'))
+    schemas.checkMode = config.getoption('--check-schemas')
+    if schemas.checkMode != 'off':
+        api.responseCheck = checkSchema
+
+
+# # # # # # # # # # #
+# Session Fixtures  #
+# # # # # # # # # # #
+
+# These live for the whole run of one pytest process (one per worker when the
+# suite is split across processes), so every test shares a warm connection
+# pool instead of opening a new TCP/TLS connection.
+
+@pytest.fixture(scope='session')
+def student_session():
+    return api.tokenCache.getSession(control.hostURL, control.username,
+        control.password)
+
+@pytest.fixture(scope='session')
+def leader_session():
+    return api.tokenCache.getSession(control.hostURL, control.leader_username,
+        control.leader_password)
+
+@pytest.fixture(scope='session')
+def guest_session():
+    return api.getGuestSession()
+
+
+# # # # # # # # # # # # # # #
+# Async Tests and Fixtures  #
+# # # # # # # # # # # # # # #
+
+# `async def` tests run on the event loop shared by pytest_components_async,
+# so they can await its helpers and batch independent reads with
+# asyncio.gather().  The async session fixtures share that module's
+# connection pool.  aiohttp is only needed when async tests are collected.
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    import pytest_components_async as apiAsync
+    funcargs = { name: pyfuncitem.funcargs[name] \
+        for name in pyfuncitem._fixtureinfo.argnames }
+    apiAsync.run(pyfuncitem.obj(**funcargs))
+    return True
+
+
+@pytest.fixture(scope='session')
+def async_student_session():
+    apiAsync = pytest.importorskip('pytest_components_async')
+    return apiAsync.run(apiAsync.createAuthorizedSession(control.hostURL,
+        control.username, control.password))
+
+@pytest.fixture(scope='session')
+def async_leader_session():
+    apiAsync = pytest.importorskip('pytest_components_async')
+    return apiAsync.run(apiAsync.createAuthorizedSession(control.hostURL,
+        control.leader_username, control.leader_password))
+
+@pytest.fixture(scope='session')
+def async_guest_session():
+    apiAsync = pytest.importorskip('pytest_components_async')
+    return apiAsync.run(apiAsync.createGuestSession())
+
+
+# # # # # # # # # # # # #
+# Shared Server State   #
+# # # # # # # # # # # # #
+
+# Tests that change server state, or assert on state that other tests change,
+# are tagged with the resources involved.  gordon_360_parallel.py runs tests
+# that share a resource serially in one worker.  Tests can also be tagged
+# directly with @pytest.mark.resource('name').
+SHARED_RESOURCES = [
+    # Memberships, leaders and counts for activity AJG.
+    ('test_allmembership_pytest.py::*', ['memberships:AJG']),
+    ('test_allemail_pytest.py::*', ['memberships:AJG']),
+    # Activity AJG blurb and url.
+    ('test_allactivities_pytest.py::*::test_update_activity*',
+        ['activity:AJG']),
+    ('test_allactivities_pytest.py::*::test_get_one_activity*',
+        ['activity:AJG']),
+    ('test_allactivities_pytest.py::*::test_get_activities_for_session___*',
+        ['activity:AJG']),
+    # Membership requests on AJG.
+    ('test_allmembershiprequest_pytest.py::*', ['requests:AJG']),
+    # The student's custom events, including myschedule event 10000.
+    ('test_allmyschedule_pytest.py::*', ['myschedule:student']),
+    ('test_allschedulecontrol_pytest.py::*', ['schedulecontrol:student']),
+    # Housing admin whitelist and apartment applications.
+    ('test_allhousingapp_pytest.py::*::test_*whitelist',
+        ['housing:admin-whitelist']),
+    ('test_allhousingapp_pytest.py::*::test_*appli*',
+        ['housing:applications']),
+    ('test_allhousingapp_pytest.py::*::test_get_all_for_apartment_app',
+        ['housing:applications']),
+    # The student's profile: privacy flags, image and social media links.
+    ('test_allprofile_pytest.py::*::test_get_my_profile', ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_get_image', ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_post_profile_image',
+        ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_post_ID_image', ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_post_reset_image',
+        ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_put_social_media_links',
+        ['profile:student']),
+    ('test_allprofile_pytest.py::*::test_put_*_privacy', ['profile:student']),
+    ('test_allaccount_pytest.py::*::test_get_student_by_email',
+        ['profile:student']),
+    # Wellness answers of each account.
+    ('test_allwellnesscheck_pytest.py::*_student', ['wellness:student']),
+    ('test_allwellnesscheck_pytest.py::*_faculty', ['wellness:leader']),
+]
+
+def itemResources(item):
+    """Return the sorted shared resources a collected test touches."""
+    names = set()
+    for marker in item.iter_markers('resource'):
+        names.update(marker.args)
+    return sorted(names)
+
+def pytest_collection_modifyitems(session, config, items):
+    for item in items:
+        # Match relative to the test file so the table works from any rootdir.
+        localId = '::'.join([item.path.name] + item.nodeid.split('::')[1:])
+        for pattern, names in SHARED_RESOURCES:
+            if fnmatch.fnmatchcase(localId, pattern):
+                item.add_marker(pytest.mark.resource(*names))
+
+    if not config.getoption('--caching-check'):
+        probes = [item for item in items if item.get_closest_marker('caching')]
+        if probes:
+            config.hook.pytest_deselected(items=probes)
+            items[:] = [item for item in items
+                if not item.get_closest_marker('caching')]
+
+    shardPath = config.getoption('--shard')
+    if shardPath is not None:
+        with open(shardPath) as shardFile:
+            order = {nodeid: i for i, nodeid in enumerate(json.load(shardFile))}
+        selected = [item for item in items if item.nodeid in order]
+        deselected = [item for item in items if item.nodeid not in order]
+        selected.sort(key=lambda item: order[item.nodeid])
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+    mapPath = config.getoption('--resource-map')
+    if mapPath is not None:
+        with open(mapPath, 'w') as mapFile:
+            json.dump([{'nodeid': item.nodeid, 'resources': itemResources(item)}
+                for item in items], mapFile, indent=1)
+
+
+# # # # # # # # # # #
+# Response Schemas  #
+# # # # # # # # # # #
+
+# Every 2xx response made through pytest_components is checked, whole, against
+# the schema of its route, including the Gordon ID leak rules.  Tests call
+# schemas.validate() themselves where the check is the point of the test; a
+# response is only checked once.  --check-schemas sets schemas.checkMode, which
+# those calls follow too.
+
+def checkSchema(response):
+    if not 200 <= response.status_code < 300:
+        return
+    try:
+        schemas.validate(response)
+    except ValueError:
+        # Not json: tests that expect json say so themselves.
+        pass
+
+
+# # # # # # # # # # #
+# Latency Report    #
+# # # # # # # # # # #
+
+# Every request made through pytest_components is timed.  At the end of the
+# run the timings are summarised per endpoint, written as json and printed.
+
+def pytest_sessionfinish(session, exitstatus):
+    apiAsync = sys.modules.get('pytest_components_async')
+    if apiAsync is not None:
+        apiAsync.close()
+
+    reportPath = session.config.getoption('--latency-report')
+    endpoints = api.recorder.report()
+    if reportPath and endpoints:
+        with open(reportPath, 'w') as reportFile:
+            json.dump({
+                'generated': datetime.datetime.now().isoformat(),
+                'hostURL': control.hostURL,
+                'endpoints': endpoints,
+            }, reportFile, indent=1)
+
+    config = session.config
+    samples = latency_baseline.samplesFromRecorder(api.recorder)
+    savePath = config.getoption('--save-latency-baseline')
+    if savePath and samples:
+        latency_baseline.saveBaseline(savePath, samples, control.hostURL)
+    baselinePath = config.getoption('--latency-baseline')
+    if baselinePath:
+        regressions = latency_baseline.compare(
+            latency_baseline.loadBaseline(baselinePath), samples,
+            config.getoption('--latency-threshold'),
+            config.getoption('--latency-alpha'))
+        config._latencyRegressions = regressions
+        if latency_baseline.gateFails(regressions,
+                config.getoption('--latency-gate')) and \
+                session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    regressions = getattr(config, '_latencyRegressions', None)
+    if regressions is not None:
+        writeLatencyRegressions(terminalreporter, regressions)
+    cachingReport = getattr(config, '_cachingReport', None)
+    if cachingReport is not None:
+        writeCachingReport(terminalreporter, *cachingReport)
+    endpoints = api.recorder.report()
+    if not endpoints:
+        return
+    terminalreporter.write_sep('=', 'endpoint latency (ms)')
+    terminalreporter.write_line('{0:<7} {1:<58} {2:>5} {3:>9} {4:>9} {5:>9} '
+        '{6:>10} {7:>6}'.format('METHOD', 'ROUTE', 'COUNT', 'P50', 'P95',
+        'P99', 'AVG BYTES', 'REUSED'))
+    for endpoint in endpoints:
+        count = endpoint['count']
+        known = endpoint['reused_connections'] + endpoint['new_connections']
+        reused = '{0:.0%}'.format(endpoint['reused_connections'] / known) \
+            if known else '-'
+        terminalreporter.write_line('{0:<7} {1:<58} {2:>5} {3:>9.1f} {4:>9.1f} '
+            '{5:>9.1f} {6:>10} {7:>6}'.format(endpoint['method'],
+            endpoint['route'][:58], count, endpoint['p50_ms'],
+            endpoint['p95_ms'], endpoint['p99_ms'],
+            endpoint['response_bytes'] // count, reused))
+
+def writeLatencyRegressions(terminalreporter, regressions):
+    terminalreporter.write_sep('=', 'latency regressions against baseline')
+    if not regressions:
+        terminalreporter.write_line('No endpoint regressed.')
+        return
+    for r in regressions:
+        significance = 'p={0:.3g}'.format(r.pValue) \
+            if r.pValue is not None else 'too few samples, p95 alone'
+        terminalreporter.write_line('{0}: p95 {1:.1f} ms -> {2:.1f} ms '
+            '(x{3:.2f}, {4})'.format(r.endpoint, r.baselineP95, r.currentP95,
+            r.ratio, significance), red=True)
+
+def writeCachingReport(terminalreporter, report, previous=None):
+    terminalreporter.write_sep('=', 'conditional requests and compression')
+    terminalreporter.write_line('{0} of {1} routes answer a conditional '
+        're-fetch with 304; {2} of {3} compressible routes gzip '
+        '({4} routes skipped).'.format(len(report['conditional']),
+        report['measured'], len(report['gzip']), report['compressible'],
+        report['skipped']))
+    terminalreporter.write_line('Re-fetching every route once wastes {0:,} '
+        'bytes; compression would save {1:,} more.'.format(
+        report['wasted_bytes'], report['compressible_bytes']))
+    if previous is not None:
+        for check in ('conditional', 'gzip'):
+            before = set(previous.get(check, []))
+            after = set(report[check])
+            for route in sorted(after - before):
+                terminalreporter.write_line('now supports {0}: {1}'.format(
+                    check, route), green=True)
+            for route in sorted(before - after):
+                terminalreporter.write_line('no longer supports {0}: {1}'\
+                    .format(check, route), red=True)
+        terminalreporter.write_line('Wasted bytes since the previous report: '
+            '{0:,} -> {1:,}.'.format(previous.get('wasted_bytes', 0),
+            report['wasted_bytes']))
+    terminalreporter.write_line('{0:<52} {1:>4} {2:>4} {3:>4} {4:>9} {5:>9} '
+        '{6:>8} {7:>8}'.format('ROUTE', 'TAG', '304', 'GZIP', 'BYTES',
+        'WASTED', 'FULL MS', 'SAVED MS'))
+    for route in report['routes']:
+        if 'skipped' in route:
+            continue
+        terminalreporter.write_line('{0:<52} {1:>4} {2:>4} {3:>4} {4:>9} '
+            '{5:>9} {6:>8.1f} {7:>8.1f}'.format(
+            ('* ' if route['near_static'] else '') + route['route'][:50],
+            'yes' if route['etag'] or route['last_modified'] else '-',
+            'yes' if route['conditional_status'] == 304 else '-',
+            'yes' if route['gzip'] else '-', route['wire_bytes'],
+            route['wasted_bytes'], route['full_ms'], route['saved_ms']))
+    terminalreporter.write_line('* near-static route')
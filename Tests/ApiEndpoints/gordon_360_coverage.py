@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""Reports which controller routes the test suite exercises.
+
+Usage:
+    [python3] gordon_360_coverage.py [REPORT ...] [--json PATH] [--all]
+
+Every request made through pytest_components is recorded by method and
+route in the latency report pytest writes (latency_report.json by default,
+see conftest.py).  This tool matches those routes against every route in
+Gordon360/ApiControllers, as found by get-route-list.py, and prints per
+controller how many routes of each verb were called and which were not.
+Several reports (e.g. from different test selections) are combined.
+
+Routes are matched through route_trie, so reports written before the suite
+knew the controller templates (numeric ids shown as '{id}') still count.  A
+route only counts as tested when some call to it got a status other than
+404 or 405; routes the suite reached only with those are listed separately.
+"""
+
+import argparse
+import collections
+import json
+import sys
+
+import route_trie
+
+VERBS = ('GET', 'POST', 'PUT', 'DELETE')
+# Statuses that mean the request never reached the action, e.g. a wrong url
+# or a probe of every route.
+NOT_REACHED = ('404', '405')
+
+
+def observedCalls(reports):
+    """Count the calls to the routes in latency reports.
+
+    Returns:
+        (Counter, Counter): {(method, route): calls} of calls that reached
+        the route, and of calls answered 404 or 405.  Reports without a
+        status mix count every call as reaching its route.
+    """
+    calls = collections.Counter()
+    notReached = collections.Counter()
+    for report in reports:
+        for entry in report.get('endpoints', []):
+            if 'route' not in entry:
+                continue
+            key = (entry.get('method'), entry['route'])
+            missed = sum(n for status, n in entry.get('statuses', {}).items()
+                if status in NOT_REACHED)
+            calls[key] += entry.get('count', 0) - missed
+            notReached[key] += missed
+    return calls, notReached
+
+def coverage(catalogue, calls, notReached=None):
+    """Match observed calls to catalogue routes.
+
+    Args:
+        catalogue (list of dict): get-route-list.py catalogue entries.
+        calls (dict): (method, route or url path) -> number of calls.
+        notReached (dict): (method, route or url path) -> number of calls
+            answered 404 or 405.
+
+    Returns:
+        (list, dict): the catalogue entries, each with 'calls' and
+        'not_reached' counts added, and the observed (method, route) ->
+        calls that matched no catalogue route.
+    """
+    trie = route_trie.RouteTrie()
+    routes = []
+    for route in catalogue:
+        route = dict(route, calls=0, not_reached=0)
+        routes.append(route)
+        trie.add(route['path'], route['method'], route)
+    unmatched = collections.Counter()
+    for counts, field in ((calls, 'calls'), (notReached or {}, 'not_reached')):
+        for (method, path), n in counts.items():
+            if not n:
+                continue
+            found = trie.match(path, method)
+            if found is None or found.value['method'] != method:
+                unmatched[(method, path)] += n
+            else:
+                found.value[field] += n
+    return routes, dict(unmatched)
+
+def byController(routes):
+    controllers = collections.OrderedDict()
+    for route in routes:
+        controllers.setdefault(route['controller'], []).append(route)
+    return controllers
+
+def printCoverage(routes, unmatched, showAll):
+    controllers = byController(routes)
+    covered = sum(1 for r in routes if r['calls'])
+    print('{0} of {1} routes ({2:.0%}) called by the suite.'.format(covered,
+        len(routes), covered / len(routes) if routes else 0))
+    print('{0:<34} {1:>9} {2}'.format('CONTROLLER', 'ROUTES',
+        ' '.join('{0:>7}'.format(verb) for verb in VERBS)))
+    for controller, entries in controllers.items():
+        cells = []
+        for verb in VERBS:
+            ofVerb = [r for r in entries if r['method'] == verb]
+            cells.append('{0:>7}'.format('{0}/{1}'.format(
+                sum(1 for r in ofVerb if r['calls']), len(ofVerb)) \
+                if ofVerb else '-'))
+        print('{0:<34} {1:>9} {2}'.format(controller, '{0}/{1}'.format(
+            sum(1 for r in entries if r['calls']), len(entries)),
+            ' '.join(cells)))
+    for controller, entries in controllers.items():
+        shown = entries if showAll else [r for r in entries if not r['calls']]
+        if not shown:
+            continue
+        print('\n{0} ({1})'.format(controller, entries[0]['file']))
+        for r in shown:
+            print('  {0:<7} {1:<70} {2}'.format(r['method'], r['path'],
+                '{0} calls'.format(r['calls']) if r['calls'] else \
+                'untested (line {0})'.format(r['line'])))
+    notReached = [r for r in routes if r['not_reached'] and not r['calls']]
+    if notReached:
+        print('\nUntested, only reached with 404 or 405:')
+        for r in notReached:
+            print('  {0:<7} {1:<70} {2} calls'.format(r['method'], r['path'],
+                r['not_reached']))
+    if unmatched:
+        print('\nCalled, but not a controller route:')
+        for (method, path), n in sorted(unmatched.items(),
+                key=lambda item: str(item[0])):
+            print('  {0:<7} {1:<70} {2} calls'.format(method, path, n))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('reports', nargs='*', metavar='REPORT',
+        default=['latency_report.json'],
+        help='latency reports of test runs (default: latency_report.json)')
+    parser.add_argument('--json', default=None, metavar='PATH',
+        help='also write the coverage of every route to PATH')
+    parser.add_argument('--all', action='store_true',
+        help='list tested routes too, with their call counts')
+    args = parser.parse_args()
+
+    reports = []
+    for path in args.reports:
+        with open(path) as reportFile:
+            reports.append(json.load(reportFile))
+    routes, unmatched = coverage(route_trie.loadCatalogue(),
+        *observedCalls(reports))
+    if args.json:
+        with open(args.json, 'w') as jsonFile:
+            json.dump({
+                'controllers': { controller: entries for controller, entries \
+                    in byController(routes).items() },
+                'unmatched': [{ 'method': method, 'route': path, 'calls': n } \
+                    for (method, path), n in unmatched.items()],
+            }, jsonFile, indent=1)
+    printCoverage(routes, unmatched, args.all)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
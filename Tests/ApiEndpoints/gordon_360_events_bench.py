@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+"""Benchmarks the events endpoints as the 25Live calendar grows.
+
+Usage:
+    [python3] gordon_360_events_bench.py [--sizes N,N,...] [--samples N]
+        [options]
+
+The api/events routes (api/events, claw and public, and the api/events/25Live
+routes the suite calls) expand the cached 25Live feed into one record per
+occurrence on every request, so their cost grows with the calendar.  The
+benchmark serves 25Live feeds of growing size (1k to 100k events by
+default) from a stand-in 25Live started in this process (standin_25live.py)
+and, for each size, measures latency, payload size and throughput of every
+events endpoint.
+
+The api under test has to fetch its events from that stand-in: set the
+25LiveEventsURL app setting of the api to the url printed at start
+(http://HOST:PORT/25live/data/gordon/run/events.xml), or start the Python
+stand-in with --events-feed URL --events-refresh 5.  After each feed swap the
+benchmark waits until api/events returns the new feed's occurrences; the
+api reloads 25Live every four minutes, so allow up to that per size.
+
+Each endpoint is then sent --samples requests by --concurrency workers, each
+waiting for its response before sending the next (closed loop).  Sizes stop
+growing once an endpoint falls over: more than half its requests fail, or
+its median latency exceeds --give-up seconds.  The summary gives, per
+endpoint, the largest size answered within --budget ms at the 95th
+percentile.  The host and accounts come from test_gordon360_pytest.py and
+credentials.py, as for the test suite.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import pytest_components_async as apiAsync
+import standin_25live as live
+import test_gordon360_pytest as control
+from latency_histogram import LatencyHistogram, summarize
+
+DEFAULT_SIZES = '1000,3000,10000,30000,100000'
+# Seconds between checks that the api serves a new feed.
+FEED_POLL_INTERVAL = 5
+
+
+class Endpoint:
+    """One events route.
+
+    Attributes:
+        name (str): label used in the report.
+        path (str): path below hostURL.
+        account (str): 'student' or 'guest'.
+    """
+
+    def __init__(self, name, path, account):
+        self.name = name
+        self.path = path
+        self.account = account
+
+ENDPOINTS = [
+    Endpoint('events', 'api/events', 'student'),
+    Endpoint('events/claw', 'api/events/claw', 'student'),
+    Endpoint('events/public', 'api/events/public', 'guest'),
+    Endpoint('events/25Live/All', 'api/events/25Live/All', 'student'),
+    Endpoint('events/25Live/CLAW', 'api/events/25Live/CLAW', 'student'),
+    Endpoint('events/25Live/Public', 'api/events/25Live/Public', 'guest'),
+]
+
+
+# # # # # # # # #
+# Measurement   #
+# # # # # # # # #
+
+class EndpointResult:
+    """Outcome of the requests sent to one endpoint at one feed size."""
+
+    def __init__(self, endpoint, feed):
+        self.endpoint = endpoint
+        self.feed = feed
+        self.latencies = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+        self.bytes = 0
+        self.records = 0
+        self.elapsed = 0.0
+
+    def add(self, latency, status, size, records):
+        self.latencies.recordSeconds(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+            return
+        self.bytes += size
+        self.records += records
+
+    def addFailure(self, reason):
+        self.statuses[reason] = self.statuses.get(reason, 0) + 1
+        self.errors += 1
+
+    @property
+    def count(self):
+        return sum(self.statuses.values())
+
+    def summary(self):
+        answered = self.count - self.errors
+        summary = {
+            'endpoint': self.endpoint.name,
+            'events': self.feed.events,
+            'occurrences': self.feed.reservations,
+            'count': self.count,
+            'errors': self.errors,
+            'statuses': { str(k): v for k, v in self.statuses.items() },
+            'mean_records': round(self.records / answered) if answered else 0,
+            'mean_bytes': round(self.bytes / answered) if answered else 0,
+            'throughput_rps': round(self.count / self.elapsed, 3) \
+                if self.elapsed else 0.0,
+            'throughput_mbps': round(self.bytes / self.elapsed / 1e6, 3) \
+                if self.elapsed else 0.0,
+        }
+        summary.update(summarize(self.latencies))
+        return summary
+
+    def fellOver(self, giveUp):
+        summary = summarize(self.latencies)
+        return self.errors > self.count / 2 or \
+            (summary['p50_ms'] or 0) > giveUp * 1000
+
+
+# # # # # # # # # # # #
+# Benchmark Driver    #
+# # # # # # # # # # # #
+
+def _records(response):
+    try:
+        found = response.json()
+    except ValueError:
+        return 0
+    return len(found) if isinstance(found, list) else 0
+
+async def waitForFeed(session, host, feed, timeout):
+    """Wait until api/events returns one record per occurrence of feed.
+
+    Returns:
+        float: seconds waited.
+
+    Raises:
+        RuntimeError: when the api still serves another feed after timeout
+            seconds.
+    """
+    start = time.monotonic()
+    while True:
+        try:
+            response = await apiAsync.get(session, host + 'api/events')
+            if response.status_code == 200 and \
+                    _records(response) == feed.reservations:
+                return time.monotonic() - start
+        except Exception:
+            pass
+        if time.monotonic() - start > timeout:
+            raise RuntimeError('the api did not pick up the feed of {0} events '
+                'within {1:g}s; is it reading the 25Live stand-in?'.format(
+                feed.events, timeout))
+        await asyncio.sleep(FEED_POLL_INTERVAL)
+
+async def requestOne(session, url, result, timeout):
+    start = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(apiAsync.get(session, url), timeout)
+    except asyncio.TimeoutError:
+        result.addFailure('timeout')
+        return
+    except Exception as e:
+        result.addFailure(type(e).__name__)
+        return
+    result.add(time.perf_counter() - start, response.status_code,
+        len(response.content), _records(response))
+
+async def measure(args, session, endpoint, feed):
+    """Send --warmup untimed then --samples timed requests to one endpoint."""
+    url = args.host + endpoint.path
+    result = EndpointResult(endpoint, feed)
+
+    async def worker(remaining, record):
+        while remaining:
+            remaining.pop()
+            await requestOne(session, url, result if record else \
+                EndpointResult(endpoint, feed), args.timeout)
+
+    for samples, record in ((args.warmup, False), (args.samples, True)):
+        start = time.monotonic()
+        remaining = list(range(samples))
+        await asyncio.gather(*(worker(remaining, record) \
+            for _ in range(args.concurrency)))
+        if record:
+            result.elapsed = time.monotonic() - start
+    return result
+
+async def benchmark(args, endpoints, upstream, progress):
+    sessions = {
+        'student': await apiAsync.createAuthorizedSession(args.host,
+            control.username, control.password),
+        'guest': await apiAsync.createGuestSession(),
+    }
+    loop = asyncio.get_running_loop()
+    results = []
+    sizes = []
+    for events in args.sizes:
+        started = time.monotonic()
+        feed = await loop.run_in_executor(None, live.Feed.generate, events,
+            args.seed)
+        generated = time.monotonic() - started
+        upstream.setFeed(feed)
+        waited = await waitForFeed(sessions['student'], args.host, feed,
+            args.refresh_timeout)
+        sizes.append({
+            'events': feed.events,
+            'occurrences': feed.reservations,
+            'feed_bytes': len(feed.content),
+            'generate_s': round(generated, 3),
+            'pickup_s': round(waited, 3),
+        })
+        fellOver = []
+        for endpoint in endpoints:
+            result = await measure(args, sessions[endpoint.account], endpoint,
+                feed)
+            results.append(result)
+            progress(result.summary())
+            if result.fellOver(args.give_up):
+                fellOver.append(endpoint.name)
+        sizes[-1]['fell_over'] = fellOver
+        if fellOver and not args.keep_going:
+            break
+    return sizes, results
+
+
+# # # # # # # # #
+# Reporting     #
+# # # # # # # # #
+
+def limits(summaries, budget):
+    """Per endpoint, the largest feed answered within budget ms at p95."""
+    largest = {}
+    for s in summaries:
+        largest.setdefault(s['endpoint'], None)
+        if s['errors'] == 0 and s['p95_ms'] is not None and \
+                s['p95_ms'] <= budget:
+            largest[s['endpoint']] = max(largest[s['endpoint']] or 0,
+                s['events'])
+    return largest
+
+def printRow(s):
+    fmt = lambda v: '{0:9.1f}'.format(v) if v is not None else \
+        '{0:>9}'.format('-')
+    print('{0:>7} {1:>8} {2:<22} {3:>8} {4:>9.2f} {5} {6} {7} {8:>7.2f} '
+        '{9:>6}'.format(s['events'], s['occurrences'], s['endpoint'][:22],
+        s['mean_records'], s['mean_bytes'] / 1e6, fmt(s['p50_ms']),
+        fmt(s['p95_ms']), fmt(s['p99_ms']), s['throughput_rps'], s['errors']))
+    sys.stdout.flush()
+
+def printHeader():
+    print('{0:>7} {1:>8} {2:<22} {3:>8} {4:>9} {5:>9} {6:>9} {7:>9} {8:>7} '
+        '{9:>6}'.format('EVENTS', 'OCCUR', 'ENDPOINT', 'RECORDS', 'MB',
+        'P50 ms', 'P95 ms', 'P99 ms', 'REQ/S', 'ERRORS'))
+
+def printSummary(report, args):
+    print('\nLargest feed answered within {0:g} ms at p95:'.format(
+        args.budget))
+    for name, events in report['within_budget'].items():
+        print('  {0:<22} {1}'.format(name, '{0} events'.format(events) \
+            if events else 'none of the sizes tried'))
+    for size in report['sizes']:
+        if size['fell_over']:
+            print('At {0} events ({1:.0f} MB of xml) these fell over: {2}'\
+                .format(size['events'], size['feed_bytes'] / 1e6,
+                ', '.join(size['fell_over'])))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=control.hostURL,
+        help='base url of the api (default: hostURL of the test suite)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+        help='comma separated numbers of events in the feed '
+             '(default: %(default)s)')
+    parser.add_argument('--samples', type=int, default=10,
+        help='timed requests per endpoint and size (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=1,
+        help='untimed requests per endpoint and size (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=2,
+        help='requests in flight at once (default: %(default)s)')
+    parser.add_argument('--endpoints', default=None,
+        help='comma separated endpoint names to restrict the run to')
+    parser.add_argument('--upstream-host', default='127.0.0.1',
+        help='address the 25Live stand-in listens on (default: %(default)s)')
+    parser.add_argument('--upstream-port', type=int, default=8025,
+        help='port the 25Live stand-in listens on (default: %(default)s)')
+    parser.add_argument('--refresh-timeout', type=float, default=330.0,
+        help='seconds to wait for the api to pick up a new feed '
+             '(default: %(default)s)')
+    parser.add_argument('--budget', type=float, default=1000.0,
+        help='p95 latency in ms an endpoint should stay within '
+             '(default: %(default)s)')
+    parser.add_argument('--give-up', type=float, default=30.0,
+        help='median seconds at which an endpoint counts as fallen over '
+             '(default: %(default)s)')
+    parser.add_argument('--keep-going', action='store_true',
+        help='try every size even after an endpoint fell over')
+    parser.add_argument('--timeout', type=float, default=120.0,
+        help='seconds before a request counts as failed (default: '
+             '%(default)s)')
+    parser.add_argument('--seed', type=int, default=360,
+        help='seed of the generated feeds (default: %(default)s)')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='also write the report to PATH as json')
+    args = parser.parse_args()
+    if not args.host.endswith('/'):
+        args.host += '/'
+    try:
+        args.sizes = sorted(int(size) for size in args.sizes.split(','))
+    except ValueError:
+        parser.error('--sizes must be comma separated numbers')
+
+    endpoints = ENDPOINTS
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        endpoints = [e for e in endpoints if e.name in wanted]
+        if not endpoints:
+            parser.error('no known endpoint in --endpoints')
+
+    upstream = live.start(args.upstream_host, args.upstream_port)
+    print('25Live stand-in serving at {0}'.format(upstream.url))
+    print('Waiting for {0} to read its events from there.'.format(args.host))
+    printHeader()
+    apiAsync.ASYNC_POOL_SIZE = max(args.concurrency, 1) + 1
+    start = time.monotonic()
+    try:
+        sizes, results = apiAsync.run(benchmark(args, endpoints, upstream,
+            printRow))
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        apiAsync.close()
+        upstream.shutdown()
+    summaries = [result.summary() for result in results]
+    report = {
+        'hostURL': args.host,
+        'duration_s': round(time.monotonic() - start, 3),
+        'samples': args.samples,
+        'concurrency': args.concurrency,
+        'budget_ms': args.budget,
+        'sizes': sizes,
+        'within_budget': limits(summaries, args.budget),
+        'endpoints': summaries,
+    }
+    printSummary(report, args)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+"""Aggregates IIS W3C access logs of the Gordon 360 API by route.
+
+Usage:
+    [python3] gordon_360_iislog.py LOG [LOG ...] [--output PATH] [options]
+
+Every request line is mapped from its cs-uri-stem to the controller route
+template that serves it (see route_trie.py), and per method and route the
+analyzer reports the request count, time-taken percentiles, status codes and
+bytes sent and received.  Requests that match no route are counted together
+as '(unmatched)'.
+
+Logs are read line by line through a large buffer, and time-taken values go
+into fixed-size latency histograms, so memory stays constant however big the
+logs are.  .gz logs are read directly.  Several files are analysed in
+parallel, one per process (--processes), and their results merged exactly.
+The json report (--output) has the same shape as the suite's
+latency_report.json, so `latency_histogram.py merge` combines the reports of
+several days.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import functools
+import gzip
+import json
+import operator
+import os
+import sys
+
+import route_trie
+from latency_histogram import LatencyHistogram, mergeReports, summarize
+
+UNMATCHED = '(unmatched)'
+# Numeric fields passed to RouteStats.add(), in its argument order.
+NUMBER_FIELDS = ('sc-status', 'time-taken', 'sc-bytes', 'cs-bytes')
+READ_BUFFER = 1 << 20
+# Distinct (method, uri stem) pairs whose route is remembered per process.
+ROUTE_CACHE_SIZE = 1 << 16
+
+
+class RouteStats:
+    """Requests served by one method and route."""
+
+    # Distinct time-taken values tallied before they are moved into the
+    # histogram.  Tallying is much cheaper than recording every line.
+    PENDING_LIMIT = 4096
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.pending = collections.Counter()
+        self.statuses = collections.Counter()
+        self.bytesSent = 0
+        self.bytesReceived = 0
+
+    def add(self, status, timeTaken, bytesSent, bytesReceived):
+        """Count one request; timeTaken is in milliseconds, as IIS logs it."""
+        self.pending[timeTaken] += 1
+        self.statuses[status] += 1
+        self.bytesSent += bytesSent
+        self.bytesReceived += bytesReceived
+        if len(self.pending) > self.PENDING_LIMIT:
+            self.flush()
+
+    def flush(self):
+        for timeTaken, count in self.pending.items():
+            self.histogram.record(timeTaken * 1000, count)
+        self.pending.clear()
+
+    def summary(self, method, route):
+        self.flush()
+        count = self.histogram.totalCount
+        errors = sum(n for status, n in self.statuses.items() if status >= 500)
+        summary = {
+            'method': method,
+            'route': route,
+            'count': count,
+            'errors': errors,
+            'error_rate': round(errors / count, 4) if count else 0,
+            'statuses': { str(status): n for status, n in \
+                sorted(self.statuses.items()) },
+            'bytes_sent': self.bytesSent,
+            'bytes_received': self.bytesReceived,
+        }
+        summary.update(summarize(self.histogram))
+        return summary
+
+
+@functools.lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def routeOf(method, stem):
+    """Return (method, route template) for raw log fields."""
+    method = method.decode('latin-1')
+    trie = route_trie.defaultTrie()
+    found = None
+    if trie is not None:
+        found = trie.match(stem.decode('latin-1'), method)
+    return method, found.template if found is not None else UNMATCHED
+
+def _number(value):
+    # '-' marks a field IIS could not fill in.
+    return int(value) if value.isdigit() else 0
+
+def openLog(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb', buffering=READ_BUFFER)
+
+def analyzeFile(path):
+    """Aggregate one log file.
+
+    Args:
+        path (str): W3C extended log file, optionally gzipped.
+
+    Returns:
+        dict: a report with 'files', 'lines', 'skipped' and 'endpoints'.
+    """
+    stats = {}
+    lines = skipped = 0
+    fields = None
+    with openLog(path) as logFile:
+        for raw in logFile:
+            if raw.startswith(b'#'):
+                # IIS repeats the directives whenever it reopens the log,
+                # possibly with a different field list.
+                if raw.startswith(b'#Fields:'):
+                    names = raw[len(b'#Fields:'):].decode('ascii').split()
+                    fields = { name: i for i, name in enumerate(names) }
+                    iStem = fields.get('cs-uri-stem')
+                    iMethod = fields.get('cs-method')
+                    # Missing numeric fields read a '0' appended to the line.
+                    numbers = [fields.get(name, -1) for name in NUMBER_FIELDS]
+                    padded = -1 in numbers
+                    pickNumbers = operator.itemgetter(*numbers)
+                continue
+            values = raw.split()
+            if fields is None or iStem is None or len(values) != len(fields):
+                skipped += 1
+                continue
+            lines += 1
+            key = routeOf(values[iMethod] if iMethod is not None else b'-',
+                values[iStem])
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = RouteStats()
+            if padded:
+                values.append(b'0')
+            try:
+                entry.add(*map(int, pickNumbers(values)))
+            except ValueError:
+                entry.add(*map(_number, pickNumbers(values)))
+    return {
+        'files': [path],
+        'lines': lines,
+        'skipped': skipped,
+        'endpoints': [entry.summary(*key) for key, entry in stats.items()],
+    }
+
+def analyze(paths, processes=None):
+    """Aggregate several log files, in parallel when there are several.
+
+    Args:
+        paths (list of str): log files.
+        processes (int): worker processes, by default one per cpu.
+
+    Returns:
+        dict: the merged report, endpoints sorted by request count.
+    """
+    processes = min(processes or os.cpu_count() or 1, len(paths))
+    if processes > 1:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            reports = list(pool.map(analyzeFile, paths))
+    else:
+        reports = [analyzeFile(path) for path in paths]
+    report = mergeReports(reports)
+    report['generated'] = datetime.datetime.now().isoformat()
+    report['files'] = [path for r in reports for path in r['files']]
+    report['lines'] = sum(r['lines'] for r in reports)
+    report['skipped'] = sum(r['skipped'] for r in reports)
+    del report['merged_from']
+    report['endpoints'].sort(key=lambda e: e['count'], reverse=True)
+    return report
+
+def printReport(report, sortBy, top):
+    endpoints = sorted(report['endpoints'],
+        key=lambda e: e.get(sortBy) or 0, reverse=True)
+    total = sum(e['count'] for e in endpoints)
+    print('{0} requests in {1} file(s), {2} lines skipped.'.format(total,
+        len(report['files']), report['skipped']))
+    print('{0:<7} {1:<58} {2:>9} {3:>6} {4:>8} {5:>8} {6:>8} {7:>10} '
+        '{8:>6}'.format('METHOD', 'ROUTE', 'COUNT', 'SHARE', 'P50 ms',
+        'P95 ms', 'P99 ms', 'MB SENT', '5XX'))
+    for e in endpoints[:top]:
+        print('{0:<7} {1:<58} {2:>9} {3:>6.1%} {4:>8.0f} {5:>8.0f} {6:>8.0f} '
+            '{7:>10.1f} {8:>6.1%}'.format(e['method'][:7], e['route'][:58],
+            e['count'], e['count'] / total, e['p50_ms'], e['p95_ms'],
+            e['p99_ms'], e['bytes_sent'] / 1e6, e['error_rate']))
+    if len(endpoints) > top:
+        print('... {0} more routes (--top)'.format(len(endpoints) - top))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('logs', nargs='+', metavar='LOG',
+        help='IIS W3C extended log files (.log or .gz)')
+    parser.add_argument('--processes', type=int, default=None,
+        help='files analysed in parallel (default: one per cpu)')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='also write the report as json to PATH')
+    parser.add_argument('--sort', choices=['count', 'p95_ms', 'p99_ms',
+        'bytes_sent', 'errors'], default='count',
+        help='column to sort the table by (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=40,
+        help='routes to print (default: %(default)s)')
+    args = parser.parse_args()
+
+    report = analyze(args.logs, args.processes)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1)
+    if not report['endpoints']:
+        print('No requests found.')
+        return 1
+    printReport(report, args.sort, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
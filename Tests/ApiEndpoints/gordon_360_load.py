@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""Drives a weighted mix of Gordon 360 GET endpoints at a fixed request rate.
+
+Usage:
+    [python3] gordon_360_load.py [--rate N] [--duration SECONDS] [options]
+
+The host, accounts and activity/session codes come from
+test_gordon360_pytest.py and credentials.py, so the load generator hits the
+same data the test suite does.  Use --host to aim it somewhere else.
+
+Requests are sent open-loop: arrival times are fixed in advance (evenly
+spaced, or Poisson with --poisson) and each request is started at its
+arrival time whether or not earlier requests have finished.  Latency is
+measured from the scheduled arrival time, not from when the request was
+actually sent, so a server that falls behind shows up as queueing delay
+instead of being hidden by a slower request rate (coordinated omission).
+Requests that time out are recorded at the time they were given up on, so
+they raise the percentiles instead of vanishing from them; the report also
+counts them next to the percentiles.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+import pytest_components_async as apiAsync
+import test_gordon360_pytest as control
+from latency_histogram import LatencyHistogram, mergeReports, summarize
+
+
+# # # # # # # # # # # #
+# Endpoint Catalogue  #
+# # # # # # # # # # # #
+
+class Endpoint:
+    """One GET request in the mix.
+
+    Attributes:
+        name (str): label used in the report.
+        path (str): path below hostURL.
+        account (str): 'student', 'leader' or 'guest'.
+        weight (float): relative share of the request mix.
+    """
+
+    def __init__(self, name, path, account, weight):
+        self.name = name
+        self.path = path
+        self.account = account
+        self.weight = weight
+
+def catalogue():
+    """Returns the GET endpoints exercised by the test suite, weighted
+    roughly by how often the 360 UI calls them."""
+    return [
+        Endpoint('sessions', 'api/sessions/', 'student', 2),
+        Endpoint('sessions/current', 'api/sessions/current/', 'student', 8),
+        Endpoint('sessions/daysLeft', 'api/sessions/daysLeft/', 'student', 4),
+        Endpoint('profiles', 'api/profiles/', 'student', 10),
+        Endpoint('profiles/{username}',
+            'api/profiles/' + control.leader_username + '/', 'student', 6),
+        Endpoint('profiles/image', 'api/profiles/image/', 'student', 6),
+        Endpoint('accounts/search/{searchString}',
+            'api/accounts/search/' + control.searchString + '/', 'student', 8),
+        Endpoint('accounts/search/{searchString}/{secondaryString}',
+            'api/accounts/search/' + control.searchString + '/' + \
+            control.searchString2 + '/', 'student', 3),
+        Endpoint('accounts/username/{username}',
+            'api/accounts/username/' + control.leader_username + '/',
+            'student', 2),
+        Endpoint('activities', 'api/activities/', 'leader', 3),
+        Endpoint('activities/{id}',
+            'api/activities/' + control.activity_code_AJG + '/', 'leader', 4),
+        Endpoint('activities/session/{id}',
+            'api/activities/session/' + control.session_code + '/',
+            'leader', 4),
+        Endpoint('memberships/activity/{id}',
+            'api/memberships/activity/' + control.activity_code_AJG + '/',
+            'student', 4),
+        Endpoint('memberships/activity/{id}/leaders',
+            'api/memberships/activity/' + control.activity_code_AJG + \
+            '/leaders/', 'student', 2),
+        Endpoint('memberships/student/{id}',
+            'api/memberships/student/' + str(control.my_id_number) + '/',
+            'student', 5),
+        Endpoint('events/chapel/{term}',
+            'api/events/chapel/' + control.term_code + '/', 'student', 4),
+        Endpoint('events/25Live/All', 'api/events/25Live/All', 'student', 3),
+        Endpoint('events/25Live/Public', 'api/events/25Live/Public',
+            'guest', 3),
+        Endpoint('news/not-expired', 'api/news/not-expired/', 'student', 5),
+        Endpoint('news/new', 'api/news/new/', 'student', 3),
+        Endpoint('advanced-search/majors', 'api/advanced-search/majors',
+            'student', 1),
+        Endpoint('myschedule', 'api/myschedule/', 'student', 3),
+        Endpoint('schedulecontrol', 'api/schedulecontrol/', 'student', 3),
+        Endpoint('wellness', 'api/wellness/', 'student', 6),
+        Endpoint('wellness/question', 'api/wellness/question/', 'student', 3),
+        Endpoint('dining', 'api/dining/', 'student', 2),
+        Endpoint('vpscore', 'api/vpscore/', 'student', 2),
+        Endpoint('requests/activity/{id}',
+            'api/requests/activity/' + control.activity_code_AJG + '/',
+            'leader', 1),
+    ]
+
+
+# # # # # # # # #
+# Measurement   #
+# # # # # # # # #
+
+class EndpointResult:
+    """Outcome of every request sent to one endpoint."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+        self.timeouts = 0
+
+    def add(self, latency, status):
+        self.latencies.recordSeconds(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def addFailure(self, reason):
+        self.statuses[reason] = self.statuses.get(reason, 0) + 1
+        self.errors += 1
+
+    def addTimeout(self, latency):
+        # The true latency is at least this long, so leaving it out of the
+        # histogram would flatter the percentiles of a struggling server.
+        self.latencies.recordSeconds(latency)
+        self.addFailure('timeout')
+        self.timeouts += 1
+
+    @property
+    def count(self):
+        return sum(self.statuses.values())
+
+    def summary(self, duration):
+        summary = {
+            'endpoint': self.name,
+            'count': self.count,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'throughput_rps': round(self.count / duration, 3),
+            'error_rate': round(self.errors / self.count, 4) \
+                if self.count else 0.0,
+            'statuses': { str(k): v for k, v in self.statuses.items() },
+        }
+        summary.update(summarize(self.latencies))
+        return summary
+
+
+# # # # # # # # #
+# Load Driver   #
+# # # # # # # # #
+
+def arrivalOffsets(rate, duration, poisson, rng):
+    """Yields scheduled send times, in seconds from the start of the run."""
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate) if poisson else 1.0 / rate
+        if offset >= duration:
+            return
+        yield offset
+
+async def sendOne(session, endpoint, url, scheduled, result, timeout):
+    try:
+        response = await asyncio.wait_for(apiAsync.get(session, url), timeout)
+    except asyncio.TimeoutError:
+        result.addTimeout(time.monotonic() - scheduled)
+        return
+    except Exception as e:
+        result.addFailure(type(e).__name__)
+        return
+    result.add(time.monotonic() - scheduled, response.status_code)
+
+async def drive(args, endpoints):
+    sessions = {
+        'student': await apiAsync.createAuthorizedSession(args.host,
+            control.username, control.password),
+        'leader': await apiAsync.createAuthorizedSession(args.host,
+            control.leader_username, control.leader_password),
+        'guest': await apiAsync.createGuestSession(),
+    }
+    rng = random.Random(args.seed)
+    weights = [endpoint.weight for endpoint in endpoints]
+    results = { endpoint.name: EndpointResult(endpoint.name) \
+        for endpoint in endpoints }
+    pending = set()
+    dropped = 0
+
+    start = time.monotonic()
+    for offset in arrivalOffsets(args.rate, args.duration, args.poisson, rng):
+        scheduled = start + offset
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(endpoints, weights)[0]
+        if len(pending) >= args.max_outstanding:
+            # The server is hopelessly behind; count it rather than letting
+            # memory grow without bound.
+            results[endpoint.name].addFailure('dropped')
+            dropped += 1
+            continue
+        task = asyncio.ensure_future(sendOne(sessions[endpoint.account],
+            endpoint, args.host + endpoint.path, scheduled,
+            results[endpoint.name], args.timeout))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+    elapsed = time.monotonic() - start
+    return results, elapsed, dropped
+
+def generate(args, endpoints, share=1, index=0):
+    """Runs one open-loop generator at `share` of the target rate.
+
+    Returns:
+        dict: the json report of this generator.
+    """
+    args = argparse.Namespace(**vars(args))
+    args.rate = args.rate * share
+    args.max_outstanding = max(int(args.max_outstanding * share), 1)
+    if args.seed is not None:
+        args.seed += index
+    apiAsync.ASYNC_POOL_SIZE = max(int(args.connections * share), 1)
+    try:
+        results, elapsed, dropped = apiAsync.run(drive(args, endpoints))
+    finally:
+        apiAsync.close()
+    return {
+        'hostURL': args.host,
+        'target_rps': args.rate,
+        'duration_s': round(elapsed, 3),
+        'poisson': args.poisson,
+        'dropped': dropped,
+        'endpoints': [result.summary(elapsed) for result in results.values() \
+            if result.count],
+    }
+
+def generateInProcesses(args, endpoints):
+    """Splits the target rate across args.processes generator processes and
+    merges their histograms into one report."""
+    share = 1.0 / args.processes
+    with concurrent.futures.ProcessPoolExecutor(args.processes) as pool:
+        reports = list(pool.map(generate, [args] * args.processes,
+            [endpoints] * args.processes, [share] * args.processes,
+            range(args.processes)))
+    report = mergeReports(reports)
+    report['target_rps'] = args.rate
+    report['duration_s'] = max(r['duration_s'] for r in reports)
+    report['dropped'] = sum(r['dropped'] for r in reports)
+    return report
+
+def printReport(report, args):
+    summaries = sorted(report['endpoints'], key=lambda s: s['p99_ms'] or 0,
+        reverse=True)
+    elapsed = report['duration_s']
+    total = sum(s['count'] for s in summaries)
+    errors = sum(s['errors'] for s in summaries)
+    print('Target {0} req/s for {1}s ({2} arrivals): sent {3} requests in '
+        '{4:.1f}s, {5:.1f} req/s, error rate {6:.2%}, dropped {7}.'.format(
+        args.rate, args.duration, 'Poisson' if args.poisson else 'uniform',
+        total, elapsed, total / elapsed, errors / total if total else 0,
+        report['dropped']))
+    print('{0:<50} {1:>6} {2:>7} {3:>8} {4:>9} {5:>9} {6:>9} {7:>9}'.format(
+        'ENDPOINT', 'COUNT', 'ERRORS', 'TIMEOUTS', 'P50 ms', 'P90 ms',
+        'P99 ms', 'MAX ms'))
+    fmt = lambda v: '{0:9.1f}'.format(v) if v is not None else '{0:>9}'.format('-')
+    for s in summaries:
+        print('{0:<50} {1:>6} {2:>7.1%} {3:>8} {4} {5} {6} {7}'.format(
+            s['endpoint'][:50], s['count'], s['error_rate'],
+            s.get('timeouts', 0), fmt(s['p50_ms']), fmt(s['p90_ms']),
+            fmt(s['p99_ms']), fmt(s['max_ms'])))
+    if args.histograms:
+        for s in summaries:
+            print('\n' + s['endpoint'])
+            buckets = LatencyHistogram.fromBase64(s['histogram']).buckets(1000)
+            peak = max([n for _, n in buckets] or [1])
+            for upper, n in buckets:
+                print('  <= {0:>6} ms {1:>7} {2}'.format(upper, n,
+                    '#' * max(int(40 * n / peak), 1)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=control.hostURL,
+        help='base url of the api (default: hostURL of the test suite)')
+    parser.add_argument('--rate', type=float, default=10.0,
+        help='target requests per second (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=60.0,
+        help='seconds to generate load for (default: %(default)s)')
+    parser.add_argument('--poisson', action='store_true',
+        help='Poisson arrivals instead of evenly spaced ones')
+    parser.add_argument('--endpoints', default=None,
+        help='comma separated endpoint names to restrict the mix to')
+    parser.add_argument('--connections', type=int,
+        default=apiAsync.ASYNC_POOL_SIZE,
+        help='maximum open connections (default: %(default)s)')
+    parser.add_argument('--processes', type=int, default=1,
+        help='generator processes sharing the rate, for rates one event '
+             'loop cannot keep up with (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=30.0,
+        help='seconds before a request counts as failed (default: '
+             '%(default)s)')
+    parser.add_argument('--max-outstanding', type=int, default=10000,
+        help='in-flight requests beyond which arrivals are dropped '
+             '(default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for the endpoint choice and arrival times')
+    parser.add_argument('--histograms', action='store_true',
+        help='print a latency histogram per endpoint')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='also write the report to PATH as json')
+    args = parser.parse_args()
+    if not args.host.endswith('/'):
+        args.host += '/'
+
+    endpoints = catalogue()
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        endpoints = [e for e in endpoints if e.name in wanted]
+        if not endpoints:
+            parser.error('no known endpoint in --endpoints')
+
+    if args.processes > 1:
+        report = generateInProcesses(args, endpoints)
+    else:
+        report = generate(args, endpoints)
+    printReport(report, args)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+"""Runs the pytest suite across several worker processes.
+
+Usage:
+    [python3] gordon_360_parallel.py [-n WORKERS] [-- PYTEST_ARGS]
+
+Tests are tagged in conftest.py with the shared server state they touch
+(memberships on AJG, membership requests, myschedule events, the housing
+admin whitelist, profile privacy flags, ...).  Tests that share a resource,
+directly or through a chain of other tests, form one group that always runs
+serially, in collection order, inside a single worker.  Untagged tests form
+groups of one.  Groups are spread across the workers so each worker gets a
+similar number of tests, and every worker is an ordinary pytest process.
+
+PYTEST_ARGS are passed both to the collection step and to every worker, so
+'-- -k membership' runs only the membership tests in parallel.
+
+Each worker writes its own latency report; their histograms are merged into
+one report (--latency-report), which can be checked against a baseline with
+--latency-baseline just like a serial run.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import latency_baseline
+from latency_histogram import mergeReports
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def collect(pytestArgs, workDir):
+    """Returns the collected tests and the resources each one touches.
+
+    Args:
+        pytestArgs (list of str): extra arguments for pytest.
+        workDir (str): directory for temporary files.
+
+    Returns:
+        list of dict: one {'nodeid', 'resources'} entry per test, in
+        collection order.
+    """
+    mapPath = os.path.join(workDir, 'resources.json')
+    command = [sys.executable, '-m', 'pytest', '--collect-only', '-q',
+        '-p', 'no:cacheprovider', '--resource-map=' + mapPath] + pytestArgs
+    result = subprocess.run(command, cwd=HERE, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, universal_newlines=True)
+    if result.returncode not in (0, 5):
+        sys.stdout.write(result.stdout)
+        sys.exit(result.returncode)
+    with open(mapPath) as mapFile:
+        return json.load(mapFile)
+
+
+def groupTests(tests):
+    """Returns tests grouped so that no resource is shared between groups.
+
+    Args:
+        tests (list of dict): output of collect().
+
+    Returns:
+        list of list of str: test ids of each group, in collection order.
+    """
+    parent = list(range(len(tests)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, test in enumerate(tests):
+        for resource in test['resources']:
+            if resource in owner:
+                parent[find(i)] = find(owner[resource])
+            else:
+                owner[resource] = i
+
+    groups = {}
+    for i, test in enumerate(tests):
+        groups.setdefault(find(i), []).append(test['nodeid'])
+    return list(groups.values())
+
+
+def schedule(groups, workers):
+    """Returns the groups dealt out to workers, largest group first.
+
+    Args:
+        groups (list of list of str): output of groupTests().
+        workers (int): number of worker processes.
+
+    Returns:
+        list of list of str: test ids for each non-empty worker.
+    """
+    shards = [[] for _ in range(workers)]
+    for group in sorted(groups, key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [shard for shard in shards if shard]
+
+
+def run(shards, pytestArgs, workDir):
+    """Runs one pytest process per shard and waits for all of them.
+
+    Returns:
+        list of (int, str, str): exit code, output and latency report path
+        of each worker.
+    """
+    processes = []
+    for i, shard in enumerate(shards):
+        shardPath = os.path.join(workDir, 'shard-{0}.json'.format(i))
+        with open(shardPath, 'w') as shardFile:
+            json.dump(shard, shardFile)
+        logFile = open(os.path.join(workDir, 'worker-{0}.log'.format(i)), 'w+')
+        reportPath = os.path.join(workDir, 'latency-{0}.json'.format(i))
+        command = [sys.executable, '-m', 'pytest', '-p', 'no:cacheprovider',
+            '--shard=' + shardPath, '--latency-report=' + reportPath] \
+            + pytestArgs
+        processes.append((subprocess.Popen(command, cwd=HERE, stdout=logFile,
+            stderr=subprocess.STDOUT), logFile, reportPath))
+
+    results = []
+    for process, logFile, reportPath in processes:
+        process.wait()
+        logFile.seek(0)
+        results.append((process.returncode, logFile.read(), reportPath))
+        logFile.close()
+    return results
+
+
+def mergeLatencyReports(reportPaths):
+    """Returns the workers' latency reports merged into one, or None when no
+    worker made a request."""
+    reports = []
+    for path in reportPaths:
+        if os.path.exists(path):
+            with open(path) as reportFile:
+                reports.append(json.load(reportFile))
+    if not reports:
+        return None
+    report = mergeReports(reports)
+    report['generated'] = max(r['generated'] for r in reports)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--workers', type=int,
+        default=os.cpu_count() or 1, help='worker processes (default: cores)')
+    parser.add_argument('--latency-report', default='latency_report.json',
+        metavar='PATH', help='where to write the merged latency report '
+             '(default: %(default)s)')
+    parser.add_argument('--latency-baseline', default=None, metavar='PATH',
+        help='compare the merged latencies with the baseline in PATH')
+    parser.add_argument('--latency-threshold', type=float,
+        default=latency_baseline.DEFAULT_THRESHOLD, metavar='FRACTION',
+        help='allowed growth of an endpoint\'s p95 over the baseline '
+             '(default: %(default)s)')
+    parser.add_argument('--latency-alpha', type=float,
+        default=latency_baseline.DEFAULT_ALPHA,
+        help='significance level of the regression test '
+             '(default: %(default)s)')
+    parser.add_argument('--latency-gate', choices=['warn', 'fail'],
+        default='warn', help='whether a latency regression only warns or '
+             'fails the run (default: %(default)s)')
+    parser.add_argument('pytestArgs', nargs=argparse.REMAINDER,
+        help='arguments passed on to pytest, after --')
+    args = parser.parse_args()
+    pytestArgs = args.pytestArgs
+    if pytestArgs[:1] == ['--']:
+        pytestArgs = pytestArgs[1:]
+
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix='gordon360-') as workDir:
+        tests = collect(pytestArgs, workDir)
+        if not tests:
+            print('No tests collected.')
+            return 5
+        groups = groupTests(tests)
+        shards = schedule(groups, max(args.workers, 1))
+        print('Running {0} tests in {1} groups on {2} workers.'\
+            .format(len(tests), len(groups), len(shards)))
+        results = run(shards, pytestArgs, workDir)
+        report = mergeLatencyReports([path for _, _, path in results])
+
+    exitCode = 0
+    for i, (returnCode, output, _) in enumerate(results):
+        print('\n===== worker {0} (exit {1}) ====='.format(i, returnCode))
+        sys.stdout.write(output)
+        if returnCode not in (0, 5) and exitCode == 0:
+            exitCode = returnCode
+
+    if report is not None:
+        with open(args.latency_report, 'w') as reportFile:
+            json.dump(report, reportFile, indent=1)
+        print('\nMerged latency report of {0} workers written to {1}.'\
+            .format(report['merged_from'], args.latency_report))
+        if args.latency_baseline:
+            regressions = latency_baseline.compare(
+                latency_baseline.loadBaseline(args.latency_baseline),
+                latency_baseline.samplesFromReport(report),
+                args.latency_threshold, args.latency_alpha)
+            for r in regressions:
+                print('Latency regression {0}: p95 {1:.1f} ms -> {2:.1f} ms '
+                    '(x{3:.2f})'.format(r.endpoint, r.baselineP95,
+                    r.currentP95, r.ratio))
+            if exitCode == 0 and \
+                    latency_baseline.gateFails(regressions, args.latency_gate):
+                exitCode = 1
+    print('\nFinished in {0:.1f}s.'.format(time.monotonic() - start))
+    return exitCode
+
+
+if __name__ == '__main__':
+    sys.exit(main())
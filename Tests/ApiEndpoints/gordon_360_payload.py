@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+
+"""Reports how big api responses are and how much of them the suite reads.
+
+Usage:
+    [python3] gordon_360_payload.py live [options] [-- PYTEST_ARGS ...]
+    [python3] gordon_360_payload.py cassette PATH [PATH ...] [options]
+
+Many routes answer with whole entity lists (api/memberships, api/activities,
+api/sessions, ...) of which clients use a few fields.  For every route this
+reports, over the 2xx responses seen: calls, total and largest body size,
+items per response, bytes per item, and how small gzip (and brotli, when
+the brotli package is installed) would make the bodies.  Per field it gives
+how often records carry it, how often with a value, its share of the
+bytes, and whether the suite uses it.
+
+`live` runs the test suite in this process (any arguments after `--` go to
+pytest) and measures every response made through the pytest_components
+helpers, streamed ones included.  It also counts which fields of the
+decoded records the test code reads.  Those counts are what the suite
+asserts on, the closest thing this repository has to what clients use.
+Reads made by the schema checks of response_schemas.py are not counted;
+fields a route's schema requires are listed separately.  Responses of the
+async helpers are not measured.
+
+`cassette` reads the responses of runs recorded with pytest --cassette PATH
+--cassette-mode record (see cassette.py), without contacting a server.
+Cassettes do not record field reads, so a field counts as used when its
+name appears as a subscript, get() or `in` operand in a test file.
+
+UNREAD is the share of a route's bytes in fields the suite does not use:
+what trimming the response to the used fields would save before
+compression.  Fields the route's schema requires are marked, but a schema
+lists every field of the view model, so it does not make a field used.
+"""
+
+import argparse
+import collections
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import pytest
+
+import pytest_components as api
+import response_schemas as schemas
+
+GZIP_LEVEL = 6
+# What servers typically use for dynamic content.
+BROTLI_QUALITY = 5
+# Records of one response whose fields are measured.  Longer lists are
+# sampled evenly and the counts scaled up.
+FIELD_SAMPLE = 5000
+
+
+# # # # # # # # # #
+# Route Statistics #
+# # # # # # # # # #
+
+class FieldStats:
+    __slots__ = ('present', 'filled', 'bytes')
+
+    def __init__(self):
+        self.present = 0.0
+        self.filled = 0.0
+        self.bytes = 0.0
+
+class RouteStats:
+    """Sizes and field statistics of the responses of one route."""
+
+    def __init__(self, method, route, schema=None, named=None):
+        self.method = method
+        self.route = route
+        self.responses = 0
+        self.bytes = 0
+        self.maxBytes = 0
+        self.gzipBytes = 0
+        self.brotliBytes = 0
+        # Responses with a json body, and the records in them.
+        self.decoded = 0
+        self.items = 0
+        self.maxItems = 0
+        self.fields = {}
+        # field -> times the test code read it; None when unknown.
+        self.reads = None
+        # Field names that appear in the test code, used without reads.
+        self.named = named or set()
+        self.schemaFields = set(schema.fields) if schema is not None else set()
+
+    def add(self, content):
+        """Measure one response body (bytes)."""
+        self.responses += 1
+        self.bytes += len(content)
+        self.maxBytes = max(self.maxBytes, len(content))
+        if content:
+            self.gzipBytes += len(gzip.compress(content, GZIP_LEVEL))
+            if brotli is not None:
+                self.brotliBytes += len(brotli.compress(content,
+                    quality=BROTLI_QUALITY))
+        try:
+            body = json.loads(content.decode('utf-8-sig'))
+        except ValueError:
+            return
+        self.decoded += 1
+        records = body if isinstance(body, list) else [body]
+        self.items += len(records)
+        self.maxItems = max(self.maxItems, len(records))
+        step = max(1, len(records) // FIELD_SAMPLE)
+        sample = records[::step]
+        weight = len(records) / len(sample) if sample else 0
+        for record in sample:
+            if isinstance(record, dict):
+                self._addRecord(record, weight)
+
+    def _addRecord(self, record, weight):
+        for field, value in record.items():
+            stats = self.fields.get(field)
+            if stats is None:
+                stats = self.fields[field] = FieldStats()
+            stats.present += weight
+            if value is not None and value != '' and value != [] and \
+                    value != {}:
+                stats.filled += weight
+            # '"field":value,' as the api writes it, without spaces.
+            stats.bytes += weight * (len(json.dumps({ field: value },
+                ensure_ascii=False, separators=(',', ':')).encode('utf-8')) - 1)
+
+    def used(self, field):
+        if self.reads is not None:
+            return self.reads[field] > 0
+        return field in self.named
+
+    def summary(self):
+        """Return the statistics as a json-serializable dict."""
+        fieldBytes = sum(s.bytes for s in self.fields.values())
+        unread = sum(s.bytes for field, s in self.fields.items() \
+            if not self.used(field))
+        fields = []
+        for field, s in sorted(self.fields.items(), key=lambda f: -f[1].bytes):
+            fields.append({
+                'field': field,
+                'present': s.present / self.items if self.items else 0,
+                'filled': s.filled / self.items if self.items else 0,
+                'bytes_share': s.bytes / fieldBytes if fieldBytes else 0,
+                'reads': self.reads[field] if self.reads is not None else None,
+                'used': self.used(field),
+                'schema': field in self.schemaFields,
+            })
+        return {
+            'method': self.method,
+            'route': self.route,
+            'responses': self.responses,
+            'bytes': self.bytes,
+            'max_bytes': self.maxBytes,
+            'mean_bytes': self.bytes / self.responses,
+            'items': self.items,
+            'max_items': self.maxItems,
+            'bytes_per_item': self.bytes / self.items if self.items else None,
+            'gzip_ratio': self.gzipBytes / self.bytes if self.bytes else None,
+            'brotli_ratio': self.brotliBytes / self.bytes \
+                if self.bytes and brotli is not None else None,
+            'fields_used': sum(1 for f in fields if f['used']),
+            'unread_share': unread / fieldBytes if fieldBytes else None,
+            'fields': fields,
+        }
+
+class Payloads:
+    """RouteStats of every route seen, keyed by (method, route).
+
+    Args:
+        named (set): field names taken as used by the suite, when field
+            reads are not counted.
+    """
+
+    def __init__(self, named=None):
+        self.routes = {}
+        self.named = named
+        self._lock = threading.Lock()
+
+    def stats(self, method, url):
+        method = method.upper()
+        key = (method, api.routeTemplate(url, method))
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats(method, key[1],
+                    schemas.schemaFor(url, method), self.named)
+            return stats
+
+    def add(self, method, url, status, content):
+        if 200 <= status < 300:
+            self.stats(method, url).add(content)
+
+    def report(self):
+        """Return the summaries of every route, largest total bytes first."""
+        return [s.summary() for s in sorted(self.routes.values(),
+            key=lambda s: -s.bytes)]
+
+
+# # # # # # # # # # # # #
+# Live Runs of the Suite #
+# # # # # # # # # # # # #
+
+_reading = threading.local()
+
+class ReadRecord(dict):
+    """A decoded json record that counts which of its fields are read."""
+    __slots__ = ('_reads',)
+
+    def __init__(self, record, reads):
+        dict.__init__(self, record)
+        self._reads = reads
+
+    def _read(self, field):
+        if not getattr(_reading, 'paused', False):
+            self._reads[field] += 1
+
+    def __getitem__(self, field):
+        self._read(field)
+        return dict.__getitem__(self, field)
+
+    def get(self, field, default=None):
+        self._read(field)
+        return dict.get(self, field, default)
+
+    def __contains__(self, field):
+        self._read(field)
+        return dict.__contains__(self, field)
+
+def trackReads(body, reads):
+    """Return body with its records replaced by ReadRecords counting into
+    reads."""
+    if isinstance(body, dict):
+        return ReadRecord(body, reads)
+    if isinstance(body, list):
+        return [ReadRecord(item, reads) if isinstance(item, dict) else item \
+            for item in body]
+    return body
+
+class LiveCapture:
+    """pytest plugin that measures the responses of a run and counts the
+    fields tests read."""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self._restore = []
+
+    def _patch(self, owner, name, replacement):
+        self._restore.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _reads(self, method, url):
+        stats = self.payloads.stats(method, url)
+        if stats.reads is None:
+            stats.reads = collections.Counter()
+        return stats.reads
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_configure(self, config):
+        # conftest.py has set its schema check by now; measure first.
+        schemaCheck = api.responseCheck
+        capture = self
+
+        def measure(response):
+            capture.payloads.add(response.request.method, response.url,
+                response.status_code, response.content)
+            if schemaCheck is not None:
+                schemaCheck(response)
+        self._patch(api, 'responseCheck', measure)
+
+        decode = api.ApiResponse.json
+        def trackedJson(response, **kwargs):
+            body = decode(response, **kwargs)
+            if kwargs or not 200 <= response.status_code < 300:
+                return body
+            if not getattr(response, 'readsTracked', False):
+                response.readsTracked = True
+                response._json = trackReads(body, capture._reads(
+                    response.request.method, response.url))
+            return response._json
+        self._patch(api.ApiResponse, 'json', trackedJson)
+
+        chunks = api.StreamedResponse._chunks
+        def teeChunks(response):
+            body = response.__dict__.setdefault('capturedBody', bytearray())
+            for chunk in chunks(response):
+                body += chunk
+                yield chunk
+            response.captureComplete = True
+        self._patch(api.StreamedResponse, '_chunks', teeChunks)
+
+        items = api.StreamedResponse.items
+        def trackedItems(response, schema=None, limit=None):
+            reads = capture._reads('GET', response.response.url)
+            for item in items(response, schema, limit):
+                yield ReadRecord(item, reads) if isinstance(item, dict) \
+                    else item
+        self._patch(api.StreamedResponse, 'items', trackedItems)
+
+        streamedJson = api.StreamedResponse.json
+        def trackedStreamedJson(response):
+            return trackReads(streamedJson(response),
+                capture._reads('GET', response.response.url))
+        self._patch(api.StreamedResponse, 'json', trackedStreamedJson)
+
+        close = api.StreamedResponse.close
+        def measuredClose(response):
+            if not response._recorded:
+                body = bytes(response.__dict__.get('capturedBody', b''))
+                if response.response._content_consumed:
+                    # Read whole already, e.g. by a recording cassette.
+                    body = response.response.content
+                elif not response.__dict__.get('captureComplete'):
+                    # A test that stopped early: read the rest to size it.
+                    for _ in response._chunks():
+                        pass
+                    body = bytes(response.capturedBody)
+                capture.payloads.add('GET', response.response.url,
+                    response.response.status_code, body)
+            close(response)
+        self._patch(api.StreamedResponse, 'close', measuredClose)
+
+        checkRecords = schemas.Schema._check
+        def unreadCheck(schema, items, offset):
+            _reading.paused = True
+            try:
+                checkRecords(schema, items, offset)
+            finally:
+                _reading.paused = False
+        self._patch(schemas.Schema, '_check', unreadCheck)
+
+    def pytest_unconfigure(self, config):
+        while self._restore:
+            owner, name, original = self._restore.pop()
+            setattr(owner, name, original)
+
+def captureLive(pytestArgs):
+    """Run the suite with pytestArgs and measure its responses.
+
+    Returns:
+        (Payloads, int): the measurements and pytest's exit code.
+    """
+    payloads = Payloads()
+    exitCode = pytest.main(list(pytestArgs), plugins=[LiveCapture(payloads)])
+    return payloads, int(exitCode)
+
+
+# # # # # # # # # # # #
+# Recorded Cassettes  #
+# # # # # # # # # # # #
+
+# response['Field'], .get('Field') and 'Field' in ...
+FIELD_NAME = re.compile(r'''\[\s*['"]([A-Za-z_]\w*)['"]\s*\]'''
+    r'''|\.get\(\s*['"]([A-Za-z_]\w*)['"]'''
+    r'''|['"]([A-Za-z_]\w*)['"]\s+(?:not\s+)?in\b''')
+
+def namedFields(directory=os.path.dirname(os.path.abspath(__file__))):
+    """Return the field names the test files of directory look up."""
+    names = set()
+    for path in glob.glob(os.path.join(directory, 'test_*_pytest.py')):
+        with open(path, encoding='utf-8') as testFile:
+            for match in FIELD_NAME.finditer(testFile.read()):
+                names.update(name for name in match.groups() if name)
+    return names
+
+def captureCassette(path, payloads=None):
+    """Measure the 2xx responses stored in the cassette file path."""
+    payloads = payloads or Payloads(namedFields())
+    db = sqlite3.connect('file:{0}?mode=ro'.format(path), uri=True)
+    try:
+        rows = db.execute('SELECT method, url, status, body, compressed FROM '
+            'interactions ORDER BY recorded')
+        for method, url, status, body, compressed in rows:
+            if compressed:
+                body = zlib.decompress(body)
+            payloads.add(method, url, status, bytes(body))
+    finally:
+        db.close()
+    return payloads
+
+
+# # # # # # #
+# Printing  #
+# # # # # # #
+
+def _percent(value):
+    return '-' if value is None else '{0:.0%}'.format(value)
+
+def printReport(report, showFields):
+    print('{0:<7} {1:<52} {2:>5} {3:>9} {4:>7} {5:>7} {6:>5} {7:>5} {8:>7} '
+        '{9:>6}'.format('METHOD', 'ROUTE', 'CALLS', 'MAX KB', 'ITEMS',
+        'B/ITEM', 'GZIP', 'BR', 'USED', 'UNREAD'))
+    for r in report:
+        read = '{0}/{1}'.format(r['fields_used'], len(r['fields'])) \
+            if r['fields'] else '-'
+        print('{0:<7} {1:<52} {2:>5} {3:>9.1f} {4:>7} {5:>7} {6:>5} {7:>5} '
+            '{8:>7} {9:>6}'.format(r['method'], r['route'][:52],
+            r['responses'], r['max_bytes'] / 1024., r['max_items'],
+            '-' if r['bytes_per_item'] is None else \
+                int(round(r['bytes_per_item'])),
+            _percent(r['gzip_ratio']), _percent(r['brotli_ratio']), read,
+            _percent(r['unread_share'])))
+    print('GZIP and BR are compressed sizes as a share of the raw bytes; '
+        'UNREAD is the share of bytes in fields the suite does not use.')
+    if brotli is None:
+        print('Install the brotli package to measure brotli.')
+    if not showFields:
+        return
+    for r in report:
+        if not r['fields']:
+            continue
+        print()
+        print('{0} {1}: {2} items, {3} bytes per item'.format(r['method'],
+            r['route'], r['items'], '-' if r['bytes_per_item'] is None \
+                else int(round(r['bytes_per_item']))))
+        print('  {0:<32} {1:>8} {2:>7} {3:>6} {4:>6} {5:>5} {6:>6}'.format(
+            'FIELD', 'PRESENT', 'FILLED', 'BYTES', 'READS', 'USED', 'SCHEMA'))
+        for f in r['fields']:
+            print('  {0:<32} {1:>8} {2:>7} {3:>6} {4:>6} {5:>5} {6:>6}'\
+                .format(f['field'][:32], _percent(f['present']),
+                _percent(f['filled']), _percent(f['bytes_share']),
+                '-' if f['reads'] is None else f['reads'],
+                'yes' if f['used'] else '', 'yes' if f['schema'] else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    liveCommand = commands.add_parser('live',
+        help='run the test suite and measure its responses')
+    liveCommand.add_argument('pytestArgs', nargs=argparse.REMAINDER,
+        metavar='PYTEST_ARGS', help='arguments for pytest, after --')
+    cassetteCommand = commands.add_parser('cassette',
+        help='measure the responses recorded in cassettes')
+    cassetteCommand.add_argument('paths', nargs='+', metavar='PATH')
+    for command in (liveCommand, cassetteCommand):
+        command.add_argument('--json', default=None, metavar='PATH',
+            help='also write the report to PATH')
+        command.add_argument('--fields', action='store_true',
+            help='print the field statistics of every route')
+    args = parser.parse_args()
+
+    if args.command == 'live':
+        pytestArgs = args.pytestArgs
+        if pytestArgs[:1] == ['--']:
+            pytestArgs = pytestArgs[1:]
+        payloads, exitCode = captureLive(pytestArgs)
+        print()
+        if exitCode not in (0, 1):
+            print('pytest exited with {0}.'.format(exitCode))
+    elif args.command == 'cassette':
+        payloads = Payloads(namedFields())
+        for path in args.paths:
+            captureCassette(path, payloads)
+    else:
+        parser.print_help()
+        return 2
+
+    report = payloads.report()
+    if args.json:
+        with open(args.json, 'w') as jsonFile:
+            json.dump({ 'source': args.command, 'routes': report }, jsonFile,
+                indent=1)
+    printReport(report, args.fields)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
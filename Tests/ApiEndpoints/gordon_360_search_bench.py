@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+"""Benchmarks advanced people search across filter shapes and selectivities.
+
+Usage:
+    [python3] gordon_360_search_bench.py [--samples N] [--concurrency N]
+        [options]
+
+api/accounts/advanced-people-search filters the in-memory public student,
+faculty/staff and alumni accounts by up to eleven prefixes.  Its cost
+depends on which filters are set and how many people they leave, so the
+benchmark sends many searches of each filter shape (last name only, major
+and class, department, ...) and reports latency, rows and payload size per
+shape, ordered from the broadest to the narrowest.
+
+Filter values are the ones a person using the 360 UI would pick: majors,
+minors, halls, states, countries, departments and buildings come from the
+api/advanced-search lookups, class types from the UI's list, and name and
+hometown prefixes of several lengths from the people an unfiltered search
+returns.  The selectivity of a shape is the share of the searched population
+its searches return on average.
+
+Searches of all shapes are interleaved and sent by --concurrency workers,
+each waiting for its response before sending the next (closed loop), so the
+numbers compare shapes under the same load rather than measure the capacity
+of the server; use gordon_360_load.py for that.  The host and account come
+from test_gordon360_pytest.py and credentials.py, as for the test suite.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import quote
+
+import pytest_components_async as apiAsync
+import test_gordon360_pytest as control
+from latency_histogram import LatencyHistogram, summarize
+
+# Sent by the 360 UI for a filter left empty.
+EMPTY_FILTER = 'C\u266f'
+# Filters in the order of the route's path parameters.
+FILTERS = ('firstName', 'lastName', 'major', 'minor', 'hall', 'classType',
+    'hometown', 'state', 'country', 'department', 'building')
+# Filters whose values come from an api/advanced-search lookup.
+LOOKUPS = {
+    'major': 'majors',
+    'minor': 'minors',
+    'hall': 'halls',
+    'state': 'states',
+    'country': 'countries',
+    'department': 'departments',
+    'building': 'buildings',
+}
+# Filters matched as prefixes of these account fields, lower-cased.
+PREFIXES = {
+    'firstName': 'FirstName',
+    'lastName': 'LastName',
+    'hometown': 'HomeCity',
+}
+# The class types offered by the 360 UI.
+CLASS_TYPES = ['Freshman', 'Sophomore', 'Junior', 'Senior',
+    'Graduate Student']
+# People included by a search: (students, faculty and staff, alumni).
+PEOPLE = {
+    'everyone': (True, True, False),
+    'students': (True, False, False),
+    'facstaff': (False, True, False),
+}
+
+
+# # # # # # # # # # #
+# Search Requests   #
+# # # # # # # # # # #
+
+def encodeFilter(name, value):
+    """Return a filter value as the 360 UI puts it in the path.
+
+    AccountsController turns the spellings back into the characters IIS does
+    not accept in a path segment.
+    """
+    if not value:
+        return quote(EMPTY_FILTER, safe='')
+    if name in PREFIXES:
+        value = value.lower()
+    elif name == 'major':
+        for char, spelled in (('&', '_'), ('-', 'dash'), (':', 'colon'),
+                ('/', 'slash')):
+            value = value.replace(char, spelled)
+    elif name == 'department':
+        value = value.replace('&', '_')
+    elif name == 'building':
+        value = value.replace('.', '_')
+    return quote(value, safe='')
+
+def searchPath(filters, people='everyone'):
+    """Return the advanced people search path for some filters.
+
+    Args:
+        filters (dict): filter name (see FILTERS) -> value; missing filters
+            are left empty.
+        people (str): key of PEOPLE.
+
+    Returns:
+        str: path below hostURL.
+    """
+    flags = ['true' if include else 'false' for include in PEOPLE[people]]
+    return 'api/accounts/advanced-people-search/' + '/'.join(flags + \
+        [encodeFilter(name, filters.get(name)) for name in FILTERS])
+
+
+# # # # # # # # # #
+# Filter Shapes   #
+# # # # # # # # # #
+
+class Shape:
+    """A combination of filters the benchmark searches with.
+
+    Attributes:
+        name (str): label used in the report.
+        filters (tuple): the filters set, see FILTERS.
+        people (str): who is searched, a key of PEOPLE.
+        prefix (int): letters of name and hometown prefixes.
+    """
+
+    def __init__(self, name, filters, people='everyone', prefix=3):
+        self.name = name
+        self.filters = filters
+        self.people = people
+        self.prefix = prefix
+
+def shapes():
+    """Returns the filter shapes of the 360 people search page, from the
+    broadest to the narrowest."""
+    return [
+        Shape('no filter', ()),
+        Shape('students', (), 'students'),
+        Shape('faculty and staff', (), 'facstaff'),
+        Shape('last name, 1 letter', ('lastName',), prefix=1),
+        Shape('last name, 2 letters', ('lastName',), prefix=2),
+        Shape('last name, 4 letters', ('lastName',), prefix=4),
+        Shape('first name, 3 letters', ('firstName',)),
+        Shape('first and last name, 2 letters', ('firstName', 'lastName'),
+            prefix=2),
+        Shape('country', ('country',)),
+        Shape('state', ('state',)),
+        Shape('hometown and state', ('hometown', 'state'), prefix=4),
+        Shape('class', ('classType',), 'students'),
+        Shape('major', ('major',), 'students'),
+        Shape('minor', ('minor',), 'students'),
+        Shape('hall', ('hall',), 'students'),
+        Shape('major and class', ('major', 'classType'), 'students'),
+        Shape('hall and class', ('hall', 'classType'), 'students'),
+        Shape('major, hall and class', ('major', 'hall', 'classType'),
+            'students'),
+        Shape('department', ('department',), 'facstaff'),
+        Shape('building', ('building',), 'facstaff'),
+        Shape('department and last name', ('department', 'lastName'),
+            'facstaff', prefix=1),
+    ]
+
+class FilterValues:
+    """Draws realistic values for the filters of a shape."""
+
+    def __init__(self, lookups, people, rng):
+        """
+        Args:
+            lookups (dict): lookup name -> values, from api/advanced-search.
+            people (list of dict): accounts an unfiltered search returned.
+            rng (random.Random): source of the choices.
+        """
+        self.lookups = lookups
+        self.rng = rng
+        # Values of each prefix field, once per person who has one.
+        self.prefixes = { name: [p[field] for p in people if p.get(field)] \
+            for name, field in PREFIXES.items() }
+
+    def draw(self, shape):
+        """Return {filter: value} for one search of a shape."""
+        filters = {}
+        for name in shape.filters:
+            if name in LOOKUPS:
+                choices = self.lookups.get(LOOKUPS[name])
+            elif name == 'classType':
+                choices = CLASS_TYPES
+            else:
+                choices = [value[:shape.prefix] for value in \
+                    self.prefixes[name]]
+            if choices:
+                filters[name] = self.rng.choice(choices)
+        return filters
+
+
+# # # # # # # # #
+# Measurement   #
+# # # # # # # # #
+
+class ShapeResult:
+    """Outcome of every search of one shape."""
+
+    def __init__(self, shape, population):
+        self.shape = shape
+        self.population = population
+        self.latencies = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+        self.rows = 0
+        self.empty = 0
+        self.bytes = 0
+        self.maxBytes = 0
+
+    def add(self, latency, status, size, rows):
+        self.latencies.recordSeconds(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+            return
+        self.rows += rows
+        self.empty += rows == 0
+        self.bytes += size
+        self.maxBytes = max(self.maxBytes, size)
+
+    def addFailure(self, reason):
+        self.statuses[reason] = self.statuses.get(reason, 0) + 1
+        self.errors += 1
+
+    @property
+    def count(self):
+        return sum(self.statuses.values())
+
+    def summary(self):
+        answered = self.count - self.errors
+        meanRows = self.rows / answered if answered else 0
+        summary = {
+            'shape': self.shape.name,
+            'people': self.shape.people,
+            'filters': list(self.shape.filters),
+            'count': self.count,
+            'errors': self.errors,
+            'statuses': { str(k): v for k, v in self.statuses.items() },
+            'mean_rows': round(meanRows, 1),
+            'selectivity': round(meanRows / self.population, 4) \
+                if self.population else None,
+            'empty_rate': round(self.empty / answered, 4) if answered else 0,
+            'mean_bytes': round(self.bytes / answered) if answered else 0,
+            'max_bytes': self.maxBytes,
+        }
+        summary.update(summarize(self.latencies))
+        return summary
+
+
+# # # # # # # # # # # #
+# Benchmark Driver    #
+# # # # # # # # # # # #
+
+def _rows(response):
+    try:
+        found = response.json()
+    except ValueError:
+        return 0
+    return len(found) if isinstance(found, list) else 0
+
+async def prepare(session, host):
+    """Fetch the lookups and the unfiltered population of each PEOPLE.
+
+    Returns:
+        (dict, dict): lookup name -> values, and PEOPLE key -> the accounts
+        an unfiltered search of them returns.
+    """
+    lookupNames = sorted(set(LOOKUPS.values()))
+    responses = await apiAsync.getMany(session, [host + 'api/advanced-search/' \
+        + name for name in lookupNames] + [host + searchPath({}, people) \
+        for people in PEOPLE])
+    for response in responses:
+        if response.status_code != 200:
+            raise RuntimeError('{0} answered {1}'.format(response.url,
+                response.status_code))
+    lookups = { name: response.json() for name, response in \
+        zip(lookupNames, responses) }
+    populations = { people: response.json() for people, response in \
+        zip(PEOPLE, responses[len(lookupNames):]) }
+    return lookups, populations
+
+async def searchOne(session, url, result, timeout):
+    start = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(apiAsync.get(session, url), timeout)
+    except asyncio.TimeoutError:
+        result.addFailure('timeout')
+        return
+    except Exception as e:
+        result.addFailure(type(e).__name__)
+        return
+    result.add(time.perf_counter() - start, response.status_code,
+        len(response.content), _rows(response))
+
+async def benchmark(args, selected):
+    session = await apiAsync.createAuthorizedSession(args.host,
+        control.username, control.password)
+    lookups, populations = await prepare(session, args.host)
+    rng = random.Random(args.seed)
+    values = FilterValues(lookups, populations['everyone'], rng)
+    results = { shape.name: ShapeResult(shape, len(populations[shape.people])) \
+        for shape in selected }
+    jobs = [(shape, searchPath(values.draw(shape), shape.people)) \
+        for shape in selected for _ in range(args.samples)]
+    rng.shuffle(jobs)
+    # Untimed searches of every shape first, so no shape pays for warming
+    # the server up.
+    warmup = [(shape, searchPath(values.draw(shape), shape.people)) \
+        for shape in selected for _ in range(args.warmup)]
+
+    async def worker(queue, record):
+        while queue:
+            shape, path = queue.pop()
+            await searchOne(session, args.host + path,
+                results[shape.name] if record else ShapeResult(shape, 0),
+                args.timeout)
+
+    for queue, record in ((warmup, False), (jobs, True)):
+        await asyncio.gather(*(worker(queue, record) \
+            for _ in range(args.concurrency)))
+    return results, { people: len(found) for people, found in \
+        populations.items() }
+
+def printReport(report):
+    print('Searched {0} as {1}; population: {2}.'.format(report['hostURL'],
+        control.username, ', '.join('{0} {1}'.format(n, people) for \
+        people, n in report['population'].items())))
+    print('{0:<34} {1:>6} {2:>6} {3:>8} {4:>7} {5:>8} {6:>8} {7:>8} {8:>8} '
+        '{9:>8}'.format('SHAPE', 'COUNT', 'ERRORS', 'ROWS', 'SELECT',
+        'EMPTY', 'KB', 'P50 ms', 'P95 ms', 'P99 ms'))
+    fmt = lambda v: '{0:8.1f}'.format(v) if v is not None else '{0:>8}'.format('-')
+    for s in report['shapes']:
+        print('{0:<34} {1:>6} {2:>6} {3:>8.1f} {4:>7} {5:>8.1%} {6:>8.1f} {7} '
+            '{8} {9}'.format(s['shape'][:34], s['count'], s['errors'],
+            s['mean_rows'], '{0:.1%}'.format(s['selectivity']) \
+            if s['selectivity'] is not None else '-', s['empty_rate'],
+            s['mean_bytes'] / 1024, fmt(s['p50_ms']), fmt(s['p95_ms']),
+            fmt(s['p99_ms'])))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=control.hostURL,
+        help='base url of the api (default: hostURL of the test suite)')
+    parser.add_argument('--samples', type=int, default=50,
+        help='searches per filter shape (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=2,
+        help='untimed searches per filter shape (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4,
+        help='searches in flight at once (default: %(default)s)')
+    parser.add_argument('--shapes', default=None,
+        help='comma separated shape names to restrict the run to')
+    parser.add_argument('--timeout', type=float, default=60.0,
+        help='seconds before a search counts as failed (default: '
+             '%(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for the filter values and search order')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='also write the report to PATH as json')
+    args = parser.parse_args()
+    if not args.host.endswith('/'):
+        args.host += '/'
+
+    selected = shapes()
+    if args.shapes:
+        wanted = set(args.shapes.split(','))
+        selected = [shape for shape in selected if shape.name in wanted]
+        if not selected:
+            parser.error('no known shape in --shapes')
+
+    apiAsync.ASYNC_POOL_SIZE = max(args.concurrency, 1)
+    start = time.monotonic()
+    try:
+        results, population = apiAsync.run(benchmark(args, selected))
+    finally:
+        apiAsync.close()
+    report = {
+        'hostURL': args.host,
+        'duration_s': round(time.monotonic() - start, 3),
+        'samples': args.samples,
+        'concurrency': args.concurrency,
+        'population': population,
+        'shapes': sorted((result.summary() for result in results.values()),
+            key=lambda s: -(s['selectivity'] or 0)),
+    }
+    printReport(report)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+
+"""Runs the Gordon 360 API at a steady rate for hours and flags drift.
+
+Usage:
+    [python3] gordon_360_soak.py [--duration SECONDS] [--window SECONDS]
+        [--rate N] [options]
+
+A soak run sends the GET mix of gordon_360_load.py open-loop at --rate
+requests per second and, alongside it, repeats create/read/delete cycles on
+resources the suite already writes: a guest membership in the AJG activity
+and a custom myschedule event.  Each cycle deletes what it created, so a
+healthy server ends the run in the state it started in.
+
+Results are cut into windows of --window seconds.  For every endpoint and
+cycle step a window keeps the latency percentiles, the error rate and the
+mean response size.  At the end (and after every window when --output is
+given, so a crashed run still leaves its data) each of those series is run
+through a Mann-Kendall trend test.  A series is flagged when it rises
+monotonically with significance --alpha, corrected for the number of series
+tested, and the rise over the run, estimated by Sen's slope, is at least
+--min-change (--min-error-change for error rates).  Slowly growing caches or
+connection registries on the server show up this way long before they run
+it out of memory.
+
+Interrupt the run with Ctrl-C to stop early; the windows finished so far
+are still analysed.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import signal
+import statistics
+import sys
+import time
+
+import gordon_360_load as load
+import pytest_components as api
+import pytest_components_async as apiAsync
+import test_gordon360_pytest as control
+from latency_histogram import LatencyHistogram, summarize
+
+# Seconds between checks that the bearer tokens are still fresh.
+TOKEN_CHECK_INTERVAL = 60
+
+
+# # # # # # # # #
+# Windows       #
+# # # # # # # # #
+
+class SeriesWindow:
+    """Requests made to one endpoint or cycle step within one window."""
+
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def add(self, latency, status, size):
+        self.latencies.recordSeconds(latency)
+        self.count += 1
+        self.bytes += size
+        if status >= 400:
+            self.errors += 1
+
+    def addFailure(self):
+        self.count += 1
+        self.errors += 1
+
+    def summary(self):
+        summary = {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.count, 4) \
+                if self.count else 0.0,
+            'mean_bytes': round(self.bytes / (self.count - self.errors), 1) \
+                if self.count > self.errors else None,
+        }
+        summary.update(summarize(self.latencies))
+        del summary['histogram']
+        return summary
+
+class Window:
+    """Everything recorded between two window boundaries."""
+
+    def __init__(self, start):
+        self.start = start
+        self.series = {}
+
+    def get(self, name):
+        window = self.series.get(name)
+        if window is None:
+            window = self.series[name] = SeriesWindow()
+        return window
+
+    def summary(self, runStart, end):
+        total = SeriesWindow()
+        for window in self.series.values():
+            total.latencies.merge(window.latencies)
+            total.count += window.count
+            total.errors += window.errors
+            total.bytes += window.bytes
+        return {
+            'start_s': round(self.start - runStart, 1),
+            'end_s': round(end - runStart, 1),
+            'all': total.summary(),
+            'series': { name: window.summary() for name, window \
+                in sorted(self.series.items()) },
+        }
+
+
+# # # # # # # # # # #
+# Trend Detection   #
+# # # # # # # # # # #
+
+class Metric:
+    """A per-window value whose steady rise counts as degradation.
+
+    Attributes:
+        key (str): field of a window summary.
+        label (str): name used in the report.
+        relative (bool): whether the rise is measured relative to the
+            series' median and held to --min-change (latency, size), or
+            taken as is and held to --min-error-change (rates, which are
+            already fractions).
+    """
+
+    def __init__(self, key, label, relative):
+        self.key = key
+        self.label = label
+        self.relative = relative
+
+METRICS = (
+    Metric('p50_ms', 'p50 latency', True),
+    Metric('p90_ms', 'p90 latency', True),
+    Metric('error_rate', 'error rate', False),
+    Metric('mean_bytes', 'response size', True),
+)
+
+def mannKendall(values):
+    """Mann-Kendall test for a monotonic upward trend.
+
+    Args:
+        values (list of float): one value per window, in time order.
+
+    Returns:
+        (float, float): the normal score Z of the S statistic (corrected for
+        ties and continuity) and the one-sided p-value of a rising trend.
+    """
+    n = len(values)
+    s = 0
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            s += (values[j] > values[i]) - (values[j] < values[i])
+    ties = {}
+    for value in values:
+        ties[value] = ties.get(value, 0) + 1
+    variance = (n * (n - 1) * (2 * n + 5) - sum(t * (t - 1) * (2 * t + 5) \
+        for t in ties.values())) / 18.0
+    if variance <= 0:
+        return 0.0, 1.0
+    if s > 0:
+        z = (s - 1) / math.sqrt(variance)
+    elif s < 0:
+        z = (s + 1) / math.sqrt(variance)
+    else:
+        z = 0.0
+    return z, 0.5 * math.erfc(z / math.sqrt(2))
+
+def sensSlope(values):
+    """Median slope over every pair of windows, in units per window."""
+    slopes = [(values[j] - values[i]) / (j - i) \
+        for i in range(len(values) - 1) for j in range(i + 1, len(values))]
+    return statistics.median(slopes) if slopes else 0.0
+
+def findDrift(windows, alpha, minChange, minErrorChange, minCount,
+        minWindows):
+    """Test every series of every metric for a rising trend.
+
+    Args:
+        windows (list of dict): window summaries in time order.
+        alpha (float): family-wise significance level; each of the tests
+            run is held to alpha divided by the number of tests.
+        minChange (float): smallest rise over the run worth flagging, as a
+            fraction of the median, for relative metrics.
+        minErrorChange (float): smallest rise over the run worth flagging
+            for the other metrics.
+        minCount (int): windows with fewer requests to a series than this
+            are left out of its latency and size values.
+        minWindows (int): series with fewer usable windows are not tested.
+
+    Returns:
+        list of dict: one entry per series and metric tested, flagged ones
+        carrying 'drift': True, most significant first.
+    """
+    names = sorted({ name for window in windows for name in window['series'] })
+    candidates = []
+    for name in ['all'] + names:
+        for metric in METRICS:
+            values = []
+            for window in windows:
+                summary = window['all'] if name == 'all' else \
+                    window['series'].get(name)
+                if summary is None or summary['count'] == 0:
+                    continue
+                if metric.relative and summary['count'] < minCount:
+                    continue
+                if summary[metric.key] is not None:
+                    values.append(summary[metric.key])
+            if len(values) >= minWindows:
+                candidates.append((name, metric, values))
+
+    threshold = alpha / max(len(candidates), 1)
+    results = []
+    for name, metric, values in candidates:
+        z, p = mannKendall(values)
+        rise = sensSlope(values) * (len(values) - 1)
+        median = statistics.median(values)
+        if metric.relative:
+            change = rise / median if median > 0 else \
+                (math.inf if rise > 0 else 0.0)
+        else:
+            change = rise
+        results.append({
+            'series': name,
+            'metric': metric.label,
+            'windows': len(values),
+            'first': values[0],
+            'last': values[-1],
+            'median': median,
+            'rise': round(rise, 4),
+            'change': round(change, 4) if math.isfinite(change) else None,
+            'z': round(z, 3),
+            'p': p,
+            'drift': p < threshold and change >= \
+                (minChange if metric.relative else minErrorChange),
+        })
+    results.sort(key=lambda result: result['p'])
+    return results
+
+
+# # # # # # # # # # #
+# Soak Driver       #
+# # # # # # # # # # #
+
+class Soak:
+    """Shared state of a running soak: the windows and orphaned resources."""
+
+    def __init__(self, args):
+        self.args = args
+        self.start = time.monotonic()
+        self.measureFrom = self.start + args.warmup
+        self.window = Window(self.measureFrom)
+        self.windows = []
+        self.orphans = []
+        self.stopping = asyncio.Event()
+
+    def record(self, name, started, response):
+        if time.monotonic() < self.measureFrom:
+            return
+        self.window.get(name).add(time.monotonic() - started,
+            response.status_code, len(response.content))
+
+    def recordFailure(self, name):
+        if time.monotonic() >= self.measureFrom:
+            self.window.get(name).addFailure()
+
+    def closeWindow(self, now):
+        summary = self.window.summary(self.measureFrom, now)
+        self.windows.append(summary)
+        self.window = Window(now)
+        return summary
+
+    def report(self):
+        args = self.args
+        return {
+            'hostURL': args.host,
+            'target_rps': args.rate,
+            'cycle_interval_s': args.cycle_interval,
+            'window_s': args.window,
+            'warmup_s': args.warmup,
+            'windows': self.windows,
+            'orphans': self.orphans,
+            'trends': findDrift(self.windows, args.alpha, args.min_change,
+                args.min_error_change, args.min_count, args.min_windows),
+        }
+
+async def timed(soak, name, request, timeout):
+    """Send one request and record it under name; returns the response,
+    or None when it failed to complete."""
+    started = time.monotonic()
+    try:
+        response = await asyncio.wait_for(request, timeout)
+    except Exception:
+        soak.recordFailure(name)
+        return None
+    soak.record(name, started, response)
+    return response
+
+async def readLoop(soak, sessions, endpoints):
+    args = soak.args
+    rng = random.Random(args.seed)
+    weights = [endpoint.weight for endpoint in endpoints]
+    pending = set()
+    for offset in load.arrivalOffsets(args.rate, args.duration, False, rng):
+        scheduled = soak.start + offset
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(soak.stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        if soak.stopping.is_set():
+            break
+        endpoint = rng.choices(endpoints, weights)[0]
+        if len(pending) >= args.max_outstanding:
+            soak.recordFailure(endpoint.name)
+            continue
+        task = asyncio.ensure_future(sendRead(soak, sessions[endpoint.account],
+            endpoint, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+
+async def sendRead(soak, session, endpoint, scheduled):
+    # Latency counts from the scheduled arrival, as in gordon_360_load.py.
+    try:
+        response = await asyncio.wait_for(apiAsync.get(session,
+            soak.args.host + endpoint.path), soak.args.timeout)
+    except Exception:
+        soak.recordFailure(endpoint.name)
+        return
+    soak.record(endpoint.name, scheduled, response)
+
+async def membershipCycle(soak, session):
+    """Create a guest membership in AJG, read it back and delete it."""
+    args = soak.args
+    url = args.host + 'api/memberships/'
+    response = await timed(soak, 'cycle membership POST',
+        apiAsync.postAsJson(session, url, {
+            'ACT_CDE': control.activity_code_AJG,
+            'SESS_CDE': control.session_code,
+            'ID_NUM': control.valid_id_number,
+            'PART_CDE': 'GUEST',
+            'BEGIN_DTE': '06/10/2016',
+            'END_DTE': '07/16/2016',
+            'COMMENT_TXT': control.comments,
+        }), args.timeout)
+    if response is None or response.status_code != 201:
+        return
+    membershipID = response.json()['MEMBERSHIP_ID']
+    await timed(soak, 'cycle membership GET',
+        apiAsync.get(session, url + str(membershipID) + '/'), args.timeout)
+    response = await timed(soak, 'cycle membership DELETE',
+        apiAsync.delete(session, url + str(membershipID)), args.timeout)
+    if response is None or response.status_code != 200:
+        soak.orphans.append({ 'resource': 'api/memberships/',
+            'id': membershipID })
+
+async def myscheduleCycle(soak, session):
+    """Create a custom myschedule event, read it back and delete it."""
+    args = soak.args
+    url = args.host + 'api/myschedule/'
+    response = await timed(soak, 'cycle myschedule POST',
+        apiAsync.postAsJson(session, url, {
+            'GORDON_ID': str(control.my_id_number),
+            'LOCATION': control.location,
+            'DESCRIPTION': control.description,
+            'TUE_CDE': 'T',
+            'IS_ALLDAY': 1,
+        }), args.timeout)
+    if response is None or response.status_code != 201:
+        return
+    eventID = str(response.json()['EVENT_ID'])
+    await timed(soak, 'cycle myschedule GET',
+        apiAsync.get(session, url + 'event/' + eventID + '/'), args.timeout)
+    response = await timed(soak, 'cycle myschedule DELETE',
+        apiAsync.delete(session, url + eventID), args.timeout)
+    if response is None or response.status_code != 200:
+        soak.orphans.append({ 'resource': 'api/myschedule/', 'id': eventID })
+
+async def cycleLoop(soak, cycle, session, phase):
+    """Repeat one create/read/delete cycle every --cycle-interval seconds.
+
+    Cycles of one kind never overlap: they create the same resource, which
+    the API rejects as a duplicate while the previous one still exists.
+    """
+    interval = soak.args.cycle_interval
+    due = soak.start + phase * interval
+    end = soak.start + soak.args.duration
+    while not soak.stopping.is_set() and due < end:
+        try:
+            await asyncio.wait_for(soak.stopping.wait(),
+                max(due - time.monotonic(), 0))
+            break
+        except asyncio.TimeoutError:
+            pass
+        await cycle(soak, session)
+        due = max(due + interval, time.monotonic())
+
+async def windowLoop(soak, progress):
+    args = soak.args
+    boundary = soak.measureFrom + args.window
+    end = soak.start + args.duration
+    while boundary <= end:
+        try:
+            await asyncio.wait_for(soak.stopping.wait(),
+                max(boundary - time.monotonic(), 0))
+            return
+        except asyncio.TimeoutError:
+            pass
+        summary = soak.closeWindow(boundary)
+        progress(summary)
+        if args.output:
+            writeReport(soak.report(), args.output)
+        boundary += args.window
+
+async def refreshTokens(soak, sessions):
+    """Keep the authorized sessions' bearer tokens fresh for the whole run;
+    the token cache re-issues them shortly before they expire."""
+    accounts = {
+        'student': (control.username, control.password),
+        'leader': (control.leader_username, control.leader_password),
+    }
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await asyncio.wait_for(soak.stopping.wait(), TOKEN_CHECK_INTERVAL)
+            return
+        except asyncio.TimeoutError:
+            pass
+        for account, (username, password) in accounts.items():
+            try:
+                syncSession = await loop.run_in_executor(None,
+                    api.tokenCache.getSession, soak.args.host, username,
+                    password)
+            except Exception:
+                continue
+            sessions[account].headers['Authorization'] = \
+                syncSession.headers['Authorization']
+
+async def drive(args, endpoints, progress):
+    sessions = {
+        'student': await apiAsync.createAuthorizedSession(args.host,
+            control.username, control.password),
+        'leader': await apiAsync.createAuthorizedSession(args.host,
+            control.leader_username, control.leader_password),
+        'guest': await apiAsync.createGuestSession(),
+    }
+    soak = Soak(args)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, soak.stopping.set)
+    except (NotImplementedError, RuntimeError):
+        pass
+    refresher = asyncio.ensure_future(refreshTokens(soak, sessions))
+    loops = [readLoop(soak, sessions, endpoints), windowLoop(soak, progress)]
+    if args.cycle_interval > 0:
+        loops.append(cycleLoop(soak, membershipCycle, sessions['leader'], 0))
+        loops.append(cycleLoop(soak, myscheduleCycle, sessions['student'],
+            0.5))
+    try:
+        await asyncio.gather(*loops)
+    finally:
+        soak.stopping.set()
+        await refresher
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return soak
+
+
+# # # # # # # # #
+# Reporting     #
+# # # # # # # # #
+
+def writeReport(report, path):
+    with open(path, 'w') as outputFile:
+        json.dump(report, outputFile, indent=1)
+
+def printWindow(summary):
+    s = summary['all']
+    fmt = lambda v: '{0:8.1f}'.format(v) if v is not None else \
+        '{0:>8}'.format('-')
+    print('[{0:>8}] {1:>7} requests, errors {2:6.2%}, p50 {3} ms, p90 {4} '
+        'ms, p99 {5} ms, {6:>9} bytes/response'.format(
+        time.strftime('%H:%M:%S', time.gmtime(summary['end_s'])), s['count'],
+        s['error_rate'], fmt(s['p50_ms']), fmt(s['p90_ms']), fmt(s['p99_ms']),
+        '-' if s['mean_bytes'] is None else '{0:.0f}'.format(s['mean_bytes'])))
+    sys.stdout.flush()
+
+def printDrift(report, args):
+    trends = report['trends']
+    flagged = [t for t in trends if t['drift']]
+    print('\n{0} windows of {1:g}s, {2} series tested for rising trends '
+        '(family-wise alpha {3:g}, minimum change {4:g}, error rate '
+        '{5:g}).'.format(len(report['windows']), args.window, len(trends),
+        args.alpha, args.min_change, args.min_error_change))
+    if report['orphans']:
+        print('{0} created resources could not be deleted: {1}'.format(
+            len(report['orphans']), ', '.join(o['resource'] + str(o['id']) \
+            for o in report['orphans'][:20])))
+    if not trends:
+        print('Too few windows to test; run for at least {0} windows.'.format(
+            args.min_windows))
+        return
+    if not flagged:
+        print('No monotonic degradation found.')
+        return
+    print('{0:<50} {1:<14} {2:>10} {3:>10} {4:>9} {5:>8} {6:>9}'.format(
+        'DRIFTING SERIES', 'METRIC', 'FIRST', 'LAST', 'CHANGE', 'Z', 'P'))
+    for t in flagged:
+        print('{0:<50} {1:<14} {2:>10.4g} {3:>10.4g} {4:>9} {5:>8.2f} '
+            '{6:>9.2g}'.format(t['series'][:50], t['metric'], t['first'],
+            t['last'], '+{0:.4g}'.format(t['rise']) if t['change'] is None \
+            else '{0:+.1%}'.format(t['change']), t['z'], t['p']))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=control.hostURL,
+        help='base url of the api (default: hostURL of the test suite)')
+    parser.add_argument('--duration', type=float, default=4 * 3600.0,
+        help='seconds to run for (default: %(default)s)')
+    parser.add_argument('--window', type=float, default=300.0,
+        help='seconds per analysis window (default: %(default)s)')
+    parser.add_argument('--warmup', type=float, default=60.0,
+        help='seconds at the start left out of every window '
+             '(default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=5.0,
+        help='GET requests per second (default: %(default)s)')
+    parser.add_argument('--endpoints', default=None,
+        help='comma separated endpoint names to restrict the GET mix to')
+    parser.add_argument('--cycle-interval', type=float, default=10.0,
+        help='seconds between create/read/delete cycles of each resource, '
+             '0 for none (default: %(default)s)')
+    parser.add_argument('--alpha', type=float, default=0.05,
+        help='family-wise significance of the trend tests '
+             '(default: %(default)s)')
+    parser.add_argument('--min-change', type=float, default=0.1,
+        help='smallest relative rise in latency or response size over the '
+             'run that is flagged (default: %(default)s)')
+    parser.add_argument('--min-error-change', type=float, default=0.01,
+        help='smallest rise in error rate over the run that is flagged '
+             '(default: %(default)s)')
+    parser.add_argument('--min-count', type=int, default=20,
+        help='requests a series needs in a window for its latency and size '
+             'to count (default: %(default)s)')
+    parser.add_argument('--min-windows', type=int, default=8,
+        help='usable windows a series needs to be tested '
+             '(default: %(default)s)')
+    parser.add_argument('--connections', type=int,
+        default=apiAsync.ASYNC_POOL_SIZE,
+        help='maximum open connections (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=30.0,
+        help='seconds before a request counts as failed (default: '
+             '%(default)s)')
+    parser.add_argument('--max-outstanding', type=int, default=1000,
+        help='in-flight GETs beyond which arrivals count as failed '
+             '(default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for the endpoint choice')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='write the report to PATH as json after every window')
+    args = parser.parse_args()
+    if not args.host.endswith('/'):
+        args.host += '/'
+    if args.window <= 0 or args.rate <= 0:
+        parser.error('--window and --rate must be positive')
+
+    endpoints = load.catalogue()
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        endpoints = [e for e in endpoints if e.name in wanted]
+        if not endpoints:
+            parser.error('no known endpoint in --endpoints')
+
+    apiAsync.ASYNC_POOL_SIZE = args.connections
+    try:
+        soak = apiAsync.run(drive(args, endpoints, printWindow))
+    finally:
+        apiAsync.close()
+    report = soak.report()
+    if args.output:
+        writeReport(report, args.output)
+    printDrift(report, args)
+    return 1 if any(t['drift'] for t in report['trends']) or \
+        report['orphans'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
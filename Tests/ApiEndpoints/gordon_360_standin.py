@@ -0,0 +1,1627 @@
+#!/usr/bin/env python3
+
+"""Serves a local stand-in for the Gordon 360 API.
+
+Usage:
+    [python3] gordon_360_standin.py [--host ADDRESS] [--port PORT]
+        [--dataset PATH] [--events-feed URL] [--verbose]
+
+The stand-in implements /token and the api routes the endpoint suite
+exercises, answering from the records in standin_fixtures.py: accounts,
+activities, memberships and membership requests, myschedule events,
+schedule privacy, wellness answers and so on.  Writes (new memberships,
+requests, events, wellness answers, ...) change its in-memory copy and are
+lost when it stops.  Guests get the same 401 AUTHORIZATION_DENIED message as
+the real api, and site admins (360.FacultyTest) may do anything.
+
+Any password is accepted for the fixture accounts, so a credentials.py for
+the stand-in only needs the fixture usernames and ids:
+
+    username = '360.StudentTest', id_number = 999999097
+    username_activity_leader = '360.FacultyTest',
+    id_number_activity_leader = 999999098
+
+Point the suite, the load generator or a benchmark at it with
+
+    GORDON360_HOST_URL=http://127.0.0.1:8360/ python -m pytest
+
+With --dataset it serves a production-sized dataset generated by
+standin_dataset.py instead, which keeps the fixtures and adds tens of
+thousands of accounts, memberships, events and so on around them.  With
+--events-feed the api/events routes serve the events of a 25Live feed from
+standin_25live.py instead, reloaded every --events-refresh seconds as the
+api reloads its copy of 25Live.
+
+Every connection is kept alive and served by its own thread, and each
+response goes out in a single write, so it keeps up with the load generator
+on a laptop or CI box without any outside services.
+"""
+
+import argparse
+import contextlib
+import datetime
+import email.utils
+import json
+import re
+import secrets
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import standin_25live as live
+import standin_dataset as dataset
+import standin_fixtures as data
+
+AUTHORIZATION_DENIED = 'Authorization has been denied for this request.'
+# Seconds a bearer token stays valid: 365 days, as AccessTokenExpireTimeSpan
+# in Gordon360/Startup.cs.
+TOKEN_LIFETIME = 365 * 24 * 60 * 60
+# A 1x1 png for the profile image endpoints.
+PLACEHOLDER_IMAGE = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42' \
+    'mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+
+
+class HttpError(Exception):
+    """Ends a request with an error status and a {'Message': ...} body."""
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+        self.message = message
+
+def unauthorized():
+    return HttpError(401, AUTHORIZATION_DENIED)
+
+def notFound(what):
+    return HttpError(404, what + ' was not found.')
+
+
+# # # # # # #
+# Routing   #
+# # # # # # #
+
+_routes = {}
+
+def route(method, template, anonymous=False):
+    """Registers the decorated function as the handler of a route.
+
+    Args:
+        method (str): HTTP verb.
+        template (str): path below the host, e.g.
+            'api/memberships/activity/{id}/leaders'.  '{name:int}' only
+            matches digits, like an int route parameter in the api.
+        anonymous (bool): whether guests may call it.
+    """
+    segments = template.strip('/').split('/')
+
+    def register(handler):
+        _routes.setdefault(len(segments), []).append(
+            (method, segments, handler, anonymous))
+        return handler
+    return register
+
+def _matchSegments(segments, path):
+    params = {}
+    for template, segment in zip(segments, path):
+        if template.startswith('{'):
+            name, _, kind = template[1:-1].partition(':')
+            if kind == 'int':
+                if not segment.lstrip('-').isdigit():
+                    return None
+                segment = int(segment)
+            params[name] = segment
+        elif template.lower() != segment.lower():
+            return None
+    return params
+
+def matchRoute(method, path):
+    """Returns (handler, params, anonymous) for a request.
+
+    Literal segments win over parameters, leftmost first, so
+    'api/activities/open' is not taken for 'api/activities/{id}'.
+
+    Raises:
+        HttpError: 404 when no route matches the path, 405 when routes match
+            it but none for this method.
+    """
+    segments = [unquote(segment) for segment in path.split('/') if segment]
+    candidates = []
+    methods = set()
+    for routeMethod, template, handler, anonymous in \
+            _routes.get(len(segments), []):
+        params = _matchSegments(template, segments)
+        if params is None:
+            continue
+        methods.add(routeMethod)
+        if routeMethod == method:
+            rank = [segment.startswith('{') for segment in template]
+            candidates.append((rank, handler, params, anonymous))
+    if not candidates:
+        if methods:
+            raise HttpError(405, 'The requested resource does not support '
+                'http method \'{0}\'.'.format(method))
+        raise HttpError(404, 'No HTTP resource was found that matches the '
+            'request URI \'{0}\'.'.format(path))
+    _, handler, params, anonymous = min(candidates, key=lambda c: c[0])
+    return handler, params, anonymous
+
+
+# # # # # # # # #
+# Server State  #
+# # # # # # # # #
+
+class ReadWriteLock:
+    """Lets any number of readers in at once, or one writer alone.  A
+    waiting writer keeps new readers out, so a stream of GETs cannot starve
+    a POST."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writersWaiting = 0
+
+    @contextlib.contextmanager
+    def reading(self):
+        with self._condition:
+            while self._writing or self._writersWaiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def writing(self):
+        with self._condition:
+            self._writersWaiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writersWaiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+class StandInState:
+    """The stand-in's copy of the database, shared by every request.
+
+    GET handlers only read it (the caches Rows fills in as it is read are
+    safe to fill from several threads), so they run side by side under
+    lock.reading(); every other method changes it and runs alone under
+    lock.writing().
+    """
+
+    def __init__(self, fixtures=None):
+        self.lock = ReadWriteLock()
+        self.data = fixtures or data.fixtures()
+        for name in dataset.TABLES:
+            self.data[name] = dataset.records(self.data.get(name, []))
+        self.tokens = {}
+        self.housingAdmins = set()
+        self.applications = {}
+        self.wellness = {}
+        self.started = datetime.datetime.now().replace(microsecond=0)
+        self.accountsById = self.data['accounts'].indexBy('ID')
+        self.accountsByUsername = self.data['accounts'].indexBy('ADUserName',
+            str.lower)
+        self.activities = self.data['activities'].indexBy('ActivityCode')
+        self.sessions = { s['SessionCode']: s for s in self.data['sessions'] }
+        # Events of a 25Live feed (see followEventsFeed), or None to serve
+        # the 'events' records.
+        self.liveEvents = None
+
+    def loadEventsFeed(self, source):
+        """Replace the served events with those of a 25Live feed.
+
+        Args:
+            source (str): url or path of the feed xml.
+        """
+        if '://' in source:
+            with urllib.request.urlopen(source) as response:
+                events = live.parseFeed(response)
+        else:
+            events = live.parseFeed(source)
+        self.liveEvents = events
+
+    def followEventsFeed(self, source, interval):
+        """Load a 25Live feed now and again every `interval` seconds on a
+        background thread, as Startup.cs refreshes Data.AllEvents.  A failed
+        load keeps the events already loaded, so the feed may come up after
+        the stand-in."""
+
+        def refresh():
+            while True:
+                try:
+                    self.loadEventsFeed(source)
+                except Exception as e:
+                    print('Could not load the events feed: {0!r}'.format(e),
+                        file=sys.stderr)
+                time.sleep(interval)
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def nextID(self, records, key):
+        return max([int(value) for value in records.values(key)] or [0]) + 1
+
+    # Lookups
+
+    def account(self, idNumber):
+        account = self.accountsById.get(idNumber)
+        if account is None:
+            raise notFound('Account {0}'.format(idNumber))
+        return account
+
+    def accountByUsername(self, username):
+        account = self.accountsByUsername.get(str(username).lower())
+        if account is None:
+            raise notFound('Account ' + str(username))
+        return account
+
+    def activity(self, code):
+        activity = self.activities.get(str(code).upper())
+        if activity is None:
+            raise notFound('Activity ' + str(code))
+        return activity
+
+    def session(self, code):
+        session = self.sessions.get(str(code))
+        if session is None:
+            raise notFound('Session ' + str(code))
+        return session
+
+    def currentSession(self):
+        now = datetime.datetime.now().isoformat()
+        started = [s for s in self.data['sessions'] \
+            if s['SessionBeginDate'] <= now]
+        return started[-1] if started else self.data['sessions'][0]
+
+    def isAdmin(self, account):
+        return account is not None and any(admin['ID_NUM'] == account['ID'] \
+            for admin in self.data['admins'])
+
+    def isGroupAdmin(self, account, activityCode):
+        return account is not None and any(m['GRP_ADMIN'] or \
+            m['PART_CDE'] in data.LEADER_PARTICIPATION for m in \
+            self.memberships(ID_NUM=account['ID'], ACT_CDE=activityCode))
+
+    # Views
+
+    def activityView(self, activity, privacy=True):
+        view = { key: value for key, value in activity.items() \
+            if key != 'Sessions' }
+        if not privacy:
+            # The per-session listing does not join the privacy flag.
+            view['Privacy'] = None
+        return view
+
+    def activityRunsIn(self, activity, sessionCode):
+        return activity['Sessions'] is None or \
+            sessionCode in activity['Sessions']
+
+    def membershipView(self, m):
+        activity = self.activity(m['ACT_CDE'])
+        session = self.session(m['SESS_CDE'])
+        account = self.account(m['ID_NUM'])
+        return {
+            'MembershipID': m['MEMBERSHIP_ID'],
+            'ActivityCode': m['ACT_CDE'],
+            'ActivityDescription': activity['ActivityDescription'],
+            'ActivityImage': None,
+            'ActivityImagePath': activity['ActivityImagePath'],
+            'SessionCode': m['SESS_CDE'],
+            'SessionDescription': session['SessionDescription'],
+            'IDNumber': m['ID_NUM'],
+            'AD_Username': account['ADUserName'],
+            'FirstName': account['FirstName'],
+            'LastName': account['LastName'],
+            'Mail_Location': None,
+            'Participation': m['PART_CDE'],
+            'ParticipationDescription': data.PARTICIPATION[m['PART_CDE']],
+            'GroupAdmin': m['GRP_ADMIN'],
+            'StartDate': m['BEGIN_DTE'],
+            'EndDate': m['END_DTE'],
+            'Description': m['COMMENT_TXT'],
+            'ActivityType': activity['ActivityType'],
+            'ActivityTypeDescription': activity['ActivityTypeDescription'],
+            'Privacy': m['PRIVACY'],
+            'AccountPrivate': 0,
+        }
+
+    def requestView(self, r):
+        activity = self.activity(r['ACT_CDE'])
+        account = self.account(r['ID_NUM'])
+        return {
+            'RequestID': r['REQUEST_ID'],
+            'ActivityCode': r['ACT_CDE'],
+            'ActivityDescription': activity['ActivityDescription'],
+            'SessionCode': r['SESS_CDE'],
+            'SessionDescription': \
+                self.session(r['SESS_CDE'])['SessionDescription'],
+            'IDNumber': r['ID_NUM'],
+            'FirstName': account['FirstName'],
+            'LastName': account['LastName'],
+            'Participation': r['PART_CDE'],
+            'ParticipationDescription': data.PARTICIPATION[r['PART_CDE']],
+            'DateSent': r['DATE_SENT'],
+            'CommentText': r['COMMENT_TXT'],
+            'RequestApproved': r['STATUS'],
+        }
+
+    def emailViews(self, memberships):
+        accounts = { m['ID_NUM']: self.account(m['ID_NUM']) \
+            for m in memberships }
+        return [{ 'FirstName': a['FirstName'], 'LastName': a['LastName'],
+            'Email': a['Email'] } for a in sorted(accounts.values(),
+            key=lambda a: (a['LastName'], a['FirstName']))]
+
+    def memberships(self, **criteria):
+        return self.data['memberships'].where(**criteria)
+
+    def wellnessAnswer(self, idNumber):
+        """Returns (answer, timestamp) of an account's last wellness
+        answer, or None."""
+        if idNumber in self.wellness:
+            return self.wellness[idNumber]
+        found = self.data['wellness'].first(ID_NUM=idNumber)
+        return (found['answer'], found['timestamp']) if found else None
+
+
+class Call:
+    """One request as handlers see it."""
+
+    def __init__(self, state, account, params, body):
+        self.state = state
+        self.account = account
+        self.params = params
+        self.body = body
+
+    @property
+    def isAdmin(self):
+        return self.state.isAdmin(self.account)
+
+    def requireAdmin(self):
+        if not self.isAdmin:
+            raise unauthorized()
+
+    def requireSelfOrAdmin(self, idNumber):
+        if not (self.isAdmin or int(idNumber) == self.account['ID']):
+            raise unauthorized()
+
+    def field(self, name, default=None):
+        if not isinstance(self.body, dict):
+            return default
+        return self.body.get(name, default)
+
+
+# # # # # # # # # # #
+# Authentication    #
+# # # # # # # # # # #
+
+@route('POST', 'token', anonymous=True)
+def issueToken(call):
+    account = call.state.accountsByUsername.get(
+        str(call.field('username', '')).lower())
+    if account is None or not call.field('password') or \
+            call.field('grant_type') != 'password':
+        return 400, { 'error': 'invalid_grant',
+            'error_description': 'The user name or password is incorrect.' }
+    token = secrets.token_urlsafe(32)
+    call.state.tokens[token] = (account['ID'], time.time() + TOKEN_LIFETIME)
+    return { 'access_token': token, 'token_type': 'bearer',
+        'expires_in': TOKEN_LIFETIME }
+
+
+# # # # # # #
+# Accounts  #
+# # # # # # #
+
+def accountView(account):
+    return { key: account[key] for key in ('FirstName', 'LastName', 'Email',
+        'ADUserName', 'AccountType', 'Barcode', 'show_pic', 'ReadOnly',
+        'account_id') }
+
+@route('GET', 'api/accounts/email/{email}')
+def getAccountByEmail(call):
+    email = call.params['email'].lower()
+    for account in call.state.data['accounts']:
+        if account['Email'].lower() == email:
+            return accountView(account)
+    raise notFound('Account ' + call.params['email'])
+
+@route('GET', 'api/accounts/username/{username}')
+def getAccountByUsername(call):
+    return accountView(call.state.accountByUsername(call.params['username']))
+
+def searchAccounts(state, first, last=None):
+    first = first.lower()
+    if last is None:
+        found = [a for a in state.data['accounts'] if \
+            a['FirstName'].lower().startswith(first) or \
+            a['LastName'].lower().startswith(first)]
+    else:
+        last = last.lower()
+        found = [a for a in state.data['accounts'] if \
+            a['FirstName'].lower().startswith(first) and \
+            a['LastName'].lower().startswith(last)]
+    # First name matches first, as the 360 search box shows them.
+    found.sort(key=lambda a: (not a['FirstName'].lower().startswith(first),
+        a['LastName'], a['FirstName']))
+    return [{ 'FirstName': a['FirstName'], 'LastName': a['LastName'],
+        'UserName': a['ADUserName'] } for a in found]
+
+@route('GET', 'api/accounts/search/{searchString}')
+def searchOne(call):
+    return searchAccounts(call.state, call.params['searchString'])
+
+@route('GET', 'api/accounts/search/{searchString}/{secondaryString}')
+def searchTwo(call):
+    return searchAccounts(call.state, call.params['searchString'],
+        call.params['secondaryString'])
+
+# Sent by the 360 UI for a filter left empty.
+EMPTY_FILTER = 'C\u266f'
+# Filter parameter -> account fields it matches, case-insensitively when the
+# parameter name ends in '*', as AccountsController.AdvancedPeopleSearch does.
+ADVANCED_FILTERS = [
+    ('firstName*', ('FirstName', 'NickName')),
+    ('lastName*', ('LastName', 'MaidenName')),
+    ('major', ('Major1Description',)),
+    ('minor', ('Minor1Description',)),
+    ('hall', ('Hall',)),
+    ('classType', ('Class',)),
+    ('hometown*', ('HomeCity',)),
+    ('state', ('HomeState',)),
+    ('country', ('Country',)),
+    ('department', ('OnCampusDepartment',)),
+    ('building', ('BuildingDescription',)),
+]
+_ADVANCED_PATH = '/'.join('{' + name.rstrip('*') + '}' \
+    for name, _ in ADVANCED_FILTERS)
+
+def _advancedFilter(name, value):
+    if value == EMPTY_FILTER:
+        return ''
+    # The UI spells characters IIS refuses in a path segment.
+    if name == 'major':
+        for spelled, char in (('_', '&'), ('dash', '-'), ('colon', ':'),
+                ('slash', '/')):
+            value = value.replace(spelled, char)
+    elif name == 'department':
+        value = value.replace('_', '&')
+    elif name == 'building':
+        value = value.replace('_', '.')
+    elif name == 'hometown':
+        for short, word in (('e ', 'east '), ('w ', 'west '), ('s ', 'south '),
+                ('n ', 'north ')):
+            if value.startswith(short):
+                value = word + value[len(short):]
+    return value
+
+def _flag(value):
+    if value.lower() not in ('true', 'false'):
+        raise HttpError(400, 'The request is invalid.')
+    return value.lower() == 'true'
+
+def advancedSearchView(account):
+    view = { 'AD_Username': account['ADUserName'],
+        'Email': account['Email'], 'Type': account['AccountType'] }
+    for _, fields in ADVANCED_FILTERS:
+        view.update((field, account.get(field) or '') for field in fields)
+    return view
+
+@route('GET', 'api/accounts/advanced-people-search/{includeStudent}/'
+    '{includeFacStaff}/{includeAlumni}/' + _ADVANCED_PATH)
+def advancedPeopleSearchAll(call, students=None, facStaff=None):
+    viewerType = call.account['AccountType']
+    include = {
+        'STUDENT': _flag(students or call.params['includeStudent']) and \
+            viewerType != 'ALUMNI',
+        'FACULTY': _flag(facStaff or call.params['includeFacStaff']),
+        'STAFF': _flag(facStaff or call.params['includeFacStaff']),
+        'ALUMNI': _flag(call.params['includeAlumni']) and \
+            viewerType != 'STUDENT',
+    }
+    filters = []
+    for name, fields in ADVANCED_FILTERS:
+        key = name.rstrip('*')
+        filters.append((_advancedFilter(key, call.params[key]), fields,
+            name.endswith('*')))
+    found = []
+    for account in call.state.data['accounts']:
+        if not include.get(account['AccountType']):
+            continue
+        for value, fields, anyCase in filters:
+            if not any((account.get(field) or '').lower().startswith(value) \
+                    if anyCase else (account.get(field) or '').startswith(
+                    value) for field in fields):
+                break
+        else:
+            found.append(account)
+    found.sort(key=lambda a: (a['LastName'], a['FirstName']))
+    return [advancedSearchView(a) for a in found]
+
+@route('GET', 'api/accounts/advanced-people-search/{includeAlumni}/' + \
+    _ADVANCED_PATH)
+def advancedPeopleSearch(call):
+    return advancedPeopleSearchAll(call, students='true', facStaff='true')
+
+
+# # # # # # # #
+# Activities  #
+# # # # # # # #
+
+@route('GET', 'api/activities', anonymous=True)
+def getActivities(call):
+    return [call.state.activityView(a) for a in sorted(
+        call.state.data['activities'], key=lambda a: a['ActivityCode'])]
+
+@route('GET', 'api/activities/{id}', anonymous=True)
+def getActivity(call):
+    return call.state.activityView(call.state.activity(call.params['id']))
+
+def activitiesForSession(state, sessionCode):
+    state.session(sessionCode)
+    return sorted([a for a in state.data['activities'] \
+        if state.activityRunsIn(a, sessionCode)],
+        key=lambda a: a['ActivityCode'])
+
+def activityStatus(state, sessionCode):
+    current = state.currentSession()['SessionCode']
+    return 'CLOSED' if sessionCode < current else 'OPEN'
+
+@route('GET', 'api/activities/session/{id}')
+def getActivitiesForSession(call):
+    return [call.state.activityView(a, privacy=False) \
+        for a in activitiesForSession(call.state, call.params['id'])]
+
+@route('GET', 'api/activities/session/{id}/types')
+def getActivityTypesForSession(call):
+    return sorted({ a['ActivityTypeDescription'] \
+        for a in activitiesForSession(call.state, call.params['id']) })
+
+@route('GET', 'api/activities/{sessionCode}/{id}/status')
+def getActivityStatus(call):
+    call.state.activity(call.params['id'])
+    call.state.session(call.params['sessionCode'])
+    return activityStatus(call.state, call.params['sessionCode'])
+
+def activitiesWithStatus(state, sessionCode, status):
+    if activityStatus(state, sessionCode) != status:
+        state.session(sessionCode)
+        return []
+    return [state.activityView(a) \
+        for a in activitiesForSession(state, sessionCode)]
+
+@route('GET', 'api/activities/open')
+def getOpenActivities(call):
+    return activitiesWithStatus(call.state,
+        call.state.currentSession()['SessionCode'], 'OPEN')
+
+@route('GET', 'api/activities/closed')
+def getClosedActivities(call):
+    return activitiesWithStatus(call.state,
+        call.state.currentSession()['SessionCode'], 'CLOSED')
+
+@route('GET', 'api/activities/{id}/open')
+def getOpenActivitiesForSession(call):
+    return activitiesWithStatus(call.state, call.params['id'], 'OPEN')
+
+@route('GET', 'api/activities/{id}/closed')
+def getClosedActivitiesForSession(call):
+    return activitiesWithStatus(call.state, call.params['id'], 'CLOSED')
+
+@route('PUT', 'api/activities/{id}')
+def putActivity(call):
+    activity = call.state.activity(call.params['id'])
+    if not (call.isAdmin or call.state.isGroupAdmin(call.account,
+            activity['ActivityCode'])):
+        raise unauthorized()
+    for field, key in (('ACT_BLURB', 'ActivityBlurb'),
+            ('ACT_URL', 'ActivityURL'), ('ACT_JOIN_INFO', 'ActivityJoinInfo')):
+        if call.field(field) is not None:
+            activity[key] = call.field(field)
+    return {
+        'ACT_CDE': activity['ActivityCode'],
+        'ACT_DESC': activity['ActivityDescription'],
+        'ACT_BLURB': activity['ActivityBlurb'],
+        'ACT_URL': activity['ActivityURL'],
+        'ACT_IMG_PATH': activity['ActivityImagePath'],
+        'ACT_TYPE': activity['ActivityType'],
+        'ACT_TYPE_DESC': activity['ActivityTypeDescription'],
+        'PRIVACY': activity['Privacy'],
+        'ACT_JOIN_INFO': activity['ActivityJoinInfo'],
+    }
+
+
+# # # # # # # # # # # # # # # # # #
+# Admins and Advanced Search      #
+# # # # # # # # # # # # # # # # # #
+
+@route('GET', 'api/admins')
+def getAdmins(call):
+    call.requireAdmin()
+    return [dict(admin) for admin in call.state.data['admins']]
+
+@route('GET', 'api/admins/{id:int}')
+def getAdmin(call):
+    call.requireAdmin()
+    for admin in call.state.data['admins']:
+        if admin['ID_NUM'] == call.params['id']:
+            return dict(admin)
+    raise notFound('Admin {0}'.format(call.params['id']))
+
+@route('GET', 'api/advanced-search/{lookup}')
+def getAdvancedSearchLookup(call):
+    lookups = call.state.data['advancedSearch']
+    lookup = call.params['lookup'].lower()
+    if lookup not in lookups:
+        raise notFound('Lookup ' + lookup)
+    return lookups[lookup]
+
+
+# # # # # # # # # # # #
+# Dining and Emails   #
+# # # # # # # # # # # #
+
+@route('GET', 'api/dining')
+def getDining(call):
+    # No meal plan: the api answers with the balance as a string.
+    return '0'
+
+@route('GET', 'api/emails/activity/{id}')
+def getActivityEmails(call):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    return call.state.emailViews(call.state.memberships(ACT_CDE=code))
+
+@route('GET', 'api/emails/activity/{id}/session/{session}')
+def getActivityEmailsForSession(call):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    return call.state.emailViews(call.state.memberships(ACT_CDE=code,
+        SESS_CDE=call.params['session']))
+
+def leaderEmails(state, code, **criteria):
+    return state.emailViews([m for m in state.memberships(ACT_CDE=code,
+        **criteria) if m['PART_CDE'] in data.LEADER_PARTICIPATION])
+
+@route('GET', 'api/emails/activity/{id}/leaders')
+def getLeaderEmails(call):
+    return leaderEmails(call.state,
+        call.state.activity(call.params['id'])['ActivityCode'])
+
+@route('GET', 'api/emails/activity/{id}/leaders/session/{session}')
+def getLeaderEmailsForSession(call):
+    return leaderEmails(call.state,
+        call.state.activity(call.params['id'])['ActivityCode'],
+        SESS_CDE=call.params['session'])
+
+@route('GET', 'api/emails/activity/{id}/advisors')
+def getAdvisorEmails(call):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    return call.state.emailViews(call.state.memberships(ACT_CDE=code,
+        PART_CDE='ADV'))
+
+@route('GET', 'api/emails/activity/{id}/advisors/session/{session}')
+def getAdvisorEmailsForSession(call):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    return call.state.emailViews(call.state.memberships(ACT_CDE=code,
+        SESS_CDE=call.params['session'], PART_CDE='ADV'))
+
+
+# # # # # #
+# Events  #
+# # # # # #
+
+def chapelCredits(call, terms):
+    events = { e['Event_ID']: e for e in call.state.data['events'] }
+    credits = call.state.data['chapelCredits'] \
+        if call.account['ID'] == data.STUDENT_ID else {}
+    return [dict(events[eventID], Term=term) for term in terms \
+        for eventID in credits.get(term, [])]
+
+@route('GET', 'api/events/chapel')
+def getChapelCredits(call):
+    return chapelCredits(call, sorted(call.state.data['chapelCredits']))
+
+@route('GET', 'api/events/chapel/{term}')
+def getChapelCreditsForTerm(call):
+    return chapelCredits(call, [call.params['term'].upper()])
+
+# Fields of EventViewModel, the records of api/events.
+EVENT_VIEW = ('Event_ID', 'Event_Name', 'Event_Title', 'Event_Type_Name',
+    'HasCLAWCredit', 'IsPublic', 'Description', 'StartDate', 'EndDate',
+    'Location', 'Organization')
+
+def eventViews(call):
+    # Like EventService.GetAllEvents, the feed is expanded into one record
+    # per occurrence on every request.
+    if call.state.liveEvents is not None:
+        return list(live.eventViews(call.state.liveEvents))
+    return [{ key: e[key] for key in EVENT_VIEW } \
+        for e in call.state.data['events']]
+
+def deprecatedEventViews(call, keep):
+    events = [e for e in call.state.liveEvents if keep(e)]
+    return list(live.deprecatedEventViews(events))
+
+@route('GET', 'api/events')
+def getEvents(call):
+    return eventViews(call)
+
+@route('GET', 'api/events/claw')
+def getClawEventViews(call):
+    return [e for e in eventViews(call) if e['HasCLAWCredit']]
+
+@route('GET', 'api/events/public', anonymous=True)
+def getPublicEventViews(call):
+    return [e for e in eventViews(call) if e['IsPublic']]
+
+@route('GET', 'api/events/25Live/All')
+def getAllEvents(call):
+    if call.state.liveEvents is not None:
+        return deprecatedEventViews(call, lambda e: True)
+    return [dict(e) for e in call.state.data['events']]
+
+@route('GET', 'api/events/25Live/CLAW')
+def getClawEvents(call):
+    if call.state.liveEvents is not None:
+        return deprecatedEventViews(call, lambda e: e.claw)
+    return [dict(e) for e in call.state.data['events'] if e['HasCLAWCredit']]
+
+@route('GET', 'api/events/25Live/Public', anonymous=True)
+def getPublicEvents(call):
+    if call.state.liveEvents is not None:
+        return deprecatedEventViews(call, lambda e: e.public)
+    return [dict(e) for e in call.state.data['events'] \
+        if e['Requirement_Id'] == '3']
+
+@route('GET', 'api/events/25Live/type/{typeIDs}')
+def getEventsByType(call):
+    typeIDs = set(call.params['typeIDs'].split('$'))
+    if call.state.liveEvents is not None:
+        return deprecatedEventViews(call, lambda e: e.typeID in typeIDs)
+    return [dict(e) for e in call.state.data['events'] \
+        if e['Event_Type_Id'] in typeIDs]
+
+@route('GET', 'api/events/25Live/{eventIDs}')
+def getEventsByID(call):
+    eventIDs = set(call.params['eventIDs'].split('$'))
+    if call.state.liveEvents is not None:
+        return deprecatedEventViews(call, lambda e: e.eventID in eventIDs)
+    return [dict(e) for e in call.state.data['events'] \
+        if e['Event_ID'] in eventIDs]
+
+
+# # # # # # #
+# Housing   #
+# # # # # # #
+
+def applicationFor(state, username):
+    username = username.lower()
+    for applicationID, application in state.applications.items():
+        if username in application['Applicants']:
+            return applicationID
+    raise notFound('Application for ' + username)
+
+def application(state, applicationID):
+    found = state.applications.get(applicationID)
+    if found is None:
+        raise notFound('Application {0}'.format(applicationID))
+    return found
+
+@route('GET', 'api/housing/apartmentInfo')
+def getApartmentInfo(call):
+    return [{ 'OnOffCampus': call.account['OnOffCampus'],
+        'OnCampusRoom': call.account['OnCampusRoom'],
+        'OnCampusBuilding': call.account['Hall'] }]
+
+@route('PUT', 'api/housing/putApartmentApplication')
+def putApartmentApplicationLegacy(call):
+    return True
+
+@route('PUT', 'api/housing/apartment/save')
+def saveApartmentApplicationLegacy(call):
+    return 201, True
+
+@route('GET', 'api/housing/admin')
+def isHousingAdmin(call):
+    if call.account['ID'] not in call.state.housingAdmins:
+        raise notFound('Housing admin ' + call.account['ADUserName'])
+    return True
+
+@route('POST', 'api/housing/admin/{id:int}')
+def addHousingAdmin(call):
+    call.state.account(call.params['id'])
+    call.state.housingAdmins.add(call.params['id'])
+    return True
+
+@route('DELETE', 'api/housing/admin/{id:int}')
+def removeHousingAdmin(call):
+    call.state.housingAdmins.discard(call.params['id'])
+    return True
+
+@route('GET', 'api/housing/halls/apartments')
+def getApartmentHalls(call):
+    return list(call.state.data['halls'])
+
+@route('GET', 'api/housing/apartment')
+def getMyApplicationID(call):
+    return applicationFor(call.state, call.account['ADUserName'])
+
+@route('GET', 'api/housing/apartment/{username}')
+def getApplicationID(call):
+    return applicationFor(call.state, call.params['username'])
+
+@route('GET', 'api/housing/apartment/applications/{applicationID:int}')
+def getApplication(call):
+    found = application(call.state, call.params['applicationID'])
+    return dict(found, ApplicationID=call.params['applicationID'],
+        Applicants=[{ 'Profile': { 'AD_Username': username } } \
+            for username in found['Applicants']])
+
+@route('GET', 'api/housing/admin/apartment/applications')
+def getAllApplications(call):
+    if call.account['ID'] not in call.state.housingAdmins:
+        raise unauthorized()
+    return sorted(call.state.applications)
+
+def saveApplication(call, applicationID):
+    editor = (call.field('EditorProfile') or {}).get('AD_Username') \
+        or call.account['ADUserName']
+    applicants = [applicant.get('Profile', {}).get('AD_Username', '') \
+        for applicant in call.field('Applicants') or []]
+    call.state.applications[applicationID] = {
+        'EditorUsername': editor,
+        'Applicants': [username.lower() for username in applicants if username],
+        'ApartmentChoices': call.field('ApartmentChoices') or [],
+        'DateModified': datetime.datetime.now().isoformat(),
+        'DateSubmitted': None,
+    }
+
+@route('POST', 'api/housing/apartment/applications')
+def postApplication(call):
+    applicationID = max(call.state.applications or [0]) + 1
+    saveApplication(call, applicationID)
+    return 201, applicationID
+
+@route('PUT', 'api/housing/apartment/applications/{applicationID:int}')
+def putApplication(call):
+    application(call.state, call.params['applicationID'])
+    saveApplication(call, call.params['applicationID'])
+    return call.params['applicationID']
+
+@route('PUT', 'api/housing/apartment/applications/{applicationID:int}/editor')
+def putApplicationEditor(call):
+    found = application(call.state, call.params['applicationID'])
+    found['EditorUsername'] = (call.field('EditorProfile') or {}) \
+        .get('AD_Username', found['EditorUsername'])
+    return True
+
+@route('PUT', 'api/housing/apartment/applications/{applicationID:int}/submit')
+def submitApplication(call):
+    found = application(call.state, call.params['applicationID'])
+    found['DateSubmitted'] = datetime.datetime.now().isoformat()
+    return True
+
+@route('DELETE', 'api/housing/apartment/applications/{applicationID:int}')
+def deleteApplication(call):
+    application(call.state, call.params['applicationID'])
+    del call.state.applications[call.params['applicationID']]
+    return True
+
+
+# # # # # # # # #
+# Memberships   #
+# # # # # # # # #
+
+def membership(state, membershipID):
+    found = state.data['memberships'].first(MEMBERSHIP_ID=membershipID)
+    if found is not None:
+        return found
+    raise notFound('Membership {0}'.format(membershipID))
+
+def membershipViews(state, memberships):
+    return [state.membershipView(m) for m in memberships]
+
+@route('GET', 'api/memberships')
+def getMemberships(call):
+    call.requireAdmin()
+    return membershipViews(call.state, call.state.data['memberships'])
+
+@route('GET', 'api/memberships/{id:int}')
+def getMembership(call):
+    return call.state.membershipView(membership(call.state, call.params['id']))
+
+def activityMemberships(call, predicate=lambda m: True, **criteria):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    return [m for m in call.state.memberships(ACT_CDE=code, **criteria) \
+        if predicate(m)]
+
+@route('GET', 'api/memberships/activity/{id}')
+def getActivityMemberships(call):
+    return membershipViews(call.state, activityMemberships(call))
+
+@route('GET', 'api/memberships/activity/{id}/group-admin')
+def getActivityGroupAdmins(call):
+    return membershipViews(call.state, activityMemberships(call,
+        lambda m: m['GRP_ADMIN']))
+
+@route('GET', 'api/memberships/activity/{id}/leaders')
+def getActivityLeaders(call):
+    return membershipViews(call.state, activityMemberships(call,
+        lambda m: m['PART_CDE'] in data.LEADER_PARTICIPATION))
+
+@route('GET', 'api/memberships/activity/{id}/advisors')
+def getActivityAdvisors(call):
+    return membershipViews(call.state, activityMemberships(call,
+        PART_CDE='ADV'))
+
+@route('GET', 'api/memberships/activity/{id}/followers')
+def countActivityFollowers(call):
+    return len(activityMemberships(call, PART_CDE='GUEST'))
+
+@route('GET', 'api/memberships/activity/{id}/followers/{sess_cde}')
+def countActivityFollowersForSession(call):
+    return len(activityMemberships(call, PART_CDE='GUEST',
+        SESS_CDE=call.params['sess_cde']))
+
+@route('GET', 'api/memberships/activity/{id}/members')
+def countActivityMembers(call):
+    return len(activityMemberships(call, lambda m: m['PART_CDE'] != 'GUEST'))
+
+@route('GET', 'api/memberships/activity/{id}/members/{sess_cde}')
+def countActivityMembersForSession(call):
+    return len(activityMemberships(call, lambda m: m['PART_CDE'] != 'GUEST',
+        SESS_CDE=call.params['sess_cde']))
+
+@route('GET', 'api/memberships/student/{id:int}')
+def getStudentMemberships(call):
+    call.requireSelfOrAdmin(call.params['id'])
+    return membershipViews(call.state,
+        call.state.memberships(ID_NUM=call.params['id']))
+
+@route('GET', 'api/memberships/student/username/{username}')
+def getStudentMembershipsByUsername(call):
+    account = call.state.accountByUsername(call.params['username'])
+    call.requireSelfOrAdmin(account['ID'])
+    return membershipViews(call.state,
+        call.state.memberships(ID_NUM=account['ID']))
+
+@route('GET', 'api/memberships/isGroupAdmin/{id}')
+def isGroupAdmin(call):
+    return call.state.isGroupAdmin(call.account,
+        call.state.activity(call.params['id'])['ActivityCode'])
+
+def parseDate(value):
+    """Accepts the mm/dd/yyyy dates the suite posts as well as iso ones."""
+    if not value:
+        return None
+    for fmt in ('%m/%d/%Y', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(str(value), fmt).isoformat()
+        except ValueError:
+            pass
+    raise HttpError(400, 'The date \'{0}\' is not valid.'.format(value))
+
+def validParticipation(call):
+    participation = call.field('PART_CDE')
+    if not isinstance(participation, str) or \
+            participation not in data.PARTICIPATION:
+        raise HttpError(400, 'The participation \'{0}\' is not valid.'\
+            .format(participation))
+    return participation
+
+def membershipFields(call):
+    activity = call.state.activity(call.field('ACT_CDE'))
+    session = call.state.session(call.field('SESS_CDE'))
+    try:
+        idNumber = int(call.field('ID_NUM'))
+    except (TypeError, ValueError):
+        raise HttpError(400, 'ID_NUM must be a number.')
+    call.state.account(idNumber)
+    return activity['ActivityCode'], session['SessionCode'], idNumber
+
+@route('POST', 'api/memberships')
+def postMembership(call):
+    activityCode, sessionCode, idNumber = membershipFields(call)
+    if not (call.isAdmin or call.state.isGroupAdmin(call.account,
+            activityCode)):
+        raise unauthorized()
+    participation = validParticipation(call)
+    if call.state.memberships(ACT_CDE=activityCode, SESS_CDE=sessionCode,
+            ID_NUM=idNumber):
+        raise HttpError(409, 'The membership already exists.')
+    created = data.makeMembership(call.state.nextID(
+        call.state.data['memberships'], 'MEMBERSHIP_ID'), activityCode,
+        sessionCode, idNumber, participation,
+        comment=call.field('COMMENT_TXT'))
+    created['BEGIN_DTE'] = parseDate(call.field('BEGIN_DTE')) or \
+        call.state.session(sessionCode)['SessionBeginDate']
+    created['END_DTE'] = parseDate(call.field('END_DTE'))
+    call.state.data['memberships'].append(created)
+    return 201, dict(created)
+
+def editableMembership(call):
+    found = membership(call.state, call.params['id'])
+    if not (call.isAdmin or call.state.isGroupAdmin(call.account,
+            found['ACT_CDE'])):
+        raise unauthorized()
+    return found
+
+@route('PUT', 'api/memberships/{id:int}')
+def putMembership(call):
+    found = editableMembership(call)
+    found['PART_CDE'] = validParticipation(call)
+    if call.field('BEGIN_DTE'):
+        found['BEGIN_DTE'] = parseDate(call.field('BEGIN_DTE'))
+    if call.field('END_DTE'):
+        found['END_DTE'] = parseDate(call.field('END_DTE'))
+    if call.field('COMMENT_TXT') is not None:
+        found['COMMENT_TXT'] = call.field('COMMENT_TXT')
+    return dict(found)
+
+@route('PUT', 'api/memberships/{id:int}/group-admin')
+def toggleGroupAdmin(call):
+    found = editableMembership(call)
+    found['GRP_ADMIN'] = not found['GRP_ADMIN']
+    return dict(found)
+
+@route('PUT', 'api/memberships/{id:int}/privacy/{p}')
+def putMembershipPrivacy(call):
+    found = membership(call.state, call.params['id'])
+    call.requireSelfOrAdmin(found['ID_NUM'])
+    found['PRIVACY'] = call.params['p'].lower() in ('true', 'y', '1')
+    return dict(found)
+
+@route('DELETE', 'api/memberships/{id:int}')
+def deleteMembership(call):
+    found = editableMembership(call)
+    call.state.data['memberships'].remove(found)
+    return dict(found)
+
+
+# # # # # # # # # # # # # #
+# Membership Requests     #
+# # # # # # # # # # # # # #
+
+def membershipRequest(state, requestID):
+    found = state.data['requests'].first(REQUEST_ID=requestID)
+    if found is not None:
+        return found
+    raise notFound('Request {0}'.format(requestID))
+
+def manageableRequest(call):
+    found = membershipRequest(call.state, call.params['id'])
+    if not (call.isAdmin or call.state.isGroupAdmin(call.account,
+            found['ACT_CDE'])):
+        raise unauthorized()
+    return found
+
+@route('GET', 'api/requests')
+def getRequests(call):
+    call.requireAdmin()
+    return [call.state.requestView(r) for r in call.state.data['requests']]
+
+@route('GET', 'api/requests/{id:int}')
+def getRequest(call):
+    return call.state.requestView(manageableRequest(call))
+
+@route('GET', 'api/requests/activity/{id}')
+def getActivityRequests(call):
+    code = call.state.activity(call.params['id'])['ActivityCode']
+    if not (call.isAdmin or call.state.isGroupAdmin(call.account, code)):
+        raise unauthorized()
+    return [call.state.requestView(r) for r in \
+        call.state.data['requests'].where(ACT_CDE=code)]
+
+@route('GET', 'api/requests/student')
+def getMyRequests(call):
+    return [call.state.requestView(r) for r in \
+        call.state.data['requests'].where(ID_NUM=call.account['ID'])]
+
+@route('POST', 'api/requests')
+def postRequest(call):
+    activityCode, sessionCode, idNumber = membershipFields(call)
+    call.requireSelfOrAdmin(idNumber)
+    participation = validParticipation(call)
+    pending = call.state.data['requests'].where(ACT_CDE=activityCode,
+        SESS_CDE=sessionCode, ID_NUM=idNumber, STATUS='Pending')
+    if pending or call.state.memberships(ACT_CDE=activityCode,
+            SESS_CDE=sessionCode, ID_NUM=idNumber):
+        raise HttpError(409, 'The request or membership already exists.')
+    created = data.makeRequest(call.state.nextID(call.state.data['requests'],
+        'REQUEST_ID'), activityCode, sessionCode, idNumber,
+        parseDate(call.field('DATE_SENT')) or \
+        datetime.datetime.now().replace(microsecond=0).isoformat())
+    created['PART_CDE'] = participation
+    created['COMMENT_TXT'] = call.field('COMMENT_TXT')
+    call.state.data['requests'].append(created)
+    return 201, dict(created)
+
+@route('PUT', 'api/requests/{id:int}')
+def putRequest(call):
+    found = manageableRequest(call)
+    found['PART_CDE'] = validParticipation(call)
+    if call.field('COMMENT_TXT') is not None:
+        found['COMMENT_TXT'] = call.field('COMMENT_TXT')
+    return dict(found)
+
+@route('POST', 'api/requests/{id:int}/approve')
+def approveRequest(call):
+    found = manageableRequest(call)
+    found['STATUS'] = 'Approved'
+    created = data.makeMembership(call.state.nextID(
+        call.state.data['memberships'], 'MEMBERSHIP_ID'), found['ACT_CDE'],
+        found['SESS_CDE'], found['ID_NUM'], found['PART_CDE'],
+        comment=found['COMMENT_TXT'])
+    created['BEGIN_DTE'] = datetime.datetime.now().replace(microsecond=0) \
+        .isoformat()
+    call.state.data['memberships'].append(created)
+    return dict(created)
+
+@route('POST', 'api/requests/{id:int}/deny')
+def denyRequest(call):
+    found = manageableRequest(call)
+    found['STATUS'] = 'Denied'
+    return dict(found)
+
+@route('DELETE', 'api/requests/{id:int}')
+def deleteRequest(call):
+    found = membershipRequest(call.state, call.params['id'])
+    if found['ID_NUM'] != call.account['ID']:
+        found = manageableRequest(call)
+    call.state.data['requests'].remove(found)
+    return dict(found)
+
+
+# # # # # # # # # # # # # # # # # #
+# MySchedule and Schedule Control #
+# # # # # # # # # # # # # # # # # #
+
+SCHEDULE_FIELDS = ['LOCATION', 'DESCRIPTION', 'MON_CDE', 'TUE_CDE', 'WED_CDE',
+    'THU_CDE', 'FRI_CDE', 'SAT_CDE', 'SUN_CDE', 'IS_ALLDAY', 'BEGIN_TIME',
+    'END_TIME']
+
+def scheduleControl(state, account):
+    return state.data['scheduleControl'].setdefault(account['ID'],
+        { 'IsSchedulePrivate': True, 'Description': None })
+
+def myEvents(state, account):
+    return state.data['myschedule'].where(GORDON_ID=str(account['ID']))
+
+def myEvent(call, eventID):
+    found = call.state.data['myschedule'].first(
+        GORDON_ID=str(call.account['ID']), EVENT_ID=str(eventID))
+    if found is not None:
+        return found
+    raise notFound('Event {0}'.format(eventID))
+
+@route('GET', 'api/myschedule')
+def getMySchedule(call):
+    return [dict(e) for e in myEvents(call.state, call.account)]
+
+@route('GET', 'api/myschedule/{username}')
+def getScheduleOf(call):
+    account = call.state.accountByUsername(call.params['username'])
+    if scheduleControl(call.state, account)['IsSchedulePrivate'] and \
+            not call.isAdmin and account is not call.account:
+        return []
+    return [dict(e) for e in myEvents(call.state, account)]
+
+@route('GET', 'api/myschedule/event/{event_id}')
+def getMyEvent(call):
+    return dict(myEvent(call, call.params['event_id']))
+
+@route('POST', 'api/myschedule')
+def postMyEvent(call):
+    if str(call.field('GORDON_ID')) != str(call.account['ID']):
+        raise unauthorized()
+    event = { key: call.field(key) for key in SCHEDULE_FIELDS }
+    event['EVENT_ID'] = str(call.state.nextID(call.state.data['myschedule'],
+        'EVENT_ID'))
+    event['GORDON_ID'] = str(call.account['ID'])
+    call.state.data['myschedule'].append(event)
+    return 201, dict(event)
+
+@route('PUT', 'api/myschedule')
+def putMyEvent(call):
+    event = myEvent(call, call.field('EVENT_ID'))
+    for key in SCHEDULE_FIELDS:
+        if key in call.body:
+            event[key] = call.body[key]
+    return dict(event)
+
+@route('DELETE', 'api/myschedule/{event_id}')
+def deleteMyEvent(call):
+    event = myEvent(call, call.params['event_id'])
+    call.state.data['myschedule'].remove(event)
+    return dict(event)
+
+def scheduleControlView(state, account):
+    control = scheduleControl(state, account)
+    return { 'IsSchedulePrivate': control['IsSchedulePrivate'],
+        'Description': control['Description'],
+        'ModifiedTimeStamp': control.get('ModifiedTimeStamp'),
+        'gordon_id': str(account['ID']) }
+
+@route('GET', 'api/schedulecontrol')
+def getScheduleControl(call):
+    return scheduleControlView(call.state, call.account)
+
+@route('GET', 'api/schedulecontrol/{username}')
+def getScheduleControlOf(call):
+    return scheduleControlView(call.state,
+        call.state.accountByUsername(call.params['username']))
+
+def touchScheduleControl(call, **changes):
+    control = scheduleControl(call.state, call.account)
+    control.update(changes,
+        ModifiedTimeStamp=datetime.datetime.now().isoformat())
+
+@route('PUT', 'api/schedulecontrol/privacy/{value}')
+def putSchedulePrivacy(call):
+    touchScheduleControl(call,
+        IsSchedulePrivate=call.params['value'].upper() == 'Y')
+
+@route('PUT', 'api/schedulecontrol/description/{value}')
+def putScheduleDescription(call):
+    touchScheduleControl(call, Description=call.params['value'])
+
+@route('GET', 'api/schedule')
+def getCourseSchedule(call):
+    return []
+
+@route('GET', 'api/schedule/{username}')
+def getCourseScheduleOf(call):
+    call.state.accountByUsername(call.params['username'])
+    return []
+
+@route('GET', 'api/schedule/canreadstudent')
+def canReadStudentSchedules(call):
+    return call.isAdmin
+
+
+# # # # # # # # # # #
+# News and Profiles #
+# # # # # # # # # # #
+
+@route('GET', 'api/news/categories')
+def getNewsCategories(call):
+    return [dict(c) for c in call.state.data['newsCategories']]
+
+# Older clients ask for the categories here.
+route('GET', 'api/news/category')(getNewsCategories)
+
+@route('GET', 'api/news/not-expired')
+def getNotExpiredNews(call):
+    return [dict(n) for n in call.state.data['news']]
+
+@route('GET', 'api/news/new')
+def getNewNews(call):
+    return [dict(n) for n in call.state.data['news'] \
+        if n.get('Entered', '') >= call.state.started.isoformat()]
+
+@route('GET', 'api/news/personal-unapproved')
+def getMyUnapprovedNews(call):
+    return []
+
+SOCIAL_MEDIA = ['facebook', 'twitter', 'instagram', 'linkedin', 'handshake']
+
+def profileView(account, own):
+    view = {
+        'AD_Username': account['ADUserName'],
+        'FirstName': account['FirstName'],
+        'LastName': account['LastName'],
+        'Email': account['Email'],
+        'PersonType': account['AccountType'][:3].lower(),
+        'show_pic': account['show_pic'],
+        'OnCampusRoom': account['OnCampusRoom'],
+        'Hall': account['Hall'],
+    }
+    view.update((key, account.get(key, '')) for key in SOCIAL_MEDIA)
+    if own:
+        view['ID'] = str(account['ID'])
+        view['IsMobilePhonePrivate'] = account['IsMobilePhonePrivate']
+    return view
+
+@route('GET', 'api/profiles')
+def getMyProfile(call):
+    return profileView(call.account, own=True)
+
+@route('GET', 'api/profiles/{username}')
+def getProfile(call):
+    return profileView(call.state.accountByUsername(call.params['username']),
+        own=False)
+
+@route('GET', 'api/profiles/image')
+def getMyImage(call):
+    return { 'def': PLACEHOLDER_IMAGE, 'pref': None }
+
+@route('GET', 'api/profiles/image/{username}')
+def getImage(call):
+    call.state.accountByUsername(call.params['username'])
+    return { 'def': PLACEHOLDER_IMAGE, 'pref': None }
+
+@route('POST', 'api/profiles/image')
+def postImage(call):
+    return None
+
+@route('POST', 'api/profiles/IDimage')
+def postIDImage(call):
+    return None
+
+@route('POST', 'api/profiles/image/reset')
+def resetImage(call):
+    return None
+
+@route('PUT', 'api/profiles/{type}')
+def putSocialMediaLink(call):
+    kind = call.params['type'].lower()
+    if kind not in SOCIAL_MEDIA:
+        raise HttpError(400, 'Unknown link type ' + kind)
+    call.account[kind] = call.field(kind, '')
+
+@route('PUT', 'api/profiles/mobile_privacy/{value}')
+def putMobilePrivacy(call):
+    call.account['IsMobilePhonePrivate'] = \
+        1 if call.params['value'].upper() == 'Y' else 0
+
+@route('PUT', 'api/profiles/image_privacy/{value}')
+def putImagePrivacy(call):
+    call.account['show_pic'] = 1 if call.params['value'].upper() == 'Y' else 0
+
+@route('PUT', 'api/profiles/mobile_phone_number/{value}')
+def putMobilePhone(call):
+    call.account['MobilePhone'] = call.params['value']
+
+
+# # # # # # # # # # # # # # # # # # #
+# Sessions and Everything Else      #
+# # # # # # # # # # # # # # # # # # #
+
+@route('GET', 'api/sessions')
+def getSessions(call):
+    return [dict(s) for s in call.state.data['sessions']]
+
+@route('GET', 'api/sessions/{id}')
+def getSession(call):
+    return dict(call.state.session(call.params['id']))
+
+@route('GET', 'api/sessions/current')
+def getCurrentSession(call):
+    return dict(call.state.currentSession())
+
+@route('GET', 'api/sessions/firstDay')
+def getFirstDay(call):
+    return call.state.currentSession()['SessionBeginDate'][:10]
+
+@route('GET', 'api/sessions/lastDay')
+def getLastDay(call):
+    return call.state.currentSession()['SessionEndDate'][:10]
+
+@route('GET', 'api/sessions/daysLeft')
+def getDaysLeft(call):
+    session = call.state.currentSession()
+    begin = datetime.datetime.fromisoformat(session['SessionBeginDate'])
+    end = datetime.datetime.fromisoformat(session['SessionEndDate'])
+    left = (end - datetime.datetime.now()).days + 1
+    # double[] on the real api, so Json.NET writes 12.0, not 12.
+    return [float(max(left, 0)), float((end - begin).days)]
+
+@route('GET', 'api/studentemployment')
+def getStudentEmployment(call):
+    return []
+
+@route('GET', 'api/version', anonymous=True)
+def getVersion(call):
+    return { 'Version': 'stand-in', 'Started': call.state.started.isoformat() }
+
+@route('GET', 'api/vpscore')
+def getVictoryPromise(call):
+    return [{ 'TOTAL_VP_IM_SCORE': 0, 'TOTAL_VP_CC_SCORE': 0,
+        'TOTAL_VP_LS_SCORE': 0, 'TOTAL_VP_LW_SCORE': 0 }]
+
+@route('GET', 'api/wellness')
+def getWellness(call):
+    answer = call.state.wellnessAnswer(call.account['ID']) or \
+        (False, call.state.started.isoformat())
+    return [{ 'answerValid': True, 'userAnswer': answer[0],
+        'timestamp': answer[1] }]
+
+@route('GET', 'api/wellness/question')
+def getWellnessQuestion(call):
+    return [dict(call.state.data['wellnessQuestion'])]
+
+@route('POST', 'api/wellness')
+def postWellness(call):
+    answer = call.field('userAnswer')
+    if isinstance(answer, str):
+        answer = answer.lower() in ('true', '1', 'yes')
+    call.state.wellness[call.account['ID']] = (bool(answer),
+        datetime.datetime.now().replace(microsecond=0).isoformat())
+    return 201, None
+
+
+# # # # # # # # # # # #
+# Request Handling    #
+# # # # # # # # # # # #
+
+def parseBody(headers, body):
+    if not body:
+        return {}
+    contentType = headers.get('Content-Type', '').split(';')[0].strip()
+    if contentType == 'application/json':
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise HttpError(400, 'The request body is not valid json.')
+    if contentType == 'application/x-www-form-urlencoded':
+        form = parse_qs(body.decode('utf-8'), keep_blank_values=True)
+        return { key: values[0] if len(values) == 1 else values \
+            for key, values in form.items() }
+    if contentType.startswith('multipart/'):
+        # Uploaded images are accepted and thrown away.
+        return {}
+    return body.decode('utf-8', errors='replace')
+
+def authenticate(state, headers):
+    scheme, _, token = headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    entry = state.tokens.get(token.strip())
+    if entry is None or entry[1] < time.time():
+        return None
+    return state.accountsById.get(entry[0])
+
+def handle(state, method, target, headers, body):
+    """Answers one request.
+
+    Returns:
+        (int, object): status code and a json-serializable body, or None
+        for an empty body.
+    """
+    path = urlsplit(target).path
+    try:
+        handler, params, anonymous = matchRoute(method, path)
+        locked = state.lock.reading() if method == 'GET' else \
+            state.lock.writing()
+        with locked:
+            account = authenticate(state, headers)
+            if account is None and not anonymous:
+                raise unauthorized()
+            result = handler(Call(state, account, params,
+                parseBody(headers, body)))
+    except HttpError as e:
+        return e.status, { 'Message': e.message }
+    if isinstance(result, tuple):
+        return result
+    return 200, result
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'Gordon360StandIn/1.0'
+    # Responses are written in one piece; don't let Nagle hold the last one.
+    disable_nagle_algorithm = True
+
+    def _serve(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            status, payload = handle(self.server.state, method, self.path,
+                self.headers, body)
+        except Exception as e:
+            status, payload = 500, { 'Message': 'An error has occurred.',
+                'ExceptionMessage': repr(e) }
+        self._respond(status, payload)
+
+    def _respond(self, status, payload):
+        content = b'' if payload is None else \
+            json.dumps(payload).encode('utf-8')
+        head = ['HTTP/1.1 {0} {1}'.format(status,
+            self.responses.get(status, ('',))[0]),
+            'Server: ' + self.server_version,
+            'Date: ' + email.utils.formatdate(usegmt=True),
+            'Content-Type: application/json; charset=utf-8',
+            'Content-Length: {0}'.format(len(content))]
+        if self.close_connection:
+            head.append('Connection: close')
+        # Status line, headers and body in a single write (and segment).
+        self.wfile.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') +
+            content)
+        if self.server.verbose:
+            self.log_request(status, len(content))
+
+    def do_GET(self):
+        self._serve('GET')
+
+    def do_POST(self):
+        self._serve('POST')
+
+    def do_PUT(self):
+        self._serve('PUT')
+
+    def do_DELETE(self):
+        self._serve('DELETE')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, state=None, verbose=False):
+        ThreadingHTTPServer.__init__(self, address, StandInHandler)
+        self.state = state or StandInState()
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{0}:{1}/'.format(host, port)
+
+def start(host='127.0.0.1', port=0, state=None):
+    """Start a stand-in on a background thread.
+
+    Args:
+        host (str): address to listen on.
+        port (int): port to listen on; 0 picks a free one.
+        state (StandInState): data to serve (default: fresh fixtures).
+
+    Returns:
+        StandInServer: call .url for the host url and .shutdown() to stop.
+    """
+    server = StandInServer((host, port), state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1',
+        help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8360,
+        help='port to listen on (default: %(default)s)')
+    parser.add_argument('--dataset', default=None, metavar='PATH',
+        help='serve a dataset written by standin_dataset.py instead of the '
+             'fixtures')
+    parser.add_argument('--events-feed', default=None, metavar='URL',
+        help='serve the events of a 25Live feed (url or file, see '
+             'standin_25live.py) on the api/events routes')
+    parser.add_argument('--events-refresh', type=float, default=240.0,
+        help='seconds between reloads of --events-feed, like the api\'s '
+             'cache of 25Live (default: %(default)s)')
+    parser.add_argument('--verbose', action='store_true',
+        help='log every request')
+    args = parser.parse_args()
+
+    state = StandInState(dataset.Dataset(args.dataset).fixtures() \
+        if args.dataset else None)
+    if args.events_feed:
+        state.followEventsFeed(args.events_feed, args.events_refresh)
+    server = StandInServer((args.host, args.port), state,
+        verbose=args.verbose)
+    print('Gordon 360 stand-in listening on {0}'.format(server.url))
+    print('Run the suite against it with GORDON360_HOST_URL={0}'\
+        .format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+
+"""Replays people search type-ahead from many simulated users.
+
+Usage:
+    [python3] gordon_360_typeahead.py [--users N] [--queries N] [options]
+
+The people search box of the 360 UI sends a request on every keystroke:
+api/accounts/search/{searchString} for one word, and
+api/accounts/search/{searchString}/{secondaryString} once a space starts a
+second word.  Each simulated user types names from --names (by default a
+list built around the suite's searchString and searchString2) one key at a
+time, at a human cadence: intervals around --cadence ms, a typing speed of
+its own, and an occasional typo that is corrected with backspace, which sends
+another request.  Users start at random times within --ramp seconds and
+think for a while between names.
+
+Requests are sent at the keystroke, whether or not earlier ones have been
+answered, and latency is measured from the keystroke.  For every response
+the harness also checks what a search box that shows whatever arrives last
+would display:
+
+    out of order  the response arrived after the response to a later
+                  keystroke of the same name, so it overwrote newer results
+    superseded    the user had already typed another key when it arrived
+    stale final   the last response to arrive for a name was not the one
+                  for its final keystroke
+
+Per-keystroke latency is reported by the length of the text typed so far,
+since short prefixes match the most people.  The host and account come from
+test_gordon360_pytest.py and credentials.py, as for the test suite.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+from urllib.parse import quote
+
+import pytest_components_async as apiAsync
+import test_gordon360_pytest as control
+from latency_histogram import LatencyHistogram, summarize
+
+# Names typed when no --names file is given.
+DEFAULT_NAMES = [
+    control.searchString,
+    control.searchString + ' ' + control.searchString2,
+    'chris carlson', 'emmy', 'emmy short', 'grace', 'grace michaels',
+    'abigail', 'benjamin', 'caleb', 'deborah', 'hannah', 'isaac', 'nathan',
+    'anderson', 'scholar', 'miriam s', 'levi',
+]
+# Browsers open at most this many connections to one host.
+CONNECTIONS_PER_USER = 6
+# Prefix lengths reported together from this length on.
+LONGEST_PREFIX = 10
+
+
+# # # # # # # # # #
+# Typing Model    #
+# # # # # # # # # #
+
+def keystrokes(name, rng, typoRate):
+    """Returns the contents of the search box after each key typing a name
+    takes, including mistyped keys and the backspaces that undo them."""
+    typed = []
+    text = ''
+    for char in name:
+        if char != ' ' and rng.random() < typoRate:
+            typed.append(text + rng.choice(string.ascii_lowercase))
+            typed.append(text)
+        text += char
+        typed.append(text)
+    return typed
+
+def searchPath(text):
+    """Returns the path the 360 UI searches for the contents of the search
+    box, or None when it would not search."""
+    words = text.split()
+    if not words:
+        return None
+    path = 'api/accounts/search/' + quote(words[0], safe='')
+    if len(words) > 1:
+        path += '/' + quote(' '.join(words[1:]), safe='')
+    return path
+
+class Typist:
+    """One simulated user at the search box."""
+
+    def __init__(self, rng, cadence, typoRate):
+        """
+        Args:
+            rng (random.Random): this user's source of randomness.
+            cadence (float): median seconds between keystrokes of an
+                average typist.
+            typoRate (float): chance of mistyping a key.
+        """
+        self.rng = rng
+        self.typoRate = typoRate
+        # Typing speed varies more between people than between keys.
+        self.cadence = cadence * rng.lognormvariate(0, 0.3)
+
+    def interval(self):
+        return self.cadence * self.rng.lognormvariate(0, 0.4)
+
+
+# # # # # # # # #
+# Measurement   #
+# # # # # # # # #
+
+class PrefixStats:
+    """Responses to keystrokes that left a text of one length."""
+
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, latency, rows, size):
+        self.latencies.recordSeconds(latency)
+        self.rows += rows
+        self.bytes += size
+
+    def summary(self, length):
+        count = self.latencies.totalCount
+        summary = {
+            'prefix_length': length,
+            'count': count,
+            'mean_rows': round(self.rows / count, 1) if count else 0,
+            'mean_bytes': round(self.bytes / count) if count else 0,
+        }
+        summary.update(summarize(self.latencies))
+        return summary
+
+class TypeaheadStats:
+    """Outcome of every keystroke of every user."""
+
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.prefixes = {}
+        self.statuses = {}
+        self.names = 0
+        self.keystrokes = 0
+        self.searches = 0
+        self.responses = 0
+        self.errors = 0
+        self.outOfOrder = 0
+        self.superseded = 0
+        self.staleFinal = 0
+
+    def addResponse(self, latency, status, length, rows, size):
+        self.responses += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+            return
+        self.latencies.recordSeconds(latency)
+        length = min(length, LONGEST_PREFIX)
+        stats = self.prefixes.get(length)
+        if stats is None:
+            stats = self.prefixes[length] = PrefixStats()
+        stats.add(latency, rows, size)
+
+    def addFailure(self, reason):
+        self.statuses[reason] = self.statuses.get(reason, 0) + 1
+        self.errors += 1
+
+    def report(self):
+        rate = lambda n, total: round(n / total, 4) if total else 0.0
+        report = {
+            'names': self.names,
+            'keystrokes': self.keystrokes,
+            'searches': self.searches,
+            'responses': self.responses,
+            'errors': self.errors,
+            'error_rate': rate(self.errors, self.searches),
+            'statuses': { str(k): v for k, v in self.statuses.items() },
+            'out_of_order': self.outOfOrder,
+            'out_of_order_rate': rate(self.outOfOrder, self.responses),
+            'superseded': self.superseded,
+            'superseded_rate': rate(self.superseded, self.responses),
+            'stale_final': self.staleFinal,
+            'stale_final_rate': rate(self.staleFinal, self.names),
+        }
+        report.update(summarize(self.latencies))
+        report['prefixes'] = [self.prefixes[length].summary(length) \
+            for length in sorted(self.prefixes)]
+        return report
+
+class NameSearch:
+    """Tracks the responses to the keystrokes of one typed name."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.typed = -1
+        self.newestShown = -1
+        self.lastArrived = None
+
+    def keystroke(self):
+        """Returns the sequence number of a new keystroke."""
+        self.typed += 1
+        self.stats.keystrokes += 1
+        return self.typed
+
+    def arrived(self, sequence):
+        if sequence < self.newestShown:
+            self.stats.outOfOrder += 1
+        if sequence < self.typed:
+            self.stats.superseded += 1
+        self.newestShown = max(self.newestShown, sequence)
+        self.lastArrived = sequence
+
+    def finish(self):
+        self.stats.names += 1
+        if self.lastArrived is not None and self.lastArrived != self.typed:
+            self.stats.staleFinal += 1
+
+
+# # # # # # # # # # # #
+# Harness Driver      #
+# # # # # # # # # # # #
+
+def _rows(response):
+    try:
+        found = response.json()
+    except ValueError:
+        return 0
+    return len(found) if isinstance(found, list) else 0
+
+async def search(session, url, text, sequence, pressed, name, stats,
+        timeout):
+    stats.searches += 1
+    try:
+        response = await asyncio.wait_for(apiAsync.get(session, url), timeout)
+    except asyncio.TimeoutError:
+        stats.addFailure('timeout')
+        return
+    except Exception as e:
+        stats.addFailure(type(e).__name__)
+        return
+    name.arrived(sequence)
+    stats.addResponse(time.monotonic() - pressed, response.status_code,
+        len(text.strip()), _rows(response), len(response.content))
+
+async def typeName(session, host, typist, text, stats, timeout):
+    name = NameSearch(stats)
+    pending = []
+    pressed = time.monotonic()
+    for box in keystrokes(text, typist.rng, typist.typoRate):
+        pressed += typist.interval()
+        delay = pressed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sequence = name.keystroke()
+        path = searchPath(box)
+        if path is not None:
+            pending.append(asyncio.ensure_future(search(session, host + path,
+                box, sequence, pressed, name, stats, timeout)))
+    if pending:
+        await asyncio.wait(pending)
+    name.finish()
+
+async def simulateUser(session, args, names, stats, rng):
+    typist = Typist(rng, args.cadence / 1000.0, args.typo_rate)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    for query in range(args.queries):
+        if query:
+            await asyncio.sleep(rng.expovariate(1.0 / args.think))
+        await typeName(session, args.host, typist, rng.choice(names), stats,
+            args.timeout)
+
+async def drive(args, names):
+    session = await apiAsync.createAuthorizedSession(args.host,
+        control.username, control.password)
+    stats = TypeaheadStats()
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+    await asyncio.gather(*(simulateUser(session, args, names, stats,
+        random.Random(rng.random())) for _ in range(args.users)))
+    return stats, time.monotonic() - start
+
+def printReport(report):
+    print('{0} users typed {1} names in {2:.1f}s: {3} keystrokes, {4} '
+        'searches, error rate {5:.2%}.'.format(report['users'],
+        report['names'], report['duration_s'], report['keystrokes'],
+        report['searches'], report['error_rate']))
+    print('Out of order {0:.2%} of responses, superseded {1:.2%} of '
+        'responses, stale final result for {2:.2%} of names.'.format(
+        report['out_of_order_rate'], report['superseded_rate'],
+        report['stale_final_rate']))
+    print('{0:<8} {1:>7} {2:>8} {3:>8} {4:>9} {5:>9} {6:>9} {7:>9}'.format(
+        'PREFIX', 'COUNT', 'ROWS', 'KB', 'P50 ms', 'P95 ms', 'P99 ms',
+        'MAX ms'))
+    fmt = lambda v: '{0:9.1f}'.format(v) if v is not None else '{0:>9}'.format('-')
+    row = '{0:<8} {1:>7} {2:>8} {3:>8} {4} {5} {6} {7}'
+    for s in report['prefixes']:
+        length = s['prefix_length']
+        print(row.format('{0}+'.format(length) if length == LONGEST_PREFIX \
+            else length, s['count'], '{0:.1f}'.format(s['mean_rows']),
+            '{0:.1f}'.format(s['mean_bytes'] / 1024), fmt(s['p50_ms']),
+            fmt(s['p95_ms']), fmt(s['p99_ms']), fmt(s['max_ms'])))
+    print(row.format('all', sum(s['count'] for s in report['prefixes']), '',
+        '', fmt(report['p50_ms']), fmt(report['p95_ms']),
+        fmt(report['p99_ms']), fmt(report['max_ms'])))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=control.hostURL,
+        help='base url of the api (default: hostURL of the test suite)')
+    parser.add_argument('--users', type=int, default=50,
+        help='simulated users typing at once (default: %(default)s)')
+    parser.add_argument('--queries', type=int, default=5,
+        help='names each user types (default: %(default)s)')
+    parser.add_argument('--names', default=None, metavar='PATH',
+        help='file of names to type, one per line (default: a built-in '
+             'list around the suite\'s searchString)')
+    parser.add_argument('--cadence', type=float, default=180.0,
+        help='median milliseconds between keystrokes (default: '
+             '%(default)s)')
+    parser.add_argument('--typo-rate', type=float, default=0.05,
+        help='chance of mistyping a key and backspacing (default: '
+             '%(default)s)')
+    parser.add_argument('--think', type=float, default=3.0,
+        help='mean seconds between names of one user (default: '
+             '%(default)s)')
+    parser.add_argument('--ramp', type=float, default=5.0,
+        help='seconds over which users start (default: %(default)s)')
+    parser.add_argument('--connections', type=int, default=None,
+        help='maximum open connections (default: {0} per user, as a '
+             'browser)'.format(CONNECTIONS_PER_USER))
+    parser.add_argument('--timeout', type=float, default=30.0,
+        help='seconds before a search counts as failed (default: '
+             '%(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for names, typing and start times')
+    parser.add_argument('--output', default=None, metavar='PATH',
+        help='also write the report to PATH as json')
+    args = parser.parse_args()
+    if not args.host.endswith('/'):
+        args.host += '/'
+
+    names = DEFAULT_NAMES
+    if args.names:
+        with open(args.names) as namesFile:
+            names = [line.strip() for line in namesFile if line.strip()]
+        if not names:
+            parser.error('no names in ' + args.names)
+
+    apiAsync.ASYNC_POOL_SIZE = args.connections or \
+        args.users * CONNECTIONS_PER_USER
+    try:
+        stats, elapsed = apiAsync.run(drive(args, names))
+    finally:
+        apiAsync.close()
+    report = {
+        'hostURL': args.host,
+        'users': args.users,
+        'cadence_ms': args.cadence,
+        'duration_s': round(elapsed, 3),
+    }
+    report.update(stats.report())
+    printReport(report)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Latency baselines for the endpoint suite.
+
+A baseline stores, per endpoint ('GET api/memberships/activity/{id}/leaders'),
+a histogram of the latencies seen in a reference run.  A later run is
+compared against it with a one-sided Mann-Whitney U test: an endpoint has
+regressed when its p95 grew by more than the allowed fraction AND its
+latencies are significantly larger than the baseline's, so one slow outlier
+on a small sample is not enough to fail the run.  Endpoints called too few
+times for the test (most of them, in a single run of the suite) are judged
+by their p95 alone, against a wider margin.
+"""
+
+import collections
+import datetime
+import json
+import math
+
+from latency_histogram import LatencyHistogram
+
+# Default allowed p95 growth before an endpoint counts as regressed.
+DEFAULT_THRESHOLD = 0.25
+# Default significance level of the Mann-Whitney U test.
+DEFAULT_ALPHA = 0.05
+# Fewer samples than this on either side and only the p95 check applies.
+MIN_SAMPLES = 3
+# Allowed p95 growth for those endpoints: one slow request moves the p95 of
+# two samples as much as a real regression, so it must at least double.
+DEFAULT_SMALL_SAMPLE_THRESHOLD = 1.0
+
+Regression = collections.namedtuple('Regression',
+    'endpoint baselineP95 currentP95 ratio pValue')
+
+
+def endpointKey(method, route):
+    return method + ' ' + route
+
+
+def samplesFromRecorder(recorder):
+    """Returns {endpoint: LatencyHistogram} for a LatencyRecorder."""
+    with recorder._lock:
+        return { endpointKey(stats.method, stats.route): \
+            stats.histogram.copy() for stats in recorder.endpoints.values() }
+
+
+def samplesFromReport(report):
+    """Returns {endpoint: LatencyHistogram} for a json latency report, such
+    as one merged from parallel workers."""
+    return { endpointKey(entry['method'], entry['route']): \
+        LatencyHistogram.fromBase64(entry['histogram']) \
+        for entry in report['endpoints'] if entry.get('histogram') }
+
+
+def saveBaseline(path, samples, hostURL=None):
+    """Writes samples, as returned by samplesFromRecorder(), to path."""
+    with open(path, 'w') as baselineFile:
+        json.dump({
+            'generated': datetime.datetime.now().isoformat(),
+            'hostURL': hostURL,
+            'endpoints': { endpoint: histogram.toBase64() \
+                for endpoint, histogram in sorted(samples.items()) },
+        }, baselineFile, indent=1)
+
+
+def loadBaseline(path):
+    """Returns {endpoint: LatencyHistogram} read from path."""
+    with open(path) as baselineFile:
+        data = json.load(baselineFile)
+    return { endpoint: LatencyHistogram.fromBase64(stored) \
+        for endpoint, stored in data['endpoints'].items() }
+
+
+def percentile(histogram, p):
+    """p-th percentile of a histogram, in ms."""
+    value = histogram.valueAtPercentile(p)
+    return None if value is None else value / 1000.0
+
+
+def mannWhitneyGreater(current, baseline):
+    """P-value that `current` tends to be larger than `baseline`.
+
+    Both arguments are LatencyHistograms; values sharing a histogram counter
+    count as ties.  Uses the normal approximation with tie correction and a
+    continuity correction.
+
+    Returns:
+        float or None: the one-sided p-value, or None when either side has
+        fewer than MIN_SAMPLES values.
+    """
+    n1 = current.totalCount
+    n2 = baseline.totalCount
+    if n1 < MIN_SAMPLES or n2 < MIN_SAMPLES:
+        return None
+    n = n1 + n2
+    currentCounts = dict(current.iterRecorded())
+    baselineCounts = dict(baseline.iterRecorded())
+
+    rankSum = 0.0
+    tieTerm = 0.0
+    nextRank = 1
+    for value in sorted(set(currentCounts) | set(baselineCounts)):
+        ties = currentCounts.get(value, 0) + baselineCounts.get(value, 0)
+        averageRank = nextRank + (ties - 1) / 2.0
+        rankSum += averageRank * currentCounts.get(value, 0)
+        tieTerm += ties ** 3 - ties
+        nextRank += ties
+
+    u = rankSum - n1 * (n1 + 1) / 2.0
+    mean = n1 * n2 / 2.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - tieTerm / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0 if u <= mean else 0.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD,
+        alpha=DEFAULT_ALPHA,
+        smallSampleThreshold=DEFAULT_SMALL_SAMPLE_THRESHOLD):
+    """Returns the endpoints of `current` that regressed against `baseline`.
+
+    Args:
+        baseline (dict): {endpoint: LatencyHistogram} from loadBaseline().
+        current (dict): {endpoint: LatencyHistogram} from
+            samplesFromRecorder() or samplesFromReport().
+        threshold (float): allowed fractional growth of p95.
+        alpha (float): significance level of the Mann-Whitney U test.
+        smallSampleThreshold (float): allowed fractional growth of p95 when
+            either side has fewer than MIN_SAMPLES values; never less than
+            threshold.
+
+    Returns:
+        list of Regression: worst ratio first.  pValue is None when there
+        were too few samples for the test, in which case p95 grew by more
+        than smallSampleThreshold.
+    """
+    regressions = []
+    for endpoint, histogram in current.items():
+        reference = baseline.get(endpoint)
+        if not reference or not reference.totalCount or \
+                not histogram.totalCount:
+            continue
+        baselineP95 = percentile(reference, 95)
+        currentP95 = percentile(histogram, 95)
+        if baselineP95 <= 0 or currentP95 <= baselineP95 * (1 + threshold):
+            continue
+        pValue = mannWhitneyGreater(histogram, reference)
+        if pValue is not None and pValue >= alpha:
+            continue
+        if pValue is None and currentP95 <= baselineP95 * \
+                (1 + max(threshold, smallSampleThreshold)):
+            continue
+        regressions.append(Regression(endpoint, baselineP95, currentP95,
+            currentP95 / baselineP95, pValue))
+    regressions.sort(key=lambda r: r.ratio, reverse=True)
+    return regressions
+
+
+def gateFails(regressions, gate):
+    """Whether regressions, as returned by compare(), fail a run whose
+    --latency-gate is gate ('warn' or 'fail')."""
+    return gate == 'fail' and bool(regressions)
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+"""High dynamic range latency histogram.
+
+Usage:
+    [python3] latency_histogram.py merge OUTPUT REPORT [REPORT ...]
+
+A LatencyHistogram records integer values (microseconds by convention) into
+a fixed array of counters laid out like HdrHistogram: values are grouped into
+power-of-two buckets, each split into enough linear sub-buckets to keep
+every recorded value within the configured number of significant figures.
+Memory is fixed by the trackable range and precision, not by how many values
+are recorded, so a soak run with millions of samples costs the same as a
+run with ten.
+
+Two histograms with the same layout merge losslessly by adding counters,
+which is how results from parallel pytest workers and load generator
+processes are combined.  encode()/decode() give a compact, compressed form
+for json reports and files.
+
+The merge command combines latency reports written by the test suite
+(latency_report.json) or by gordon_360_load.py, endpoint by endpoint.
+"""
+
+import array
+import base64
+import json
+import math
+import struct
+import sys
+import zlib
+
+# One hour in microseconds.
+DEFAULT_HIGHEST = 3600 * 1000 * 1000
+# Values are kept to 2 significant figures, i.e. within 1%.
+DEFAULT_SIGNIFICANT_FIGURES = 2
+
+_HEADER = struct.Struct('<4sBQQ')
+_MAGIC = b'G3H1'
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram of non-negative integer values."""
+
+    def __init__(self, lowest=1, highest=DEFAULT_HIGHEST,
+            significantFigures=DEFAULT_SIGNIFICANT_FIGURES):
+        """
+        Args:
+            lowest (int): smallest value that must be told apart from 0.
+            highest (int): largest value tracked; larger ones are clamped.
+            significantFigures (int): precision kept for every value, 1-5.
+        """
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError('need 1 <= lowest and 2 * lowest <= highest')
+        if not 1 <= significantFigures <= 5:
+            raise ValueError('significantFigures must be between 1 and 5')
+        self.lowest = lowest
+        self.highest = highest
+        self.significantFigures = significantFigures
+
+        largestSingleUnit = 2 * 10 ** significantFigures
+        subBucketCountMagnitude = int(math.ceil(math.log2(largestSingleUnit)))
+        self._subBucketHalfCountMagnitude = max(subBucketCountMagnitude, 1) - 1
+        self._unitMagnitude = int(math.floor(math.log2(lowest)))
+        self._subBucketCount = 2 ** (self._subBucketHalfCountMagnitude + 1)
+        self._subBucketHalfCount = self._subBucketCount // 2
+        self._subBucketMask = (self._subBucketCount - 1) << self._unitMagnitude
+
+        smallestUntrackable = self._subBucketCount << self._unitMagnitude
+        bucketCount = 1
+        while smallestUntrackable <= highest:
+            smallestUntrackable <<= 1
+            bucketCount += 1
+        self._bucketCount = bucketCount
+
+        self.counts = array.array('Q',
+            bytes(8 * (bucketCount + 1) * self._subBucketHalfCount))
+        self.totalCount = 0
+        self.minValue = None
+        self.maxValue = None
+        self._sum = 0
+
+    # Layout
+
+    def _index(self, value):
+        bucket = (value | self._subBucketMask).bit_length() \
+            - self._unitMagnitude - (self._subBucketHalfCountMagnitude + 1)
+        subBucket = value >> (bucket + self._unitMagnitude)
+        return ((bucket + 1) << self._subBucketHalfCountMagnitude) \
+            + subBucket - self._subBucketHalfCount
+
+    def _lowestAt(self, index):
+        bucket = (index >> self._subBucketHalfCountMagnitude) - 1
+        subBucket = (index & (self._subBucketHalfCount - 1)) \
+            + self._subBucketHalfCount
+        if bucket < 0:
+            subBucket -= self._subBucketHalfCount
+            bucket = 0
+        return subBucket << (bucket + self._unitMagnitude)
+
+    def _rangeAt(self, index):
+        bucket = max((index >> self._subBucketHalfCountMagnitude) - 1, 0)
+        return 1 << (bucket + self._unitMagnitude)
+
+    def sameLayout(self, other):
+        return (self.lowest, self.highest, self.significantFigures) == \
+            (other.lowest, other.highest, other.significantFigures)
+
+    # Recording
+
+    def record(self, value, count=1):
+        """Record `count` occurrences of an integer value."""
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.totalCount += count
+        self._sum += value * count
+        if self.minValue is None or value < self.minValue:
+            self.minValue = value
+        if self.maxValue is None or value > self.maxValue:
+            self.maxValue = value
+
+    def recordSeconds(self, seconds):
+        """Record a duration given in seconds, stored as microseconds."""
+        self.record(int(round(seconds * 1000000)))
+
+    def merge(self, other):
+        """Add every value recorded in `other` to this histogram."""
+        if other.totalCount == 0:
+            return self
+        if self.sameLayout(other):
+            counts = self.counts
+            for index, count in enumerate(other.counts):
+                if count:
+                    counts[index] += count
+            self.totalCount += other.totalCount
+            self._sum += other._sum
+        else:
+            for value, count in other.iterRecorded():
+                self.record(value, count)
+        for bound in other.minValue, other.maxValue:
+            self.minValue = bound if self.minValue is None \
+                else min(self.minValue, bound)
+            self.maxValue = bound if self.maxValue is None \
+                else max(self.maxValue, bound)
+        return self
+
+    def copy(self):
+        result = LatencyHistogram(self.lowest, self.highest,
+            self.significantFigures)
+        return result.merge(self)
+
+    # Queries
+
+    def iterRecorded(self):
+        """Yields (value, count) for every non-empty counter, ascending.
+
+        value is the middle of the counter's range of equivalent values.
+        """
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self._lowestAt(index) + self._rangeAt(index) // 2, count
+
+    def valueAtPercentile(self, p):
+        """Return the value below which p percent of recorded values fall.
+
+        Like HdrHistogram, this reports the highest value equivalent to the
+        recorded one, clamped to the largest value actually recorded.
+        """
+        if self.totalCount == 0:
+            return None
+        target = max(int(math.ceil(p / 100.0 * self.totalCount)), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    highest = self._lowestAt(index) + self._rangeAt(index) - 1
+                    return min(highest, self.maxValue)
+        return self.maxValue
+
+    @property
+    def mean(self):
+        return self._sum / self.totalCount if self.totalCount else None
+
+    def buckets(self, unit=1, base=2):
+        """Return [(upper bound, count)] in coarse powers of `base`, for
+        printing.  Bounds are in multiples of `unit`, e.g. 1000 for ms."""
+        result = {}
+        for value, count in self.iterRecorded():
+            scaled = max(value / unit, 1)
+            upper = base ** max(int(math.ceil(math.log(scaled, base))), 0)
+            result[upper] = result.get(upper, 0) + count
+        return sorted(result.items())
+
+    # Serialization
+
+    def encode(self):
+        """Return the histogram as compact compressed bytes."""
+        body = bytearray()
+        previous = -1
+        for index, count in enumerate(self.counts):
+            if count:
+                _writeVarint(body, index - previous - 1)
+                _writeVarint(body, count)
+                previous = index
+        summary = bytearray()
+        _writeVarint(summary, self.totalCount)
+        _writeVarint(summary, self._sum)
+        _writeVarint(summary, self.minValue or 0)
+        _writeVarint(summary, self.maxValue or 0)
+        header = _HEADER.pack(_MAGIC, self.significantFigures, self.lowest,
+            self.highest)
+        return header + zlib.compress(bytes(summary + body), 9)
+
+    @classmethod
+    def decode(cls, data):
+        """Rebuild a histogram from the output of encode()."""
+        magic, figures, lowest, highest = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError('not an encoded latency histogram')
+        histogram = cls(lowest, highest, figures)
+        body = zlib.decompress(data[_HEADER.size:])
+        position = 0
+        values = []
+        for _ in range(4):
+            value, position = _readVarint(body, position)
+            values.append(value)
+        histogram.totalCount, histogram._sum = values[0], values[1]
+        if histogram.totalCount:
+            histogram.minValue, histogram.maxValue = values[2], values[3]
+        index = -1
+        while position < len(body):
+            gap, position = _readVarint(body, position)
+            count, position = _readVarint(body, position)
+            index += gap + 1
+            histogram.counts[index] = count
+        return histogram
+
+    def toBase64(self):
+        return base64.b64encode(self.encode()).decode('ascii')
+
+    @classmethod
+    def fromBase64(cls, text):
+        return cls.decode(base64.b64decode(text))
+
+    def save(self, path):
+        with open(path, 'wb') as histogramFile:
+            histogramFile.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as histogramFile:
+            return cls.decode(histogramFile.read())
+
+
+def _writeVarint(buffer, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            buffer.append(byte | 0x80)
+        else:
+            buffer.append(byte)
+            return
+
+def _readVarint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def summarize(histogram):
+    """Return the percentile fields shared by every latency report, in ms."""
+    ms = lambda us: None if us is None else round(us / 1000.0, 3)
+    return {
+        'p50_ms': ms(histogram.valueAtPercentile(50)),
+        'p90_ms': ms(histogram.valueAtPercentile(90)),
+        'p95_ms': ms(histogram.valueAtPercentile(95)),
+        'p99_ms': ms(histogram.valueAtPercentile(99)),
+        'max_ms': ms(histogram.maxValue),
+        'mean_ms': ms(histogram.mean),
+        'histogram': histogram.toBase64(),
+    }
+
+
+def _endpointKey(entry):
+    if 'route' in entry:
+        return (entry.get('method'), entry['route'])
+    return (None, entry['endpoint'])
+
+def _addFields(target, source):
+    for field, value in source.items():
+        if field == 'histogram' or field.endswith('_ms') or \
+                field in ('method', 'route', 'endpoint'):
+            continue
+        if isinstance(value, dict):
+            merged = target.setdefault(field, {})
+            for key, n in value.items():
+                merged[key] = merged.get(key, 0) + n
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            target[field] = target.get(field, 0) + value
+
+def mergeReports(reports):
+    """Merge json latency reports endpoint by endpoint.
+
+    Counters are summed and percentiles are recomputed from the merged
+    histograms.  Rates and ratios (throughput_rps, error_rate) are summed
+    too, so recompute them if the reports covered different time spans.
+
+    Args:
+        reports (list of dict): reports with an 'endpoints' list whose
+            entries carry a base64 'histogram'.
+
+    Returns:
+        dict: a report of the same shape.
+    """
+    merged = {}
+    histograms = {}
+    for report in reports:
+        for entry in report.get('endpoints', []):
+            key = _endpointKey(entry)
+            target = merged.get(key)
+            if target is None:
+                target = merged[key] = { field: entry[field] for field in \
+                    ('method', 'route', 'endpoint') if field in entry }
+            _addFields(target, entry)
+            if entry.get('histogram'):
+                histogram = LatencyHistogram.fromBase64(entry['histogram'])
+                if key in histograms:
+                    histograms[key].merge(histogram)
+                else:
+                    histograms[key] = histogram
+    for key, target in merged.items():
+        if key in histograms:
+            target.update(summarize(histograms[key]))
+        if 'errors' in target and target.get('count'):
+            target['error_rate'] = round(target['errors'] / target['count'], 4)
+    result = { field: value for field, value in reports[0].items() \
+        if field != 'endpoints' } if reports else {}
+    result['merged_from'] = len(reports)
+    result['endpoints'] = sorted(merged.values(),
+        key=lambda entry: entry.get('p95_ms') or 0, reverse=True)
+    return result
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] != 'merge':
+        print(__doc__)
+        return 2
+    reports = []
+    for path in sys.argv[3:]:
+        with open(path) as reportFile:
+            reports.append(json.load(reportFile))
+    with open(sys.argv[2], 'w') as outputFile:
+        json.dump(mergeReports(reports), outputFile, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,35 +1,698 @@
+import codecs
+import collections
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import cassette as cassettes
+import route_trie
+from latency_histogram import LatencyHistogram, summarize
 
 # Test Components
 
 def get(session, url):
-    response = session.get(url)
+    response = _timed(session, 'GET', url)
     return response
 
 def post(session, url, resource):
-    response = session.post(url, resource)
+    response = _timed(session, 'POST', url, data=resource)
     return response
 
 def postAsJson(session, url, resource):
-    response = session.post(url, json=resource)
+    response = _timed(session, 'POST', url, json=resource)
     return response
 
 def postAsFormData(session, url, resource):
-    response = session.post(url, files=resource)
+    response = _timed(session, 'POST', url, files=resource)
     return response
 
 def put(session, url, resource):
-    response = session.put(url, resource)
+    response = _timed(session, 'PUT', url, data=resource)
     return response
 
 def putAsJson(session, url, resource):
-    response = session.put(url, json=resource)
+    response = _timed(session, 'PUT', url, json=resource)
     return response
 
 def delete(session, url):
-    response = session.delete(url)
+    response = _timed(session, 'DELETE', url)
     return response
 
+def getStream(session, url):
+    """GET url without reading the body yet.
+
+    Returns:
+        StreamedResponse: read a json array body with its items(), head()
+        or validate() methods, which decode it as it arrives.
+    """
+    connectionsBefore = _connectionCount(session, url)
+    start = time.perf_counter()
+    response = session.request('GET', url, stream=True)
+    reused = None
+    if connectionsBefore is not None:
+        reused = _connectionCount(session, url) == connectionsBefore
+    return StreamedResponse(response, start, reused)
+
+# Called with every ApiResponse the helpers above return, e.g. by
+# conftest.py to check it against its schema in response_schemas.py.
+responseCheck = None
+
+def _timed(session, method, url, **kwargs):
+    connectionsBefore = _connectionCount(session, url)
+    start = time.perf_counter()
+    response = session.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - start
+    if cassette is not None and cassette.mode == cassettes.REPLAY:
+        # Report the latency of the recorded run, not of the lookup.
+        elapsed = response.elapsed.total_seconds()
+    reused = None
+    if connectionsBefore is not None:
+        reused = _connectionCount(session, url) == connectionsBefore
+    recorder.record(method, url, response.status_code, elapsed,
+        _bodySize(response.request.body), len(response.content), reused)
+    response = ApiResponse(response)
+    if responseCheck is not None:
+        responseCheck(response)
+    return response
+
+def _connectionCount(session, url):
+    # Connections opened so far by the urllib3 pools behind the session's
+    # adapter.  The count only grows when a request could not reuse a
+    # kept-alive connection.
+    if cassette is not None and cassette.mode == cassettes.REPLAY:
+        return None
+    try:
+        pools = session.get_adapter(url).poolmanager.pools
+    except (AttributeError, requests.exceptions.InvalidSchema):
+        return None
+    count = 0
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is not None:
+            count += pool.num_connections
+    return count
+
+def _bodySize(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+# Responses
+
+def _loads(content):
+    if content.startswith(codecs.BOM_UTF8):
+        content = content[len(codecs.BOM_UTF8):]
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+class ApiResponse:
+    """Wraps a requests.Response so its json body is decoded only once.
+
+    The first call to json() parses the body, with orjson when it is
+    installed, and later calls return the same object, so tests can call
+    response.json() once per assertion without re-parsing large lists.
+    Don't modify the returned object unless later calls should see the
+    change.  Everything else is passed through to the wrapped response,
+    available as .response.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self._json = None
+        self._parsed = False
+
+    def json(self, **kwargs):
+        """Return the decoded json body, parsing it on the first call.
+
+        Keyword arguments are passed on to requests' json() and bypass the
+        cache.
+
+        Raises:
+            ValueError: when the body is not json, as requests' json() does.
+        """
+        if kwargs:
+            return self.response.json(**kwargs)
+        if not self._parsed:
+            try:
+                self._json = _loads(self.response.content)
+            except ValueError:
+                # Not utf-8, or not json: let requests decide, and raise its
+                # own error if it must.
+                self._json = self.response.json()
+            self._parsed = True
+        return self._json
+
+    def iterItems(self):
+        """Yield the elements of a json array body one at a time.
+
+        Unlike json(), this decodes elements only as they are consumed, so
+        checks that stop early (any(), next()) on big lists such as
+        api/memberships/ or api/events/25Live/All skip most of the work.
+
+        Raises:
+            ValueError: when the body is not a json array.
+        """
+        if self._parsed:
+            if not isinstance(self._json, list):
+                raise ValueError('The response body is not a json array.')
+            yield from self._json
+            return
+        text = self.response.text
+        decoder = json.JSONDecoder()
+        position = _skipSpace(text, 0)
+        if text[position:position + 1] != '[':
+            raise ValueError('The response body is not a json array.')
+        position = _skipSpace(text, position + 1)
+        if text[position:position + 1] == ']':
+            return
+        while True:
+            item, position = decoder.raw_decode(text, position)
+            yield item
+            position = _skipSpace(text, position)
+            separator = text[position:position + 1]
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError('Expected , or ] at character {0}.'\
+                    .format(position))
+            position = _skipSpace(text, position + 1)
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def __bool__(self):
+        return bool(self.response)
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def __repr__(self):
+        return repr(self.response)
+
+def _skipSpace(text, position):
+    while position < len(text) and text[position] in ' \t\r\n':
+        position += 1
+    return position
+
+
+# Streamed Responses
+
+# Bytes read from the socket at a time by StreamedResponse.
+STREAM_CHUNK_SIZE = 64 * 1024
+# Elements decoded before they are checked together by a schema with a
+# checkBatch() method (see response_schemas.py).
+SCHEMA_BATCH_SIZE = 1000
+
+def checkItem(item, schema, index=None):
+    """Assert that one element of a json array matches a schema.
+
+    Args:
+        item: the decoded element.
+        schema: a dict mapping every required field to its type, a tuple of
+            types, or None for any type; or a callable that takes the item
+            and raises AssertionError when it does not match.
+        index (int): position of the item, for the message.
+
+    Raises:
+        AssertionError: naming the first field that does not match.
+    """
+    where = 'Element' if index is None else 'Element {0}'.format(index)
+    if callable(schema):
+        schema(item)
+        return
+    if not isinstance(item, dict):
+        raise AssertionError('{0} is {1}, expected an object.'.format(where,
+            type(item).__name__))
+    for field, expected in schema.items():
+        if field not in item:
+            raise AssertionError('{0} has no field {1!r}.'.format(where,
+                field))
+        if expected is not None and not isinstance(item[field], expected):
+            raise AssertionError('{0}: {1!r} is {2}, expected {3}.'.format(
+                where, field, type(item[field]).__name__,
+                ' or '.join(t.__name__ for t in expected) \
+                if isinstance(expected, tuple) else expected.__name__))
+
+def iterArray(chunks):
+    """Yield the elements of a json array from chunks of its utf-8 bytes.
+
+    Only the text of the element being decoded is held, so memory does not
+    grow with the length of the array.
+
+    Raises:
+        ValueError: when the bytes are not a json array.
+    """
+    text = ''
+    position = 0
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder('utf-8-sig')('strict')
+    jsonDecoder = json.JSONDecoder()
+    exhausted = False
+
+    def more():
+        nonlocal text, position, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            text = text[position:] + decoder.decode(b'', final=True)
+        else:
+            text = text[position:] + decoder.decode(chunk)
+        position = 0
+
+    def nextToken():
+        # Position of the next non-blank character, reading as needed.
+        nonlocal position
+        while True:
+            position = _skipSpace(text, position)
+            if position < len(text) or exhausted:
+                return text[position:position + 1]
+            more()
+
+    if nextToken() != '[':
+        raise ValueError('The response body is not a json array.')
+    position += 1
+    if nextToken() == ']':
+        return
+    while True:
+        try:
+            item, end = jsonDecoder.raw_decode(text, position)
+        except ValueError:
+            if exhausted:
+                raise
+            more()
+            continue
+        if end == len(text) and not exhausted:
+            # A number may go on in the next chunk; decode it again then.
+            more()
+            continue
+        position = end
+        yield item
+        separator = nextToken()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError('Expected , or ] in the json array, got {0!r}.'\
+                .format(separator))
+        position += 1
+        nextToken()
+
+class StreamedResponse:
+    """A response whose json array body is decoded as it arrives.
+
+    Returned by getStream().  Tests of big lists that only look at the
+    first few elements, or check every element for one property, use it
+    instead of json(), which holds the whole body and every decoded element
+    in memory at once.  Stopping early closes the connection instead of
+    reading the rest of the body.  The request is recorded for the latency
+    report when the body has been read or the response is closed, with the
+    bytes actually read.  Everything else is passed through to the wrapped
+    requests.Response, available as .response.
+    """
+
+    def __init__(self, response, start, reused=None):
+        self.response = response
+        self._start = start
+        self._reused = reused
+        self._bytesRead = 0
+        self._recorded = False
+        self._started = False
+
+    def _chunks(self):
+        for chunk in self.response.iter_content(STREAM_CHUNK_SIZE):
+            self._bytesRead += len(chunk)
+            yield chunk
+
+    def items(self, schema=None, limit=None):
+        """Yield the elements of the json array body, checking each one.
+
+        Args:
+            schema: checked against every element, see checkItem().  A
+                response_schemas.Schema checks SCHEMA_BATCH_SIZE elements
+                at a time.
+            limit (int): stop after this many elements.
+
+        Raises:
+            ValueError: when the body is not a json array.
+            AssertionError: when an element does not match the schema.
+        """
+        if self._started:
+            raise ValueError('The body of a streamed response is read once.')
+        self._started = True
+        if limit is not None and limit <= 0:
+            self.close()
+            return
+        try:
+            elements = iterArray(self._chunks())
+            if limit is not None:
+                elements = itertools.islice(elements, limit)
+            checkBatch = getattr(schema, 'checkBatch', None)
+            if checkBatch is None:
+                for index, item in enumerate(elements):
+                    if schema is not None:
+                        checkItem(item, schema, index)
+                    yield item
+                return
+            offset = 0
+            while True:
+                batch = list(itertools.islice(elements, SCHEMA_BATCH_SIZE))
+                if not batch:
+                    return
+                checkBatch(batch, offset)
+                yield from batch
+                offset += len(batch)
+        finally:
+            self.close()
+
+    def head(self, count, schema=None):
+        """Return the first count elements, checked against schema, and stop
+        reading.  Fewer are returned when the array is shorter."""
+        return list(self.items(schema, count))
+
+    def validate(self, schema=None):
+        """Check every element against schema, keeping none of them.
+
+        Returns:
+            int: the number of elements.
+        """
+        count = 0
+        for _ in self.items(schema):
+            count += 1
+        return count
+
+    def json(self):
+        """Read and decode the whole body, as ApiResponse.json() does."""
+        if self._started:
+            raise ValueError('The body of a streamed response is read once.')
+        self._started = True
+        try:
+            return _loads(b''.join(self._chunks()))
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop reading, release the connection and record the request."""
+        self.response.close()
+        if not self._recorded:
+            self._recorded = True
+            recorder.record('GET', self.response.url,
+                self.response.status_code, time.perf_counter() - self._start,
+                0, self._bytesRead, self._reused)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def __repr__(self):
+        return repr(self.response)
+
+
+# Latency Recording
+
+def routeTemplate(url, method=None):
+    """Return the controller route template a url was served by.
+
+    For example 'https://host/api/memberships/activity/AJG/leaders' becomes
+    'api/memberships/activity/{id}/leaders'.  Urls that match no route in
+    Gordon360/ApiControllers (or when the controllers are not available)
+    get numeric segments replaced by '{id}' instead.
+
+    Args:
+        url (str): full url that was requested.
+        method (str): HTTP verb, to pick between routes of different verbs.
+    """
+    trie = route_trie.defaultTrie()
+    if trie is not None:
+        found = trie.match(url, method)
+        if found is not None:
+            return found.template
+    path = urlsplit(url).path.strip('/')
+    segments = ['{id}' if segment.isdigit() else segment \
+        for segment in path.split('/')]
+    return '/'.join(segments)
+
+class EndpointStats:
+    """Timings and sizes of every call made to one method and route."""
+
+    def __init__(self, method, route):
+        self.method = method
+        self.route = route
+        self.histogram = LatencyHistogram()
+        self.statuses = collections.Counter()
+        self.requestBytes = 0
+        self.responseBytes = 0
+        self.reused = 0
+        self.newConnections = 0
+
+    def add(self, status, elapsed, requestBytes, responseBytes, reused):
+        self.histogram.recordSeconds(elapsed)
+        self.statuses[status] += 1
+        self.requestBytes += requestBytes
+        self.responseBytes += responseBytes
+        if reused is True:
+            self.reused += 1
+        elif reused is False:
+            self.newConnections += 1
+
+    def summary(self):
+        summary = {
+            'method': self.method,
+            'route': self.route,
+            'count': self.histogram.totalCount,
+            'statuses': { str(status): n for status, n in \
+                sorted(self.statuses.items()) },
+            'request_bytes': self.requestBytes,
+            'response_bytes': self.responseBytes,
+            'reused_connections': self.reused,
+            'new_connections': self.newConnections,
+        }
+        summary.update(summarize(self.histogram))
+        return summary
+
+class LatencyRecorder:
+    """Collects the timing of every request made through these helpers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, method, url, status, elapsed, requestBytes=0,
+            responseBytes=0, reused=None):
+        """Record one completed request.
+
+        Args:
+            method (str): HTTP verb.
+            url (str): full url that was requested.
+            status (int): response status code.
+            elapsed (float): seconds from sending to the full body arriving.
+            requestBytes (int): size of the request body.
+            responseBytes (int): size of the response body.
+            reused (bool): whether a kept-alive connection was used, or None
+                when unknown.
+        """
+        key = (method, routeTemplate(url, method))
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats(*key)
+            stats.add(status, elapsed, requestBytes, responseBytes, reused)
+
+    def report(self):
+        """Return one summary per endpoint, slowest p95 first."""
+        with self._lock:
+            summaries = [stats.summary() for stats in self.endpoints.values()]
+        summaries.sort(key=lambda summary: summary['p95_ms'], reverse=True)
+        return summaries
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+
+recorder = LatencyRecorder()
+
+
+# Connection Pooling
+
+# Connections kept alive per host by pooled sessions.  Override with the
+# GORDON360_POOL_SIZE environment variable or pytest's --pool-size option.
+POOL_SIZE = int(os.environ.get('GORDON360_POOL_SIZE', 10))
+
+def createPooledSession(poolSize=None):
+    """Return a session whose connections are kept alive and reused.
+
+    Args:
+        poolSize (int): connections kept per host, defaults to POOL_SIZE.
+
+    Returns:
+        requests.Session: session with a pooled HTTPAdapter mounted.
+    """
+    if poolSize is None:
+        poolSize = POOL_SIZE
+    session = requests.Session()
+    _mountAdapter(session, poolSize)
+    return session
+
+def _mountAdapter(session, poolSize):
+    if cassette is None:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=poolSize)
+    else:
+        adapter = cassettes.CassetteAdapter(cassette, pool_connections=4,
+            pool_maxsize=poolSize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+_guestSession = None
+_guestLock = threading.Lock()
+
+def getGuestSession():
+    """Return the shared unauthenticated session."""
+    global _guestSession
+    with _guestLock:
+        if _guestSession is None:
+            _guestSession = createPooledSession()
+        return _guestSession
+
+
+# Record and Replay
+
+# The cassette every pooled session records to or replays from, if any.  Set
+# with useCassette(), pytest's --cassette option or the GORDON360_CASSETTE and
+# GORDON360_CASSETTE_MODE environment variables.
+cassette = None
+
+def useCassette(path, mode=cassettes.REPLAY):
+    """Record or replay all traffic of the pooled sessions.
+
+    Sessions created from now on use the cassette, and so do the token and
+    guest sessions that already exist.
+
+    Args:
+        path (str): cassette file, see cassette.py.
+        mode (str): 'record' or 'replay'.
+
+    Returns:
+        cassette.Cassette: the cassette in use.
+    """
+    global cassette
+    cassette = cassettes.Cassette(path, mode)
+    for session in (tokenCache._tokenSession, _guestSession):
+        if session is not None:
+            _mountAdapter(session, POOL_SIZE)
+    tokenCache.invalidate()
+    return cassette
+
+
+# Token Cache
+
+# Seconds before a token's expiry at which it is refreshed.
+TOKEN_REFRESH_MARGIN = 60
+
+class TokenCache:
+    """Process-wide cache of bearer tokens and the sessions that carry them.
+
+    One token is issued per (username, password, hostURL).  The session
+    handed out for a key is reused for as long as its token is valid, so
+    callers share both the token and the underlying connection pool.  A
+    token is re-issued shortly before the `expires_in` reported by the
+    token endpoint elapses.
+    """
+
+    def __init__(self, refreshMargin=TOKEN_REFRESH_MARGIN):
+        self.refreshMargin = refreshMargin
+        self._lock = threading.Lock()
+        self._keyLocks = {}
+        self._entries = {}
+        self._tokenSession = createPooledSession()
+
+    def getSession(self, hostURL, username, password):
+        """Return an authorized session for the given credentials.
+
+        Args:
+            hostURL (str): base url of the api, ending in '/'.
+            username (str): login of the account.
+            password (str): password of the account.
+
+        Returns:
+            requests.Session: session with a valid Authorization header.
+        """
+        key = (username, password, hostURL)
+        with self._lock:
+            keyLock = self._keyLocks.setdefault(key, threading.Lock())
+        # Only one thread fetches a token for a given key; the others wait
+        # for it rather than flooding the token endpoint.
+        with keyLock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry["refreshAt"]:
+                entry = self._issue(key, entry)
+                self._entries[key] = entry
+            return entry["session"]
+
+    def invalidate(self, hostURL=None, username=None):
+        """Forget cached tokens, optionally only for one host or user."""
+        with self._lock:
+            keyLocks = [(key, keyLock) for key, keyLock \
+                in self._keyLocks.items() \
+                if (hostURL is None or key[2] == hostURL) and \
+                    (username is None or key[0] == username)]
+        # Under the key's lock, so a token being issued for it is dropped
+        # once it is stored rather than stored after being dropped.
+        for key, keyLock in keyLocks:
+            with keyLock:
+                self._entries.pop(key, None)
+
+    def _issue(self, key, entry):
+        username, password, hostURL = key
+        issuedAt = time.monotonic()
+        r = self._tokenSession.post(hostURL + 'token', { 'username':username, \
+            'password':password, 'grant_type':'password' })
+        if r.status_code != 200:
+            raise requests.exceptions.HTTPError('Could not get a token for '
+                '{0} from {1}: {2} {3}'.format(username, hostURL,
+                r.status_code, r.text[:200]), response=r)
+        body = r.json()
+        access_token = body["access_token"]
+        # A token without expires_in is kept until invalidate() is called.
+        expiresIn = float(body.get("expires_in", math.inf))
+        if entry is None:
+            session = createPooledSession()
+            session.verify = True
+        else:
+            session = entry["session"]
+        session.headers.update({ "Authorization":"Bearer " + access_token })
+        return {
+            "session": session,
+            "refreshAt": issuedAt + max(expiresIn - self.refreshMargin, 0),
+        }
+
+tokenCache = TokenCache()
+
+if os.environ.get('GORDON360_CASSETTE'):
+    useCassette(os.environ['GORDON360_CASSETTE'],
+        os.environ.get('GORDON360_CASSETTE_MODE', cassettes.REPLAY))
+
 
 # Test Case Base Class
 
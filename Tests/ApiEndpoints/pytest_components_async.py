@@ -0,0 +1,178 @@
+import asyncio
+import collections
+import os
+import threading
+import time
+
+import aiohttp
+
+import pytest_components as api
+
+# Async Test Components
+#
+# Coroutine versions of the helpers in pytest_components.  All sessions share
+# one connection pool and one event loop, which lives for the whole run, so
+# independent reads can be issued together with asyncio.gather().
+
+# Connections the shared pool keeps open across all hosts.  Override with the
+# GORDON360_ASYNC_POOL_SIZE environment variable.
+ASYNC_POOL_SIZE = int(os.environ.get('GORDON360_ASYNC_POOL_SIZE', 50))
+
+Request = collections.namedtuple('Request', 'method url')
+
+class Response:
+    """Fully read response, shaped like the ApiResponse tests use: json()
+    parses the body on the first call and returns the same object after
+    that, and .request carries the method and url."""
+
+    def __init__(self, method, url, status_code, headers, content):
+        self.request = Request(method, url)
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self._json = None
+        self._parsed = False
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        if not self._parsed:
+            self._json = api._loads(self.content)
+            self._parsed = True
+        return self._json
+
+async def _send(session, method, url, **kwargs):
+    trace = { 'reused':None, 'requestBytes':0 }
+    start = time.perf_counter()
+    async with session.request(method, url, trace_request_ctx=trace,
+            **kwargs) as response:
+        content = await response.read()
+    elapsed = time.perf_counter() - start
+    api.recorder.record(method, url, response.status, elapsed,
+        trace['requestBytes'], len(content), trace['reused'])
+    response = Response(method, str(response.url), response.status,
+        response.headers, content)
+    # The same check the synchronous helpers make, e.g. the schema check of
+    # conftest.py.
+    if api.responseCheck is not None:
+        api.responseCheck(response)
+    return response
+
+def _traceConfig():
+    # Feeds connection reuse and request size into the trace dict of _send.
+    async def onReuse(session, context, params):
+        context.trace_request_ctx['reused'] = True
+
+    async def onCreate(session, context, params):
+        context.trace_request_ctx['reused'] = False
+
+    async def onChunkSent(session, context, params):
+        context.trace_request_ctx['requestBytes'] += len(params.chunk)
+
+    traceConfig = aiohttp.TraceConfig()
+    traceConfig.on_connection_reuseconn.append(onReuse)
+    traceConfig.on_connection_create_end.append(onCreate)
+    traceConfig.on_request_chunk_sent.append(onChunkSent)
+    return traceConfig
+
+def _form(resource):
+    # requests sends lists as repeated form fields; aiohttp needs pairs.
+    if not isinstance(resource, dict):
+        return resource
+    pairs = []
+    for key, value in resource.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        pairs.extend((key, str(v)) for v in values if v is not None)
+    return pairs
+
+async def get(session, url):
+    return await _send(session, 'GET', url)
+
+async def post(session, url, resource):
+    return await _send(session, 'POST', url, data=_form(resource))
+
+async def postAsJson(session, url, resource):
+    return await _send(session, 'POST', url, json=resource)
+
+async def postAsFormData(session, url, resource):
+    form = aiohttp.FormData()
+    for name, value in resource.items():
+        form.add_field(name, value, filename=getattr(value, 'name', name))
+    return await _send(session, 'POST', url, data=form)
+
+async def put(session, url, resource):
+    return await _send(session, 'PUT', url, data=_form(resource))
+
+async def putAsJson(session, url, resource):
+    return await _send(session, 'PUT', url, json=resource)
+
+async def delete(session, url):
+    return await _send(session, 'DELETE', url)
+
+async def getMany(session, urls):
+    """GET every url concurrently; responses come back in the same order."""
+    return await asyncio.gather(*(get(session, url) for url in urls))
+
+
+# Shared Loop and Pool
+
+_loop = None
+_connector = None
+_sessions = []
+_lock = threading.Lock()
+
+def getLoop():
+    """Return the event loop shared by every async test."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+        return _loop
+
+def run(coroutine):
+    """Run a coroutine to completion on the shared loop."""
+    return getLoop().run_until_complete(coroutine)
+
+async def _getConnector():
+    global _connector
+    if _connector is None or _connector.closed:
+        _connector = aiohttp.TCPConnector(limit=ASYNC_POOL_SIZE)
+    return _connector
+
+async def createSession(headers=None):
+    """Return a session that draws its connections from the shared pool."""
+    session = aiohttp.ClientSession(connector=await _getConnector(),
+        connector_owner=False, headers=headers,
+        trace_configs=[_traceConfig()])
+    _sessions.append(session)
+    return session
+
+async def createAuthorizedSession(hostURL, username, password):
+    """Return a session carrying the cached bearer token for an account."""
+    loop = asyncio.get_running_loop()
+    syncSession = await loop.run_in_executor(None, api.tokenCache.getSession,
+        hostURL, username, password)
+    return await createSession(
+        { 'Authorization':syncSession.headers['Authorization'] })
+
+async def createGuestSession():
+    return await createSession()
+
+def close():
+    """Close every session, the shared pool and the shared loop."""
+    global _connector
+    if _loop is None or _loop.is_closed():
+        return
+
+    async def closeAll():
+        while _sessions:
+            await _sessions.pop().close()
+        if _connector is not None:
+            await _connector.close()
+
+    _loop.run_until_complete(closeAll())
+    _connector = None
+    _loop.close()
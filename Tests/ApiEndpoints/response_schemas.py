@@ -0,0 +1,516 @@
+"""Schemas of the api's json responses, keyed by route template.
+
+Every route the suite calls that answers with json has a Schema here: the
+fields each record must have and their types, plus rules such as "no
+record shows the Gordon ID of someone else".  validate() checks a response
+against the schema of the route it was served by.  conftest.py does that
+for every 2xx response made through pytest_components (see its
+--check-schemas option, which sets checkMode), and streamed responses are
+checked by passing checkFor(url) to their items(), head() or validate().
+
+The schemas are compiled when this module is imported: each becomes one
+itemgetter for all of its fields and the tuple of their types.  A list
+body is checked as a whole: map() runs the itemgetter and type() over
+every record, in C, to collect the distinct combinations of field types in
+the list, and only those, usually one or two, are compared with the schema
+in Python.  Combinations that matched once are remembered, and a missing
+field shows up as the itemgetter's KeyError.  Only when a check fails is
+the list scanned again to name the first bad record.
+"""
+
+import itertools
+import operator
+import warnings
+
+from route_trie import RouteTrie
+
+NONE = type(None)
+
+# Field types.  Dates and times are serialized as strings.
+TEXT = str
+MAYBE_TEXT = (str, NONE)
+INT = int
+MAYBE_INT = (int, NONE)
+# A C# double, which Json.NET writes with a fraction, e.g. 12.0.
+NUMBER = (int, float)
+BOOL = bool
+MAYBE_BOOL = (bool, NONE)
+ANY = None
+
+GORDON_ID_LEAK = 'Security fault, Gordon ID leak'
+
+# What validate() and the checks of checkFor() do when a body does not match
+# its schema: 'fail' raises AssertionError, 'warn' issues a SchemaWarning and
+# 'off' skips the check.
+checkMode = 'warn'
+
+
+class SchemaWarning(UserWarning):
+    """A response did not match its schema, with --check-schemas=warn."""
+
+
+class Forbid:
+    """A rule that no record of a response has any of some fields.
+
+    Args:
+        fields: names of the fields that must not appear.
+        message (str): what a violation means.
+        warn (bool): only warn when the rule is broken, for faults the api
+            is known to have, instead of failing the check.
+    """
+
+    def __init__(self, fields, message, warn=True):
+        self.fields = frozenset(fields)
+        self.message = message
+        self.warn = warn
+
+    def broken(self, item, index):
+        """Report that the record at index has a forbidden field."""
+        field = sorted(self.fields.intersection(item))[0]
+        where = 'element' if index is None else 'element {0}'.format(index)
+        message = '{0} ({1!r} in {2}).'.format(self.message, field, where)
+        if not self.warn:
+            raise AssertionError(message)
+        warnings.warn(message)
+
+def idLeak(*fields):
+    """Return the rule that records do not show these Gordon ID fields."""
+    return Forbid(fields, GORDON_ID_LEAK)
+
+
+class Schema:
+    """The shape of a route's json body, compiled for whole-list checks.
+
+    Args:
+        fields (dict): every required field of a record and its type, a
+            tuple of types, or None for any type, as for api.checkItem().
+        many (bool): whether the body is a list of records or one record.
+        rules: Forbid rules every record must keep.
+        item: the type of the body, or of its elements when many, for
+            bodies that are not objects, such as counts or lists of codes.
+    """
+
+    def __init__(self, fields=None, many=False, rules=(), item=None):
+        self.fields = dict(fields or {})
+        self.many = many
+        self.rules = tuple(rules)
+        self.item = dict if item is None else item
+        self._required = frozenset(self.fields)
+        self._names = tuple(self.fields)
+        self._types = tuple(self.fields.values())
+        self._getter = operator.itemgetter(*self._names) \
+            if self._names else None
+        # Combinations of field types already found to match.
+        self._valid = set()
+
+    def check(self, body):
+        """Check a decoded json body.
+
+        Raises:
+            AssertionError: naming the first record and field that do not
+                match.  Broken rules that only warn issue a warning.
+        """
+        if not self.many:
+            self._check([body], None)
+            return
+        if not isinstance(body, list):
+            raise AssertionError('Expected a list, got {0}.'.format(
+                type(body).__name__))
+        self._check(body, 0)
+
+    def checkBatch(self, items, offset=0):
+        """Check consecutive elements of a list body, e.g. a batch read by
+        a StreamedResponse, starting at position offset."""
+        self._check(items, offset)
+
+    def __call__(self, item):
+        # A schema is also a per-item check for api.checkItem().
+        self._check([item], None)
+
+    def _check(self, items, offset):
+        if not all(map(isinstance, items, itertools.repeat(self.item))):
+            index = self._first(items, lambda item: isinstance(item, self.item))
+            raise AssertionError('{0} is {1}, expected {2}.'.format(
+                _where(index, offset), type(items[index]).__name__,
+                _typeName(self.item)))
+        if self.item is not dict:
+            return
+        if self._getter is not None:
+            try:
+                signatures = self._signatures(items)
+            except KeyError:
+                index = self._first(items,
+                    lambda item: item.keys() >= self._required)
+                missing = sorted(self._required - items[index].keys())
+                raise AssertionError('{0} has no field {1!r}.'.format(
+                    _where(index, offset), missing[0])) from None
+            for signature in signatures - self._valid:
+                self._checkSignature(signature, items, offset)
+                self._valid.add(signature)
+        for rule in self.rules:
+            if not all(map(rule.fields.isdisjoint, map(dict.keys, items))):
+                index = self._first(items, rule.fields.isdisjoint)
+                rule.broken(items[index], None if offset is None \
+                    else offset + index)
+
+    def _signatures(self, items):
+        # The distinct tuples of the types of every field, one tuple per
+        # record; real lists only have a handful.
+        values = map(self._getter, items)
+        if len(self._names) == 1:
+            return { (t,) for t in set(map(type, values)) }
+        return set(map(tuple, map(map, itertools.repeat(type), values)))
+
+    def _checkSignature(self, signature, items, offset):
+        for field, found, expected in zip(self._names, signature,
+                self._types):
+            if expected is not None and not issubclass(found, expected):
+                index = self._first(items,
+                    lambda item: type(item[field]) is not found)
+                raise AssertionError('{0}: {1!r} is {2}, expected {3}.'.format(
+                    _where(index, offset), field, found.__name__,
+                    _typeName(expected)))
+
+    @staticmethod
+    def _first(items, good):
+        return next(i for i, item in enumerate(items) if not good(item))
+
+    def __repr__(self):
+        return 'Schema({0})'.format(', '.join(sorted(self.fields)) or \
+            _typeName(self.item))
+
+def _where(index, offset):
+    return 'Element' if offset is None else 'Element {0}'.format(
+        offset + index)
+
+def _typeName(expected):
+    if isinstance(expected, tuple):
+        return ' or '.join(t.__name__ for t in expected)
+    return expected.__name__
+
+
+# # # # # # #
+# Registry  #
+# # # # # # #
+
+# (method, route template) -> Schema
+SCHEMAS = {}
+# method -> RouteTrie of the templates registered for it
+_routes = {}
+
+def register(method, template, schema):
+    """Register the schema of a route's responses.
+
+    Args:
+        method (str): HTTP verb.
+        template (str): route template, e.g. 'api/memberships/activity/{id}'.
+        schema (Schema): checked against the route's 2xx responses.
+
+    Returns:
+        Schema: the schema, so one can be registered for several routes.
+    """
+    method = method.upper()
+    SCHEMAS[(method, template)] = schema
+    _routes.setdefault(method, RouteTrie()).add(template, None, schema)
+    return schema
+
+def schemaFor(url, method='GET'):
+    """Return the Schema of the route that serves url, or None."""
+    routes = _routes.get(method.upper())
+    found = routes.match(url) if routes is not None else None
+    return found.value if found is not None else None
+
+def checkFor(url, method='GET'):
+    """Return the check of the route that serves url, as checkMode wants it.
+
+    Pass the result as the schema of a StreamedResponse's items(), head()
+    or validate().
+
+    Returns:
+        Schema: the route's schema; one that only warns when checkMode is
+        'warn'; or None when checkMode is 'off' or the route has none.
+    """
+    schema = schemaFor(url, method)
+    if schema is None or checkMode == 'off':
+        return None
+    if checkMode == 'warn':
+        return WarningSchema(schema)
+    return schema
+
+class WarningSchema:
+    """A Schema whose mismatches issue a SchemaWarning instead of failing."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    def check(self, body):
+        self._warn(self.schema.check, body)
+
+    def checkBatch(self, items, offset=0):
+        self._warn(self.schema.checkBatch, items, offset)
+
+    def __call__(self, item):
+        self._warn(self.schema, item)
+
+    @staticmethod
+    def _warn(check, *args):
+        try:
+            check(*args)
+        except AssertionError as e:
+            warnings.warn(str(e), SchemaWarning)
+
+    def __repr__(self):
+        return 'WarningSchema({0!r})'.format(self.schema)
+
+def validate(response):
+    """Check a response's json body against the schema of its route.
+
+    A response is checked once: later calls, such as a test's own after
+    conftest.py has checked it, return at once.  Nothing is checked when
+    checkMode is 'off', and a mismatch only warns when it is 'warn'.
+
+    Args:
+        response (ApiResponse): a response from pytest_components.
+
+    Returns:
+        Schema: the schema checked, or None when the route has none.
+
+    Raises:
+        AssertionError: when the body does not match the schema, naming
+            the request.
+        ValueError: when the body is not json.
+    """
+    schema = schemaFor(response.url, response.request.method)
+    if schema is None or checkMode == 'off' or \
+            getattr(response, 'schemaChecked', False):
+        return schema
+    response.schemaChecked = True
+    try:
+        schema.check(response.json())
+    except AssertionError as e:
+        message = '{0} {1}: {2}'.format(response.request.method,
+            response.url, e)
+        if checkMode != 'warn':
+            raise AssertionError(message) from None
+        warnings.warn(message, SchemaWarning)
+    return schema
+
+
+# # # # # # # # # #
+# Response Shapes #
+# # # # # # # # # #
+
+# Field types follow the view models in Gordon360/Models/ViewModels; fields
+# the api may leave out of a record are not required.  A C# string can be
+# null, so string fields are MAYBE_TEXT unless the model guarantees a value:
+# a NOT NULL column of an entity the api returns as is, or a non-nullable
+# DateTime.
+
+ACCOUNT = {
+    'FirstName': MAYBE_TEXT, 'LastName': MAYBE_TEXT, 'Email': MAYBE_TEXT,
+    'ADUserName': MAYBE_TEXT, 'AccountType': MAYBE_TEXT,
+    'Barcode': MAYBE_TEXT, 'show_pic': INT, 'ReadOnly': INT, 'account_id': INT,
+}
+for _template in ['api/accounts/email/{email}',
+        'api/accounts/username/{username}']:
+    register('GET', _template, Schema(ACCOUNT, rules=[idLeak('GordonID')]))
+
+BASIC_INFO = { 'FirstName': MAYBE_TEXT, 'LastName': MAYBE_TEXT,
+    'UserName': MAYBE_TEXT }
+for _template in ['api/accounts/search/{searchString}',
+        'api/accounts/search/{searchString}/{secondaryString}']:
+    register('GET', _template, Schema(BASIC_INFO, many=True,
+        rules=[idLeak('GordonID', 'ID')]))
+
+ACTIVITY = {
+    'ActivityCode': MAYBE_TEXT, 'ActivityDescription': MAYBE_TEXT,
+    'ActivityImagePath': MAYBE_TEXT, 'ActivityBlurb': MAYBE_TEXT,
+    'ActivityURL': MAYBE_TEXT, 'ActivityType': MAYBE_TEXT,
+    'ActivityTypeDescription': MAYBE_TEXT, 'Privacy': MAYBE_BOOL,
+    'ActivityJoinInfo': MAYBE_TEXT,
+}
+register('GET', 'api/activities/{id}', Schema(ACTIVITY))
+for _template in ['api/activities', 'api/activities/session/{id}',
+        'api/activities/open', 'api/activities/closed',
+        'api/activities/{id}/open', 'api/activities/{id}/closed']:
+    register('GET', _template, Schema(ACTIVITY, many=True))
+register('GET', 'api/activities/session/{id}/types',
+    Schema(many=True, item=MAYBE_TEXT))
+register('GET', 'api/activities/{sessionCode}/{id}/status',
+    Schema(item=MAYBE_TEXT))
+# ACT_INFO, the updated row.
+register('PUT', 'api/activities/{id}', Schema({ 'ACT_CDE': TEXT,
+    'ACT_DESC': TEXT, 'ACT_BLURB': MAYBE_TEXT, 'ACT_URL': MAYBE_TEXT,
+    'ACT_IMG_PATH': MAYBE_TEXT, 'PRIVACY': MAYBE_BOOL }))
+
+ADMIN = { 'ADMIN_ID': INT, 'ID_NUM': INT, 'USER_NAME': MAYBE_TEXT,
+    'EMAIL': MAYBE_TEXT, 'SUPER_ADMIN': BOOL }
+register('GET', 'api/admins', Schema(ADMIN, many=True))
+register('GET', 'api/admins/{id}', Schema(ADMIN))
+
+EMAIL = { 'FirstName': MAYBE_TEXT, 'LastName': MAYBE_TEXT,
+    'Email': MAYBE_TEXT }
+for _template in ['api/emails/activity/{id}',
+        'api/emails/activity/{id}/session/{session}',
+        'api/emails/activity/{id}/leaders',
+        'api/emails/activity/{id}/leaders/session/{session}',
+        'api/emails/activity/{id}/group-admin/session/{session}',
+        'api/emails/activity/{id}/advisors',
+        'api/emails/activity/{id}/advisors/session/{session}']:
+    register('GET', _template, Schema(EMAIL, many=True))
+
+# EventViewModel, one record per occurrence.
+EVENT = {
+    'Event_ID': MAYBE_TEXT, 'Event_Name': MAYBE_TEXT, 'Event_Title': MAYBE_TEXT,
+    'Event_Type_Name': MAYBE_TEXT, 'HasCLAWCredit': BOOL, 'IsPublic': BOOL,
+    'Description': MAYBE_TEXT, 'StartDate': MAYBE_TEXT,
+    'EndDate': MAYBE_TEXT, 'Location': MAYBE_TEXT, 'Organization': MAYBE_TEXT,
+}
+for _template in ['api/events', 'api/events/claw', 'api/events/public']:
+    register('GET', _template, Schema(EVENT, many=True))
+
+# DEPRECATED_EventViewModel, served by the api/events/25Live routes.
+DEPRECATED_EVENT = {
+    'Event_ID': MAYBE_TEXT, 'Event_Name': MAYBE_TEXT, 'Event_Title': MAYBE_TEXT,
+    'Event_Type_Name': MAYBE_TEXT, 'HasCLAWCredit': BOOL, 'IsPublic': BOOL,
+    'Organization': MAYBE_TEXT,
+}
+for _template in ['api/events/25Live/All', 'api/events/25Live/CLAW',
+        'api/events/25Live/Public', 'api/events/25Live/type/{typeIDs}',
+        'api/events/25Live/{eventIDs}']:
+    register('GET', _template, Schema(DEPRECATED_EVENT, many=True))
+
+CHAPEL_EVENT = { 'Event_Name': MAYBE_TEXT, 'Event_Title': MAYBE_TEXT,
+    'Organization': MAYBE_TEXT, 'StartDate': MAYBE_TEXT,
+    'EndDate': MAYBE_TEXT, 'Location': MAYBE_TEXT }
+for _template in ['api/events/chapel', 'api/events/chapel/{term}']:
+    register('GET', _template, Schema(CHAPEL_EVENT, many=True))
+
+register('GET', 'api/housing/admin', Schema(item=bool))
+register('POST', 'api/housing/admin/{id}', Schema(item=bool))
+register('DELETE', 'api/housing/admin/{id}', Schema(item=bool))
+register('GET', 'api/housing/apartment', Schema(item=int))
+register('GET', 'api/housing/apartment/{username}', Schema(item=int))
+register('POST', 'api/housing/apartment/applications', Schema(item=int))
+register('PUT', 'api/housing/apartment/{username}', Schema(item=bool))
+register('PUT', 'api/housing/putApartmentApplication', Schema(item=bool))
+register('GET', 'api/housing/halls/apartments',
+    Schema(many=True, item=MAYBE_TEXT))
+register('GET', 'api/housing/apartmentInfo', Schema({
+    'OnOffCampus': MAYBE_TEXT, 'OnCampusRoom': MAYBE_TEXT,
+    'OnCampusBuilding': MAYBE_TEXT }, many=True))
+
+MEMBERSHIP = {
+    'MembershipID': INT, 'ActivityCode': MAYBE_TEXT,
+    'ActivityDescription': MAYBE_TEXT, 'ActivityImagePath': MAYBE_TEXT,
+    'SessionCode': MAYBE_TEXT, 'SessionDescription': MAYBE_TEXT,
+    'AD_Username': MAYBE_TEXT, 'FirstName': MAYBE_TEXT,
+    'LastName': MAYBE_TEXT, 'Participation': MAYBE_TEXT,
+    'ParticipationDescription': MAYBE_TEXT, 'GroupAdmin': MAYBE_BOOL,
+    'StartDate': TEXT, 'EndDate': MAYBE_TEXT, 'Privacy': MAYBE_BOOL,
+    'AccountPrivate': INT,
+}
+# Lists of other people's memberships must not carry their Gordon IDs.
+for _template in ['api/memberships', 'api/memberships/activity/{id}',
+        'api/memberships/activity/{id}/group-admin',
+        'api/memberships/activity/{id}/leaders',
+        'api/memberships/activity/{id}/advisors']:
+    register('GET', _template, Schema(MEMBERSHIP, many=True,
+        rules=[idLeak('IDNumber')]))
+for _template in ['api/memberships/student/{id}',
+        'api/memberships/student/username/{username}']:
+    register('GET', _template, Schema(dict(MEMBERSHIP, IDNumber=INT),
+        many=True))
+for _template in ['api/memberships/activity/{id}/followers',
+        'api/memberships/activity/{id}/members',
+        'api/memberships/activity/{id}/followers/{sess_cde}',
+        'api/memberships/activity/{id}/members/{sess_cde}']:
+    register('GET', _template, Schema(item=int))
+
+REQUEST = {
+    'RequestID': INT, 'ActivityCode': MAYBE_TEXT,
+    'ActivityDescription': MAYBE_TEXT, 'IDNumber': INT,
+    'FirstName': MAYBE_TEXT, 'LastName': MAYBE_TEXT,
+    'Participation': MAYBE_TEXT, 'ParticipationDescription': MAYBE_TEXT,
+    'SessionCode': MAYBE_TEXT, 'SessionDescription': MAYBE_TEXT,
+    'DateSent': TEXT, 'RequestApproved': MAYBE_TEXT,
+    'CommentText': MAYBE_TEXT,
+}
+for _template in ['api/requests', 'api/requests/activity/{id}',
+        'api/requests/student']:
+    register('GET', _template, Schema(REQUEST, many=True))
+# REQUEST, the created or deleted row.
+REQUEST_ROW = { 'REQUEST_ID': INT, 'ACT_CDE': TEXT, 'SESS_CDE': TEXT,
+    'ID_NUM': INT, 'PART_CDE': TEXT, 'DATE_SENT': TEXT, 'STATUS': TEXT }
+register('POST', 'api/requests', Schema(REQUEST_ROW))
+register('DELETE', 'api/requests/{id}', Schema(REQUEST_ROW))
+
+# CUSTOM_PERSONAL_SCHEDULE rows.
+MY_SCHEDULE = {
+    'EVENT_ID': MAYBE_TEXT, 'GORDON_ID': MAYBE_TEXT, 'LOCATION': MAYBE_TEXT,
+    'DESCRIPTION': MAYBE_TEXT, 'MON_CDE': MAYBE_TEXT, 'TUE_CDE': MAYBE_TEXT,
+    'WED_CDE': MAYBE_TEXT, 'THU_CDE': MAYBE_TEXT, 'FRI_CDE': MAYBE_TEXT,
+    'SAT_CDE': MAYBE_TEXT, 'SUN_CDE': MAYBE_TEXT, 'IS_ALLDAY': MAYBE_INT,
+    'BEGIN_TIME': MAYBE_TEXT, 'END_TIME': MAYBE_TEXT,
+}
+register('GET', 'api/myschedule', Schema(MY_SCHEDULE, many=True))
+register('GET', 'api/myschedule/{username}', Schema(MY_SCHEDULE, many=True))
+register('GET', 'api/myschedule/event/{event_id}', Schema(MY_SCHEDULE))
+register('POST', 'api/myschedule', Schema(MY_SCHEDULE))
+register('PUT', 'api/myschedule', Schema(MY_SCHEDULE))
+register('DELETE', 'api/myschedule/{event_id}', Schema(MY_SCHEDULE))
+
+NEWS = {
+    'SNID': INT, 'ADUN': MAYBE_TEXT, 'categoryID': INT, 'Subject': MAYBE_TEXT,
+    'Body': MAYBE_TEXT, 'Accepted': MAYBE_BOOL, 'Entered': MAYBE_TEXT,
+    'categoryName': MAYBE_TEXT, 'SortOrder': MAYBE_INT,
+    'ManualExpirationDate': MAYBE_TEXT,
+}
+for _template in ['api/news/not-expired', 'api/news/new',
+        'api/news/personal-unapproved']:
+    register('GET', _template, Schema(NEWS, many=True))
+NEWS_CATEGORY = { 'categoryID': INT, 'categoryName': MAYBE_TEXT,
+    'SortOrder': MAYBE_INT }
+for _template in ['api/news/categories', 'api/news/category']:
+    register('GET', _template, Schema(NEWS_CATEGORY, many=True))
+
+PROFILE = { 'AD_Username': MAYBE_TEXT, 'FirstName': MAYBE_TEXT,
+    'LastName': MAYBE_TEXT, 'Email': MAYBE_TEXT, 'PersonType': MAYBE_TEXT,
+    'show_pic': MAYBE_INT }
+register('GET', 'api/profiles', Schema(dict(PROFILE, ID=MAYBE_TEXT)))
+register('GET', 'api/profiles/{username}', Schema(PROFILE,
+    rules=[idLeak('ID', 'GordonID')]))
+IMAGE = { 'def': MAYBE_TEXT, 'pref': MAYBE_TEXT }
+register('GET', 'api/profiles/Image', Schema(IMAGE))
+register('GET', 'api/profiles/Image/{username}', Schema(IMAGE))
+
+SCHEDULE_CONTROL = { 'gordon_id': MAYBE_TEXT, 'IsSchedulePrivate': MAYBE_BOOL,
+    'ModifiedTimeStamp': MAYBE_TEXT, 'Description': MAYBE_TEXT }
+register('GET', 'api/schedulecontrol', Schema(SCHEDULE_CONTROL))
+register('GET', 'api/schedulecontrol/{username}', Schema(SCHEDULE_CONTROL))
+
+SESSION = { 'SessionCode': MAYBE_TEXT, 'SessionDescription': MAYBE_TEXT,
+    'SessionBeginDate': MAYBE_TEXT, 'SessionEndDate': MAYBE_TEXT }
+register('GET', 'api/sessions', Schema(SESSION, many=True))
+register('GET', 'api/sessions/current', Schema(SESSION))
+register('GET', 'api/sessions/{id}', Schema(SESSION))
+# Helpers.GetDaysLeft(): double[] of days left and days in the session.
+register('GET', 'api/sessions/daysLeft', Schema(many=True, item=NUMBER))
+# Dates, registered so that api/sessions/{id} does not claim them.
+register('GET', 'api/sessions/firstDay', Schema(item=MAYBE_TEXT))
+register('GET', 'api/sessions/lastDay', Schema(item=MAYBE_TEXT))
+
+register('GET', 'api/vpscore', Schema({ 'TOTAL_VP_CC_SCORE': MAYBE_INT,
+    'TOTAL_VP_IM_SCORE': MAYBE_INT, 'TOTAL_VP_LS_SCORE': MAYBE_INT,
+    'TOTAL_VP_LW_SCORE': MAYBE_INT }, many=True))
+
+# WellnessViewModel and WellnessQuestionViewModel, one of each.  The wellness
+# tests and the stand-in still expect the old list of { userAnswer,
+# answerValid, timestamp }, so these schemas warn about the stand-in.
+register('GET', 'api/wellness', Schema({ 'Status': MAYBE_TEXT,
+    'Created': TEXT, 'IsValid': BOOL, 'StatusDescription': MAYBE_TEXT }))
+register('GET', 'api/wellness/question', Schema({ 'question': MAYBE_TEXT,
+    'yesPrompt': MAYBE_TEXT, 'noPrompt': MAYBE_TEXT }))
+
+register('POST', 'token', Schema({ 'access_token': TEXT, 'token_type': TEXT,
+    'expires_in': INT }))
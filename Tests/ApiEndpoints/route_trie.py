@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+"""Match concrete api urls to the controller route templates.
+
+Usage:
+    [python3] route_trie.py '[METHOD ]URL' ['[METHOD ]URL' ...]
+
+A RouteTrie holds route templates such as
+'api/memberships/activity/{id}/followers/{sess_cde}' as a trie of path
+segments.  Matching walks one node per segment of the url, so its cost does
+not grow with the number of routes.  Like web api attribute routing, literal
+segments win over parameters ('api/activities/open' is not
+'api/activities/{id}'), int-constrained parameters only match digits, and
+literals match case-insensitively.
+
+defaultTrie() is built from the catalogue get-route-list.py extracts from
+Gordon360/ApiControllers.
+"""
+
+import importlib.util
+import os
+import sys
+from urllib.parse import unquote, urlsplit
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+class RouteMatch:
+    """A matched route: its template, parameter values and stored value."""
+
+    def __init__(self, template, params, value):
+        self.template = template
+        self.params = params
+        self.value = value
+
+    def __repr__(self):
+        return 'RouteMatch({0!r}, {1!r})'.format(self.template, self.params)
+
+
+class _Node:
+    __slots__ = ('literals', 'parameters', 'catchAll', 'routes')
+
+    def __init__(self):
+        self.literals = {}
+        # [(constraint, node)], constrained parameters first.
+        self.parameters = []
+        self.catchAll = None
+        # method (or None for any) -> (template, parameter names, value)
+        self.routes = {}
+
+
+def splitPath(url):
+    """Return the decoded, non-empty path segments of a url or path."""
+    path = urlsplit(url).path if '://' in url or '?' in url else url
+    return [unquote(segment) for segment in path.split('/') if segment]
+
+def _parameter(segment):
+    """Return (name, constraint) for a '{...}' segment, else None."""
+    if not (segment.startswith('{') and segment.endswith('}')):
+        return None
+    name = segment[1:-1].split('=', 1)[0].rstrip('?')
+    name, _, constraint = name.partition(':')
+    return name, constraint or None
+
+def _accepts(constraint, segment):
+    if constraint in ('int', 'long'):
+        return segment.lstrip('-').isdigit()
+    if constraint == 'alpha':
+        return segment.isalpha()
+    if constraint == 'bool':
+        return segment.lower() in ('true', 'false')
+    return True
+
+
+class RouteTrie:
+    """Segment trie of route templates with literal-over-parameter
+    precedence."""
+
+    def __init__(self):
+        self._root = _Node()
+        self.size = 0
+
+    def add(self, template, method=None, value=None):
+        """Add a route template.
+
+        Args:
+            template (str): e.g. 'api/memberships/student/{id}'.
+            method (str): HTTP verb the route answers, or None for any.
+            value: anything to hand back with matches, e.g. the catalogue
+                entry.
+        """
+        node = self._root
+        names = []
+        for segment in splitPath(template):
+            parameter = _parameter(segment)
+            if parameter is None:
+                node = node.literals.setdefault(segment.lower(), _Node())
+                continue
+            name, constraint = parameter
+            names.append(name.lstrip('*'))
+            if name.startswith('*'):
+                node.catchAll = node.catchAll or _Node()
+                node = node.catchAll
+                break
+            for existingConstraint, child in node.parameters:
+                if existingConstraint == constraint:
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.parameters.append((constraint, child))
+                node.parameters.sort(key=lambda p: p[0] is None)
+                node = child
+        # Routes sharing a path keep the first template's parameter names.
+        node.routes.setdefault(method and method.upper(),
+            (template, names, value))
+        self.size += 1
+
+    def match(self, url, method=None):
+        """Return the RouteMatch of a url, or None.
+
+        Args:
+            url (str): full url or path; the query is ignored.
+            method (str): HTTP verb.  Routes for this verb are preferred;
+                if no route has it, any route of the path matches.
+
+        Returns:
+            RouteMatch: or None when no template fits.
+        """
+        segments = splitPath(url)
+        if method is not None:
+            found = self._match(self._root, segments, 0, method.upper(), [])
+            if found is not None:
+                return found
+        return self._match(self._root, segments, 0, None, [])
+
+    def _match(self, node, segments, i, method, values):
+        if i == len(segments):
+            return self._found(node, method, values)
+        segment = segments[i]
+        child = node.literals.get(segment.lower())
+        if child is not None:
+            found = self._match(child, segments, i + 1, method, values)
+            if found is not None:
+                return found
+        for constraint, child in node.parameters:
+            if _accepts(constraint, segment):
+                values.append(segment)
+                found = self._match(child, segments, i + 1, method, values)
+                values.pop()
+                if found is not None:
+                    return found
+        if node.catchAll is not None:
+            return self._found(node.catchAll, method,
+                values + ['/'.join(segments[i:])])
+        return None
+
+    def _found(self, node, method, values):
+        route = self._route(node, method)
+        if route is None:
+            return None
+        template, names, value = route
+        return RouteMatch(template, dict(zip(names, values)), value)
+
+    def _route(self, node, method):
+        if not node.routes:
+            return None
+        if method is None:
+            return next(iter(node.routes.values()))
+        return node.routes.get(method) or node.routes.get(None)
+
+    @classmethod
+    def fromCatalogue(cls, routes):
+        """Build a trie from get-route-list.py catalogue entries."""
+        trie = cls()
+        for route in routes:
+            trie.add(route['path'], route['method'], route)
+        return trie
+
+
+def loadCatalogue(repoRoot=REPO_ROOT):
+    """Return the route catalogue of get-route-list.py in repoRoot."""
+    path = os.path.join(repoRoot, 'get-route-list.py')
+    spec = importlib.util.spec_from_file_location('get_route_list', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.routeCatalogue(
+        cachePath=os.path.join(repoRoot, module.CACHE_FILE))
+
+_defaultTrie = None
+
+def defaultTrie():
+    """Return the trie of every controller route, built on first use.
+
+    Returns:
+        RouteTrie: or None when the controllers cannot be read, e.g. when
+        the tests were copied out of the repository.
+    """
+    global _defaultTrie
+    if _defaultTrie is None:
+        try:
+            _defaultTrie = RouteTrie.fromCatalogue(loadCatalogue())
+        except OSError:
+            _defaultTrie = False
+    return _defaultTrie or None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 2
+    trie = defaultTrie()
+    if trie is None:
+        print('No controllers found under ' + REPO_ROOT)
+        return 1
+    for url in sys.argv[1:]:
+        method, _, url = url.rpartition(' ')
+        found = trie.match(url, method or None)
+        if found is None:
+            print('{0}: no route'.format(url))
+        else:
+            route = found.value
+            print('{0}: {1} {2} ({3}.{4}) {5}'.format(url, route['method'],
+                found.template, route['controller'], route['action'],
+                found.params))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
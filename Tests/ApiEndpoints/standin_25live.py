@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+
+"""Generates 25Live event feeds and serves them as a stand-in 25Live.
+
+Usage:
+    [python3] standin_25live.py generate PATH [--events N] [--seed N]
+    [python3] standin_25live.py serve [--port PORT] [--events N | --feed PATH]
+
+The api keeps the events of the academic year in Data.AllEvents, an
+XDocument it downloads from 25Live (URLs.ALL_EVENTS_REQUEST, refreshed every
+four minutes by Startup.cs) and walks on every api/events request.  This
+module writes feeds in that format: r25:event elements with the fields
+EventViewModel and DEPRECATED_EventViewModel read (id, name, title, type,
+organization, description text, CL&W category, public requirement, and a
+profile of reservations with start, end and space), plus the other fields
+of 25Live's extended scope that the api downloads and parses but never
+reads.  Names, organizations and places come from standin_dataset.py.
+
+Most events have a single reservation; some run on a few days, and some
+(chapel, athletics, club meetings) repeat weekly, so a feed of N events
+expands to a little over 2N occurrences, as in the real calendar.
+
+serve answers GET /25live/data/gordon/run/events.xml, whatever the query,
+with one feed.  Point the api at it by setting the 25LiveEventsURL app
+setting to http://HOST:PORT/25live/data/gordon/run/events.xml, or the
+stand-in with --events-feed.  gordon_360_events_bench.py runs one in
+process and swaps feeds of growing size under the api.
+
+eventViews() and deprecatedEventViews() turn a parsed feed into the records
+of api/events and api/events/25Live, the way EventService does.
+"""
+
+import argparse
+import datetime
+import io
+import random
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+import standin_dataset as dataset
+
+NAMESPACE = 'http://www.collegenet.com/r25'
+R25 = '{' + NAMESPACE + '}'
+FEED_PATH = '25live/data/gordon/run/events.xml'
+# Ids the view models test for.
+DESCRIPTION_TEXT = '1'
+CLAW_CATEGORY = '85'
+PUBLIC_REQUIREMENT = '3'
+# ALL_EVENTS_REQUEST only asks for these event types.
+EVENT_TYPES = [('57', 'Event', 0.9), ('14', 'Calendar Announcement', 0.1)]
+# Kinds of events that repeat weekly through the semester.
+RECURRING = {'Chapel/Worship', 'Athletics', 'Meeting'}
+SENTENCES = ['All students, faculty and staff are welcome.',
+    'Doors open fifteen minutes before the start.',
+    'Light refreshments will be served afterwards.',
+    'Tickets are available at the box office in the Lane Student Center.',
+    'This event offers CL&W credit to students who scan in with their ID.',
+    'Please contact the organizer with questions about accessibility.',
+    'Parking is available in the Chapel and Bennett lots.',
+    'The event will also be streamed for those unable to attend in person.',
+    'Bring a friend; no registration is required.',
+    'Seating is limited, so please arrive early.']
+
+
+# # # # # # # # #
+# Generation    #
+# # # # # # # # #
+
+def firstEventDate(today=None):
+    """The end_after date of ALL_EVENTS_REQUEST (Helpers.GetFirstEventDate):
+    the start of the academic year, or of the summer in June and July."""
+    today = today or datetime.date.today()
+    if today.month < 6:
+        return datetime.date(today.year - 1, 8, 15)
+    if today.month > 7:
+        return datetime.date(today.year, 8, 15)
+    return datetime.date(today.year, 5, 15)
+
+def _timestamp(moment):
+    # 25Live sends local times with their offset; close enough to daylight
+    # saving time for a feed.
+    offset = '-04:00' if 4 <= moment.month <= 10 else '-05:00'
+    return moment.strftime('%Y-%m-%dT%H:%M:%S') + offset
+
+def _occurrences(rng, kind, start):
+    # Start times of the reservations of one event.
+    if kind in RECURRING and rng.random() < 0.3:
+        weeks = rng.randrange(4, 12)
+        return [start + datetime.timedelta(weeks=n) for n in range(weeks)]
+    if rng.random() < 0.2:
+        return [start + datetime.timedelta(days=n) \
+            for n in range(rng.randrange(2, 5))]
+    return [start]
+
+def _element(name, value):
+    return '<r25:{0}>{1}</r25:{0}>'.format(name, escape(str(value)))
+
+def eventXml(rng, eventID, begin, days, reservationID):
+    """One r25:event element.
+
+    Args:
+        rng (random.Random): source of every choice.
+        eventID (int): event_id of the event.
+        begin (datetime.date): first day events may start on.
+        days (int): number of days events start within.
+        reservationID (int): first reservation_id to use.
+
+    Returns:
+        (str, int): the xml of the event and its number of reservations.
+    """
+    typeID, typeName = rng.choices([(t, n) for t, n, _ in EVENT_TYPES],
+        [w for _, _, w in EVENT_TYPES])[0]
+    kindID, kind, organization, names, public, claw = \
+        rng.choice(dataset.EVENT_KINDS)
+    name = rng.choice(names)
+    title = '{0}: {1}'.format(name, rng.choice(dataset.ACTIVITY_TOPICS))
+    location = rng.choice(dataset.LOCATIONS)
+    start = datetime.datetime.combine(begin + datetime.timedelta(
+        days=rng.randrange(days)), datetime.time(rng.randrange(8, 21),
+        rng.choice((0, 15, 30, 45))))
+    length = datetime.timedelta(minutes=rng.choice((45, 60, 90, 120)))
+    starts = _occurrences(rng, kind, start)
+    created = start - datetime.timedelta(days=rng.randrange(14, 120))
+    description = 'Join us for {0}. {1}'.format(title, ' '.join(
+        rng.sample(SENTENCES, rng.randrange(1, 5))))
+
+    parts = ['<r25:event crc="{0:08x}" status="est" xl:href="event.xml?'
+        'event_id={1}">'.format(rng.getrandbits(32), eventID),
+        _element('event_id', eventID),
+        _element('event_locator', '{0}-{1:06d}'.format(start.year, eventID)),
+        _element('event_name', name),
+        _element('event_title', title),
+        _element('event_type_id', typeID),
+        _element('event_type_name', typeName),
+        _element('node_type', 'E'),
+        _element('node_type_name', 'event'),
+        _element('state', '2'),
+        _element('state_name', 'Confirmed'),
+        _element('event_priority', '0'),
+        _element('start_date', starts[0].date().isoformat()),
+        _element('end_date', starts[-1].date().isoformat()),
+        _element('creation_dt', _timestamp(created)),
+        _element('last_mod_dt', _timestamp(created + datetime.timedelta(
+            hours=rng.randrange(1, 200)))),
+        _element('last_mod_user', rng.choice(dataset.LAST_NAMES).lower()),
+        '<r25:organization>', _element('organization_id', 1000 + int(kindID)),
+        _element('organization_name', organization),
+        _element('primary', 'T'), '</r25:organization>',
+        '<r25:event_text>', _element('text_type_id', DESCRIPTION_TEXT),
+        _element('text_type_name', 'Description'),
+        _element('text', description), '</r25:event_text>',
+        '<r25:category>', _element('category_id', kindID),
+        _element('category_name', kind), '</r25:category>']
+    if claw and rng.random() < 0.6:
+        parts += ['<r25:category>', _element('category_id', CLAW_CATEGORY),
+            _element('category_name', 'CL&W Credit'), '</r25:category>']
+    isPublic = rng.random() < public
+    parts += ['<r25:requirement>', _element('requirement_id',
+        PUBLIC_REQUIREMENT if isPublic else '1'), _element('requirement_name',
+        'Calendar: Public' if isPublic else 'Calendar: Internal'),
+        '</r25:requirement>',
+        '<r25:role>', _element('role_id', '-1'),
+        _element('role_name', 'Requestor'), '<r25:contact>',
+        _element('contact_name', '{0}, {1}'.format(
+            rng.choice(dataset.LAST_NAMES), rng.choice(dataset.FIRST_NAMES))),
+        '</r25:contact>', '</r25:role>',
+        '<r25:profile>', _element('profile_id', eventID),
+        _element('profile_name', 'Rsrv_{0}'.format(eventID)),
+        _element('rec_type_id', 1 if len(starts) > 1 else 0)]
+    for n, occurrence in enumerate(starts):
+        parts += ['<r25:reservation>',
+            _element('reservation_id', reservationID + n),
+            _element('reservation_state', '1'),
+            _element('event_start_dt', _timestamp(occurrence)),
+            _element('event_end_dt', _timestamp(occurrence + length)),
+            '<r25:space_reservation>', '<r25:space>',
+            _element('space_id', 100 + dataset.LOCATIONS.index(location)),
+            _element('space_name', location.upper()),
+            _element('formal_name', location), '</r25:space>',
+            '</r25:space_reservation>', '</r25:reservation>']
+    parts += ['</r25:profile>', '</r25:event>']
+    return ''.join(parts), len(starts)
+
+def writeFeed(out, events, seed=360, begin=None, days=270):
+    """Write a 25Live events feed.
+
+    Args:
+        out: binary file-like object to write to.
+        events (int): number of r25:event elements.
+        seed (int): seed of every choice; the same seed and size give the
+            same feed.
+        begin (datetime.date): first day events start on (default: the
+            end_after date the api asks 25Live for).
+        days (int): number of days events start within.
+
+    Returns:
+        int: the number of reservations (occurrences) written.
+    """
+    rng = random.Random(seed)
+    begin = begin or firstEventDate()
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n<r25:events '
+        'xmlns:r25="{0}" xmlns:xl="http://www.w3.org/1999/xlink" pubdate="{1}"'
+        ' engine="accl">'.format(NAMESPACE, _timestamp(datetime.datetime.now()))\
+        .encode('utf-8'))
+    reservations = 0
+    chunk = []
+    for n in range(events):
+        xml, count = eventXml(rng, 10000 + n, begin, days,
+            100000 + reservations)
+        chunk.append(xml)
+        reservations += count
+        if len(chunk) == 1000:
+            out.write(''.join(chunk).encode('utf-8'))
+            chunk = []
+    out.write((''.join(chunk) + '</r25:events>\n').encode('utf-8'))
+    return reservations
+
+class Feed:
+    """A feed held in memory.
+
+    Attributes:
+        content (bytes): the xml.
+        events (int): number of events.
+        reservations (int): number of occurrences, i.e. the records
+            api/events returns.
+    """
+
+    def __init__(self, content, events, reservations):
+        self.content = content
+        self.events = events
+        self.reservations = reservations
+
+    @classmethod
+    def generate(cls, events, seed=360, begin=None, days=270):
+        """A feed written by writeFeed()."""
+        out = io.BytesIO()
+        reservations = writeFeed(out, events, seed, begin, days)
+        return cls(out.getvalue(), events, reservations)
+
+    @classmethod
+    def load(cls, path):
+        """A feed read from a file."""
+        with open(path, 'rb') as feedFile:
+            content = feedFile.read()
+        events = parseFeed(io.BytesIO(content))
+        return cls(content, len(events),
+            sum(len(event.occurrences) for event in events))
+
+
+# # # # # # # # # # #
+# Parsing           #
+# # # # # # # # # # #
+
+def _text(element, path):
+    found = element.find(path)
+    return None if found is None else (found.text or '')
+
+class ParsedEvent:
+    """The fields of one r25:event that the api's view models read."""
+
+    __slots__ = ('eventID', 'name', 'title', 'typeID', 'typeName',
+        'description', 'organization', 'claw', 'public', 'occurrences')
+
+    def __init__(self, element):
+        self.eventID = _text(element, R25 + 'event_id')
+        self.name = _text(element, R25 + 'event_name')
+        self.title = _text(element, R25 + 'event_title')
+        self.typeID = _text(element, R25 + 'event_type_id')
+        self.typeName = _text(element, R25 + 'event_type_name')
+        self.description = None
+        for text in element.iterfind(R25 + 'event_text'):
+            if _text(text, R25 + 'text_type_id') == DESCRIPTION_TEXT:
+                self.description = _text(text, R25 + 'text')
+                break
+        self.organization = _text(element,
+            R25 + 'organization/' + R25 + 'organization_name')
+        self.claw = any(_text(c, R25 + 'category_id') == CLAW_CATEGORY \
+            for c in element.iterfind(R25 + 'category'))
+        self.public = any(_text(r, R25 + 'requirement_id') == \
+            PUBLIC_REQUIREMENT for r in element.iterfind(R25 + 'requirement'))
+        self.occurrences = []
+        profile = element.find(R25 + 'profile')
+        if profile is not None:
+            for reservation in profile.iter(R25 + 'reservation'):
+                self.occurrences.append((
+                    _text(reservation, R25 + 'event_start_dt'),
+                    _text(reservation, R25 + 'event_end_dt'),
+                    _text(reservation, R25 + 'space_reservation/' + R25 + \
+                        'space/' + R25 + 'formal_name')))
+
+def parseFeed(source):
+    """Read a 25Live feed, keeping only what the view models use.
+
+    Args:
+        source: path or binary file-like object of the xml.
+
+    Returns:
+        list of ParsedEvent: the events in feed order.
+    """
+    events = []
+    for _, element in ElementTree.iterparse(source):
+        if element.tag == R25 + 'event':
+            events.append(ParsedEvent(element))
+            element.clear()
+    return events
+
+def eventViews(events):
+    """The EventViewModel records of api/events: one per reservation."""
+    for event in events:
+        for start, end, location in event.occurrences:
+            yield {
+                'Event_ID': event.eventID,
+                'Event_Name': event.name,
+                'Event_Title': event.title,
+                'Event_Type_Name': event.typeName,
+                'HasCLAWCredit': event.claw,
+                'IsPublic': event.public,
+                'Description': event.description,
+                'StartDate': start,
+                'EndDate': end,
+                'Location': location,
+                'Organization': event.organization,
+            }
+
+def deprecatedEventViews(events):
+    """The DEPRECATED_EventViewModel records of api/events/25Live: one per
+    reservation, with the reservation in Occurrences and an Event_ID made
+    unique per occurrence."""
+    for event in events:
+        for start, end, location in event.occurrences:
+            occurrence = { 'StartDate': start, 'EndDate': end,
+                'Location': location }
+            yield {
+                'Event_ID': '{0}_{1}'.format(event.eventID, zlib.crc32(
+                    '{0}|{1}|{2}'.format(start, end, location).encode('utf-8'))),
+                'Event_Name': event.name,
+                'Event_Title': event.title,
+                'Event_Type_Name': event.typeName,
+                'HasCLAWCredit': event.claw,
+                'IsPublic': event.public,
+                'Description': event.description,
+                'Occurrences': [occurrence],
+                'Organization': event.organization,
+            }
+
+
+# # # # # # # # # # #
+# Upstream Server   #
+# # # # # # # # # # #
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = '25LiveStandIn/1.0'
+
+    def do_GET(self):
+        if self.path.lstrip('/').split('?')[0] != FEED_PATH:
+            self.send_error(404)
+            return
+        feed = self.server.feed
+        self.server.fetches += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=UTF-8')
+        self.send_header('Content-Length', str(len(feed.content)))
+        self.end_headers()
+        self.wfile.write(feed.content)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class UpstreamServer(ThreadingHTTPServer):
+    """Serves one feed at FEED_PATH; setFeed() swaps it while running."""
+
+    daemon_threads = True
+
+    def __init__(self, address, feed, verbose=False):
+        ThreadingHTTPServer.__init__(self, address, UpstreamHandler)
+        self.feed = feed
+        self.verbose = verbose
+        self.fetches = 0
+
+    def setFeed(self, feed):
+        self.feed = feed
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{0}:{1}/{2}'.format(host, port, FEED_PATH)
+
+def start(host='127.0.0.1', port=0, feed=None):
+    """Start a stand-in 25Live on a background thread.
+
+    Args:
+        host (str): address to listen on.
+        port (int): port to listen on; 0 picks a free one.
+        feed (Feed): feed to serve (default: an empty one).
+
+    Returns:
+        UpstreamServer: .url is the feed url; .shutdown() stops it.
+    """
+    server = UpstreamServer((host, port), feed or Feed.generate(0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    generate = commands.add_parser('generate', help='write a feed to a file')
+    generate.add_argument('path', metavar='PATH')
+    serve = commands.add_parser('serve', help='serve a feed over http')
+    serve.add_argument('--host', default='127.0.0.1',
+        help='address to listen on (default: %(default)s)')
+    serve.add_argument('--port', type=int, default=8025,
+        help='port to listen on (default: %(default)s)')
+    serve.add_argument('--feed', default=None, metavar='PATH',
+        help='serve this feed file instead of generating one')
+    serve.add_argument('--verbose', action='store_true',
+        help='log every request')
+    for command in (generate, serve):
+        command.add_argument('--events', type=int, default=1000,
+            help='number of events (default: %(default)s)')
+        command.add_argument('--seed', type=int, default=360,
+            help='seed of the generated feed (default: %(default)s)')
+        command.add_argument('--begin', default=None, metavar='YYYY-MM-DD',
+            help='first day events start on (default: the start of the '
+                 'academic year, as the api asks 25Live for)')
+        command.add_argument('--days', type=int, default=270,
+            help='days events start within (default: %(default)s)')
+    args = parser.parse_args()
+    if args.command is None:
+        parser.error('choose generate or serve')
+    begin = datetime.date.fromisoformat(args.begin) if args.begin else None
+
+    started = time.monotonic()
+    if args.command == 'generate':
+        with open(args.path, 'wb') as feedFile:
+            reservations = writeFeed(feedFile, args.events, args.seed, begin,
+                args.days)
+            size = feedFile.tell()
+        print('Wrote {0} events, {1} occurrences, {2:.1f} MB to {3} in '
+            '{4:.1f}s.'.format(args.events, reservations, size / 1e6,
+            args.path, time.monotonic() - started))
+        return 0
+
+    feed = Feed.load(args.feed) if args.feed else \
+        Feed.generate(args.events, args.seed, begin, args.days)
+    server = UpstreamServer((args.host, args.port), feed,
+        verbose=args.verbose)
+    print('25Live stand-in serving {0} events ({1} occurrences, {2:.1f} MB) '
+        'at {3}'.format(feed.events, feed.reservations,
+        len(feed.content) / 1e6, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
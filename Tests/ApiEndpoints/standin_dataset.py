@@ -0,0 +1,867 @@
+#!/usr/bin/env python3
+
+"""Generates stand-in data at production scale and serves it from disk.
+
+Usage:
+    [python3] standin_dataset.py generate PATH [--accounts N]
+        [--activities N] [--seed N] [options]
+    [python3] standin_dataset.py info PATH
+
+The fixtures in standin_fixtures.py are the few records the endpoint suite
+asserts on.  `generate` keeps them and adds a seeded synthetic population
+around them: students, faculty, staff and alumni with directory details,
+activities of every type, memberships in the most recent sessions (a few
+per student, most of them in a handful of popular activities), membership
+requests, events, news items, schedules and today's wellness answers.  The
+same seed and sizes always give the same data.  Serve it with
+
+    python gordon_360_standin.py --dataset PATH
+
+Dataset files are columnar.  Every column of a table is one contiguous
+array: int64 for integers, one byte for booleans, uint16/uint32 codes into
+a list of values for strings with few distinct values, and offsets into a
+utf-8 blob for the rest.  A json manifest at the end of the file describes
+the columns and holds the small collections (sessions, admins, lookups).
+Dataset() memory-maps the file, so a stand-in starts at once however large
+the data is, pages only the columns its requests touch into memory, and
+several stand-ins share one copy through the page cache.
+"""
+
+import argparse
+import array
+import datetime
+import json
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+import standin_fixtures as fixtures
+
+MAGIC = b'G360COL1'
+# Magic, then the offset and length of the manifest.
+HEADER = struct.Struct('<8sQQ')
+INT_NULL = -(1 << 63)
+BOOL_NULL = 255
+# Strings with at most this many distinct values are stored as codes.
+CATEGORY_LIMIT = 4096
+# Fixture collections stored as tables; the others go in the manifest.
+TABLES = ('accounts', 'activities', 'memberships', 'requests', 'events',
+    'news', 'myschedule', 'wellness')
+
+
+# # # # # # # # # # # # # #
+# Record Collections      #
+# # # # # # # # # # # # # #
+
+class RecordList(list):
+    """A list of record dicts with the queries the stand-in makes of its
+    collections.  Rows is the same interface over a dataset table."""
+
+    def where(self, **criteria):
+        """Return the records whose fields equal the criteria."""
+        return [r for r in self \
+            if all(r.get(key) == value for key, value in criteria.items())]
+
+    def first(self, **criteria):
+        """Return the first record matching the criteria, or None."""
+        for r in self:
+            if all(r.get(key) == value for key, value in criteria.items()):
+                return r
+        return None
+
+    def indexBy(self, key, transform=None):
+        """Return a mapping of (transformed) key values to records."""
+        return { transform(r[key]) if transform else r[key]: r for r in self }
+
+    def values(self, key):
+        """Iterate over the values of one field."""
+        return (r[key] for r in self)
+
+def records(collection):
+    """Return a fixture collection as a RecordList, unless it is one or
+    Rows already."""
+    if isinstance(collection, (RecordList, Rows)):
+        return collection
+    return RecordList(collection)
+
+
+class Rows:
+    """The records of a dataset Table, as a RecordList would hold them.
+
+    Records are built from the columns when they are asked for.  Records
+    fetched one at a time, through first() or an indexBy() mapping, are kept
+    and returned again later, so changes made to them last; the stand-in
+    only changes records it fetched that way.  Iterating and where() return
+    kept records where there are some and fresh copies elsewhere.  Appended
+    records are kept in memory and removed ones remembered; the file is
+    never written to.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._kept = {}
+        self._added = []
+        self._removed = set()
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.table) - len(self._removed) + len(self._added)
+
+    def __iter__(self):
+        kept = self._kept
+        removed = self._removed
+        for i, row in enumerate(self.table.iterRows()):
+            if i in removed:
+                continue
+            yield kept.get(i, row)
+        yield from self._added
+
+    def append(self, record):
+        self._added.append(record)
+
+    def remove(self, record):
+        for i, row in self._kept.items():
+            if row is record:
+                self._removed.add(i)
+                del self._kept[i]
+                return
+        for i, row in enumerate(self._added):
+            if row is record:
+                del self._added[i]
+                return
+        raise ValueError('record is not in ' + self.table.name)
+
+    def _keep(self, i):
+        row = self._kept.get(i)
+        if row is None:
+            row = self._kept[i] = self.table.row(i)
+        return row
+
+    def _posting(self, key):
+        # Row numbers by column value, built on first use.
+        posting = self._postings.get(key)
+        if posting is None:
+            posting = {}
+            for i, value in enumerate(self.table.columns[key]):
+                rows = posting.get(value)
+                if rows is None:
+                    rows = posting[value] = array.array('I')
+                rows.append(i)
+            self._postings[key] = posting
+        return posting
+
+    def _matches(self, i, criteria):
+        row = self._kept.get(i)
+        if row is not None:
+            return all(row.get(key) == value for key, value in criteria)
+        columns = self.table.columns
+        return all(key in columns and columns[key][i] == value \
+            for key, value in criteria)
+
+    def _find(self, criteria, keep, limit=None):
+        criteria = list(criteria.items())
+        if not criteria:
+            found = list(self)
+            return found[:limit] if limit else found
+        # Probe the column index of the most selective criterion, then check
+        # the others on the columns.  Kept records may have been changed, so
+        # they are checked on their own fields.
+        candidates = None
+        for key, value in criteria:
+            if key not in self.table.columns:
+                candidates = ()
+                break
+            posting = self._posting(key).get(value, ())
+            if candidates is None or len(posting) < len(candidates):
+                candidates = posting
+        found = []
+        seen = set()
+        for i in candidates:
+            if i in self._removed or not self._matches(i, criteria):
+                continue
+            seen.add(i)
+            found.append(self._keep(i) if keep else \
+                self._kept.get(i) or self.table.row(i))
+            if limit and len(found) >= limit:
+                return found
+        for i, row in sorted(self._kept.items()):
+            if i not in seen and all(row.get(key) == value \
+                    for key, value in criteria):
+                found.append(row)
+        found.extend(row for row in self._added \
+            if all(row.get(key) == value for key, value in criteria))
+        return found[:limit] if limit else found
+
+    def where(self, **criteria):
+        return self._find(criteria, keep=False)
+
+    def first(self, **criteria):
+        found = self._find(criteria, keep=True, limit=1)
+        return found[0] if found else None
+
+    def indexBy(self, key, transform=None):
+        return RowIndex(self, key, transform)
+
+    def values(self, key):
+        if key not in self.table.columns:
+            return (row.get(key) for row in self)
+        column = self.table.columns[key]
+        return (self._kept[i][key] if i in self._kept else value \
+            for i, value in enumerate(column) if i not in self._removed)
+
+
+class RowIndex:
+    """Records of Rows by the value of one field, like a dict."""
+
+    def __init__(self, rows, key, transform=None):
+        self.rows = rows
+        self._positions = {}
+        for i, value in enumerate(rows.table.columns[key]):
+            if value is not None:
+                self._positions[transform(value) if transform else value] = i
+        self._added = { transform(row[key]) if transform else row[key]: row \
+            for row in rows._added }
+
+    def get(self, value, default=None):
+        if value in self._added:
+            return self._added[value]
+        i = self._positions.get(value)
+        if i is None or i in self.rows._removed:
+            return default
+        return self.rows._keep(i)
+
+    def __getitem__(self, value):
+        found = self.get(value)
+        if found is None:
+            raise KeyError(value)
+        return found
+
+    def __contains__(self, value):
+        return self.get(value) is not None
+
+    def __len__(self):
+        return len(self._positions) + len(self._added)
+
+
+# # # # # # # # # # # # #
+# Columnar File Format  #
+# # # # # # # # # # # # #
+
+def _encodeColumn(values):
+    """Return (spec, {part: array or bytes}) for one column."""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return { 'kind': 'bool' }, { 'values': array.array('B',
+            [BOOL_NULL if v is None else int(v) for v in values]) }
+    if present and all(isinstance(v, int) and not isinstance(v, bool) \
+            for v in present):
+        return { 'kind': 'int' }, { 'values': array.array('q',
+            [INT_NULL if v is None else v for v in values]) }
+    kind = 'str'
+    if not all(isinstance(v, str) for v in present):
+        kind = 'json'
+        values = [None if v is None else json.dumps(v) for v in values]
+    distinct = set(values)
+    if kind == 'str' and len(distinct) <= CATEGORY_LIMIT and \
+            len(distinct) * 4 <= max(len(values), 4):
+        categories = sorted(distinct, key=lambda v: (v is None, v or ''))
+        codes = { value: code for code, value in enumerate(categories) }
+        return { 'kind': 'category', 'categories': categories }, {
+            'codes': array.array('H' if len(categories) < 1 << 16 else 'I',
+                [codes[v] for v in values]) }
+    offsets = array.array('I', [0])
+    blob = bytearray()
+    for value in values:
+        if value is not None:
+            blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    parts = { 'offsets': offsets, 'data': bytes(blob) }
+    if len(present) < len(values):
+        parts['nulls'] = bytes(v is None for v in values)
+    return { 'kind': kind }, parts
+
+def write(path, tables, extra, meta=None):
+    """Write a dataset file.
+
+    Args:
+        path (str): file to write; replaced atomically.
+        tables (dict): table name -> {column name: [values]}, every column
+            of a table as long as the others.
+        extra (dict): small collections, stored as json in the manifest.
+        meta (dict): anything else to record in the manifest.
+    """
+    manifest = dict(meta or {}, version=1, byteorder=sys.byteorder,
+        tables={}, extra=extra)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as dataFile:
+        dataFile.write(HEADER.pack(MAGIC, 0, 0))
+        for name, columns in tables.items():
+            rows = len(next(iter(columns.values()), []))
+            specs = []
+            for column, values in columns.items():
+                spec, parts = _encodeColumn(values)
+                for part, content in parts.items():
+                    # Aligned, so the memory-mapped arrays can be cast.
+                    dataFile.write(b'\0' * (-dataFile.tell() % 8))
+                    content = bytes(content)
+                    spec[part] = [dataFile.tell(), len(content)]
+                    dataFile.write(content)
+                specs.append([column, spec])
+            manifest['tables'][name] = { 'rows': rows, 'columns': specs }
+        offset = dataFile.tell()
+        encoded = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        dataFile.write(encoded)
+        dataFile.seek(0)
+        dataFile.write(HEADER.pack(MAGIC, offset, len(encoded)))
+    os.replace(temporary, path)
+
+
+class Column:
+    """One memory-mapped column; index it or iterate over it."""
+
+    def __init__(self, buffer, spec):
+        part = lambda name, fmt: buffer[spec[name][0]:spec[name][0] + \
+            spec[name][1]].cast(fmt)
+        self.kind = spec['kind']
+        if self.kind == 'int':
+            self._values = part('values', 'q')
+        elif self.kind == 'bool':
+            self._values = part('values', 'B')
+        elif self.kind == 'category':
+            self._categories = spec['categories']
+            self._values = part('codes', 'H' if len(self._categories) < \
+                1 << 16 else 'I')
+        else:
+            self._offsets = part('offsets', 'I')
+            self._data = part('data', 'B')
+            self._nulls = part('nulls', 'B') if 'nulls' in spec else None
+            self._values = range(len(self._offsets) - 1)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        if self.kind == 'int':
+            value = self._values[i]
+            return None if value == INT_NULL else value
+        if self.kind == 'bool':
+            value = self._values[i]
+            return None if value == BOOL_NULL else bool(value)
+        if self.kind == 'category':
+            return self._categories[self._values[i]]
+        if i < 0:
+            i += len(self)
+        if self._nulls is not None and self._nulls[i]:
+            return None
+        text = str(self._data[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+        return json.loads(text) if self.kind == 'json' else text
+
+    def __iter__(self):
+        if self.kind == 'int':
+            return (None if v == INT_NULL else v for v in self._values)
+        if self.kind == 'bool':
+            return (None if v == BOOL_NULL else bool(v) for v in self._values)
+        if self.kind == 'category':
+            categories = self._categories
+            return (categories[code] for code in self._values)
+        return (self[i] for i in self._values)
+
+
+class Table:
+    """The memory-mapped columns of one table."""
+
+    def __init__(self, name, buffer, spec):
+        self.name = name
+        self.rows = spec['rows']
+        self.columns = { column: Column(buffer, columnSpec) \
+            for column, columnSpec in spec['columns'] }
+
+    def __len__(self):
+        return self.rows
+
+    def row(self, i):
+        return { name: column[i] for name, column in self.columns.items() }
+
+    def iterRows(self):
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+
+class Dataset:
+    """A memory-mapped dataset file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as dataFile:
+            self._map = mmap.mmap(dataFile.fileno(), 0,
+                access=mmap.ACCESS_READ)
+        magic, offset, length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(path + ' is not a stand-in dataset')
+        self.manifest = json.loads(self._map[offset:offset + length])
+        if self.manifest['byteorder'] != sys.byteorder:
+            raise ValueError(path + ' was written on a ' + \
+                self.manifest['byteorder'] + ' endian machine')
+        buffer = memoryview(self._map)
+        self.tables = { name: Table(name, buffer, spec) \
+            for name, spec in self.manifest['tables'].items() }
+
+    def fixtures(self):
+        """Return the dataset in the shape of standin_fixtures.fixtures(),
+        with Rows for the tables."""
+        collections = json.loads(json.dumps(self.manifest['extra']))
+        # Json object keys are strings; the stand-in keys these by id.
+        collections['scheduleControl'] = { int(idNumber): control \
+            for idNumber, control in collections['scheduleControl'].items() }
+        collections.update((name, Rows(table)) \
+            for name, table in self.tables.items())
+        return collections
+
+
+# # # # # # # # # # #
+# Data Generator    #
+# # # # # # # # # # #
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer',
+    'Michael', 'Linda', 'David', 'Elizabeth', 'William', 'Barbara', 'Richard',
+    'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Daniel', 'Karen',
+    'Matthew', 'Emily', 'Anthony', 'Nancy', 'Mark', 'Abigail', 'Joshua',
+    'Hannah', 'Andrew', 'Grace', 'Samuel', 'Rebecca', 'Benjamin', 'Rachel',
+    'Nathan', 'Lydia', 'Caleb', 'Esther', 'Ethan', 'Olivia', 'Noah', 'Emma',
+    'Jacob', 'Sophia', 'Isaac', 'Chloe', 'Elijah', 'Abby', 'Luke', 'Naomi',
+    'Timothy', 'Anna', 'Jonathan', 'Leah', 'Aaron', 'Ruth', 'Peter', 'Faith',
+    'Stephen', 'Joy', 'Kwame', 'Ama', 'Wei', 'Mei', 'Jose', 'Maria',
+    'Carlos', 'Ana', 'Ji-ho', 'Min-seo']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+    'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez',
+    'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson',
+    'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez',
+    'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker', 'Young', 'Allen',
+    'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores', 'Green',
+    'Adams', 'Nelson', 'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell',
+    'Carter', 'Roberts', 'Sullivan', 'O\'Brien', 'Murphy', 'Kelly',
+    'McCarthy', 'Lindsay', 'Carlson', 'Mensah', 'Owusu', 'Kim', 'Park',
+    'Chen', 'Wang', 'Van Dyke', 'De Jong', 'St. Pierre']
+ACTIVITY_TOPICS = ['Chess', 'Hiking', 'Robotics', 'Photography', 'Debate',
+    'Film', 'Poetry', 'Astronomy', 'Gardening', 'Cycling', 'Swing Dance',
+    'Ultimate Frisbee', 'Rock Climbing', 'Jazz', 'A Cappella', 'Pre-Med',
+    'Pre-Law', 'Economics', 'Entrepreneurship', 'Outdoor', 'Fencing',
+    'Running', 'Sailing', 'Ski and Snowboard', 'Quiz Bowl', 'Model UN',
+    'Coding', 'Anime', 'Board Games', 'Cooking', 'Social Work', 'Nursing',
+    'Engineering', 'Physics', 'Mathematics', 'Spanish', 'French', 'German',
+    'Chinese', 'Korean', 'African Students', 'Asian Students',
+    'Latino Students', 'International Students', 'Commuter Students',
+    'Worship', 'Bible Study', 'Missions', 'Prayer', 'Tutoring', 'Habitat',
+    'Food Recovery', 'Sustainability', 'Art', 'Ceramics', 'Theatre Tech',
+    'Improv', 'Radio', 'Yearbook', 'Literary Magazine']
+EVENT_KINDS = [
+    # type id, type name, organization, names, public, CLAW credit
+    ('10', 'Chapel/Worship', 'Chapel Office', ['Chapel', 'Vespers',
+        'Convocation'], 0.2, True),
+    ('11', 'Concert', 'Music Department', ['Symphony Orchestra',
+        'Jazz Ensemble', 'College Choir', 'Wind Ensemble'], 0.9, True),
+    ('12', 'Lecture', 'Faculty Lecture Series', ['Lecture', 'Symposium',
+        'Panel Discussion'], 0.5, True),
+    ('14', 'Theatre', 'Theatre Department', ['Theatre', 'Student One-Acts'],
+        0.9, False),
+    ('16', 'Athletics', 'Athletics Department', ['Soccer', 'Basketball',
+        'Lacrosse', 'Field Hockey', 'Swimming'], 1.0, False),
+    ('20', 'Fair', 'Career Services', ['Career Fair', 'Internship Fair'],
+        0.3, False),
+    ('22', 'Meeting', 'Student Life', ['Club Meeting', 'Info Session',
+        'Town Hall'], 0.1, False),
+]
+NEWS_SUBJECTS = ['Lost keys near Lane', 'Textbooks for sale',
+    'Looking for a ride to Boston', 'Found: water bottle in KOSC',
+    'Mini fridge for sale', 'Roommate wanted for spring',
+    'Bike for sale, barely used', 'Lost: blue umbrella',
+    'Calculus tutor wanted', 'Free couch, must pick up']
+LOCATIONS = ['KOSC 244', 'Jenks 406', 'Frost 201', 'Lane Student Center',
+    'MacDonald Auditorium', 'Phillips Recital Hall', 'Chase 103',
+    'Bennett Center', 'A. J. & Ann Jenks Chapel', 'Barrington Center']
+ACCOUNT_TYPES = [('STUDENT', 0.55), ('ALUMNI', 0.33), ('STAFF', 0.08),
+    ('FACULTY', 0.04)]
+
+
+class TableBuilder:
+    """Collects the records of one table column by column."""
+
+    def __init__(self, columns):
+        self.columns = { column: [] for column in columns }
+
+    def add(self, record):
+        for column, values in self.columns.items():
+            values.append(record.get(column))
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+def _builder(rows):
+    # A builder with the fields of the fixture rows, which come first.
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    builder = TableBuilder(columns)
+    for row in rows:
+        builder.add(row)
+    return builder
+
+def _zipf(count, exponent=1.1):
+    """Cumulative weights of `count` items whose popularity falls off like
+    the clubs of a college: a few big ones and a long tail."""
+    cumulative = []
+    total = 0.0
+    for rank in range(count):
+        total += 1.0 / (rank + 1) ** exponent
+        cumulative.append(total)
+    return cumulative
+
+def _poisson(rng, mean):
+    # Knuth's method; the means used here are small.
+    limit = math.exp(-mean)
+    count, product = 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+def _at(day, rng, earliest=8, latest=21):
+    return datetime.datetime.combine(day, datetime.time(rng.randint(earliest,
+        latest - 1), rng.choice((0, 15, 30, 45))))
+
+def generateAccounts(rng, count, base):
+    """Add synthetic accounts to the fixture accounts until there are count.
+
+    Returns:
+        dict: account type -> ids of the synthetic accounts of that type.
+    """
+    lookups = base['advancedSearch']
+    classes = ['Freshman', 'Sophomore', 'Junior', 'Senior',
+        'Graduate Student']
+    hometowns = [('Wenham', 'Massachusetts', 'United States of America'),
+        ('Beverly', 'Massachusetts', 'United States of America'),
+        ('Boston', 'Massachusetts', 'United States of America'),
+        ('Portland', 'Maine', 'United States of America'),
+        ('Nashua', 'New Hampshire', 'United States of America'),
+        ('Toronto', '', 'Canada'), ('Accra', '', 'Ghana')]
+    builder = _builder(base['accounts'])
+    usernames = { a['ADUserName'].lower() for a in base['accounts'] }
+    firstWeights = _zipf(len(FIRST_NAMES), 0.7)
+    lastWeights = _zipf(len(LAST_NAMES), 0.7)
+    types = [kind for kind, _ in ACCOUNT_TYPES]
+    typeWeights = [share for _, share in ACCOUNT_TYPES]
+    idBases = { 'STUDENT': 51000000, 'ALUMNI': 40000000, 'STAFF': 8500000,
+        'FACULTY': 8600000 }
+    ids = { kind: [] for kind in types }
+    for n in range(max(count - len(builder), 0)):
+        kind = rng.choices(types, typeWeights)[0]
+        idNumber = idBases[kind] + len(ids[kind])
+        ids[kind].append(idNumber)
+        first = rng.choices(FIRST_NAMES, cum_weights=firstWeights)[0]
+        last = rng.choices(LAST_NAMES, cum_weights=lastWeights)[0]
+        username = '{0}.{1}'.format(first, last.replace(' ', '')
+            .replace('\'', ''))
+        suffix = 1
+        while username.lower() in usernames:
+            suffix += 1
+            username = '{0}.{1}{2}'.format(first, last.replace(' ', '')
+                .replace('\'', ''), suffix)
+        usernames.add(username.lower())
+        city, state, country = rng.choice(hometowns)
+        account = fixtures.makeAccount(idNumber, username, first, last, kind,
+            account_id=100000 + n, show_pic=int(rng.random() < 0.8),
+            HomeCity=city, HomeState=state, Country=country,
+            NickName='', MaidenName='', Class='', Major1Description='',
+            Minor1Description='', OnCampusDepartment='',
+            BuildingDescription='')
+        if kind == 'STUDENT':
+            account['Class'] = rng.choice(classes)
+            account['Major1Description'] = rng.choice(lookups['majors'])
+            if rng.random() < 0.3:
+                account['Minor1Description'] = rng.choice(lookups['minors'])
+            if rng.random() < 0.85:
+                account['Hall'] = rng.choice(lookups['halls'])
+                account['OnCampusRoom'] = str(rng.randint(100, 450))
+                account['OnOffCampus'] = 'On Campus'
+            else:
+                account['OnOffCampus'] = 'Off Campus'
+        elif kind == 'ALUMNI':
+            account['MaidenName'] = rng.choice(LAST_NAMES) \
+                if rng.random() < 0.2 else ''
+        else:
+            account['OnCampusDepartment'] = rng.choice(lookups['departments'])
+            account['BuildingDescription'] = rng.choice(lookups['buildings'])
+        builder.add(account)
+    return builder, ids
+
+def generateActivities(rng, count, base):
+    builder = _builder(base['activities'])
+    # Synthetic memberships go to the synthetic activities only, so the
+    # members the suite counts in the fixture activities stay the same.
+    codes = []
+    sessionCodes = [s['SessionCode'] for s in base['sessions']]
+    seen = set()
+    for n in range(max(count - len(builder), 0)):
+        activityType = rng.choice(sorted(fixtures.ACTIVITY_TYPES))
+        description = '{0} {1}'.format(rng.choice(ACTIVITY_TOPICS),
+            fixtures.ACTIVITY_TYPES[activityType])
+        if description in seen:
+            description += ' {0}'.format(n)
+        seen.add(description)
+        code = '{0}{1:04d}'.format(activityType, n)
+        codes.append(code)
+        sessions = None
+        if rng.random() < 0.1:
+            first = rng.randrange(len(sessionCodes))
+            sessions = sessionCodes[first:first + rng.randint(1, 6)]
+        builder.add(fixtures.makeActivity(code, description, activityType,
+            blurb='Come and join the {0}!'.format(description),
+            privacy=rng.random() < 0.1, sessions=sessions))
+    return builder, codes
+
+def generateMemberships(rng, base, activityCodes, ids, sessions, perStudent):
+    builder = _builder(base['memberships'])
+    nextID = max([m['MEMBERSHIP_ID'] for m in base['memberships']] or [0]) + 1
+    popularity = _zipf(len(activityCodes))
+    advisors = ids['FACULTY'] + ids['STAFF']
+    current = sessions[-1]['SessionCode']
+    for session in sessions if activityCodes else []:
+        code = session['SessionCode']
+        led = set()
+        for idNumber in ids['STUDENT']:
+            joined = set(rng.choices(activityCodes, cum_weights=popularity,
+                k=_poisson(rng, perStudent)))
+            for activityCode in joined:
+                participation = rng.choices(['MEMBR', 'PART', 'GUEST'],
+                    [0.9, 0.05, 0.05])[0]
+                groupAdmin = False
+                if activityCode not in led:
+                    led.add(activityCode)
+                    participation = rng.choice(['LEAD', 'PRES', 'CAPT'])
+                    groupAdmin = True
+                membership = fixtures.makeMembership(nextID, activityCode,
+                    code, idNumber, participation, groupAdmin)
+                membership['BEGIN_DTE'] = session['SessionBeginDate']
+                if code != current:
+                    membership['END_DTE'] = session['SessionEndDate']
+                builder.add(membership)
+                nextID += 1
+        for activityCode in sorted(led):
+            if advisors:
+                builder.add(fixtures.makeMembership(nextID, activityCode,
+                    code, rng.choice(advisors), 'ADV', True))
+                nextID += 1
+    return builder
+
+def generateRequests(rng, count, base, activityCodes, ids, sessions):
+    builder = _builder(base['requests'])
+    nextID = max([r['REQUEST_ID'] for r in base['requests']] or [0]) + 1
+    popularity = _zipf(len(activityCodes))
+    for _ in range(count if ids['STUDENT'] and activityCodes else 0):
+        session = rng.choice(sessions)
+        begin = datetime.datetime.fromisoformat(session['SessionBeginDate'])
+        request = fixtures.makeRequest(nextID, rng.choices(activityCodes,
+            cum_weights=popularity)[0], session['SessionCode'],
+            rng.choice(ids['STUDENT']), _at((begin + datetime.timedelta(
+            days=rng.randint(0, 40))).date(), rng).isoformat())
+        request['STATUS'] = rng.choices(['Pending', 'Approved', 'Denied'],
+            [0.6, 0.3, 0.1])[0]
+        builder.add(request)
+        nextID += 1
+    return builder
+
+def generateEvents(rng, count, base, sessions):
+    builder = _builder(base['events'])
+    begin = datetime.date.fromisoformat(sessions[0]['SessionBeginDate'][:10])
+    days = (datetime.date.fromisoformat(sessions[-1]['SessionEndDate'][:10]) \
+        - begin).days
+    for n in range(count):
+        typeID, typeName, organization, names, public, claw = \
+            rng.choice(EVENT_KINDS)
+        name = rng.choice(names)
+        start = _at(begin + datetime.timedelta(days=rng.randrange(days)),
+            rng)
+        event = fixtures.makeEvent(str(10000 + n), name, '{0}: {1}'.format(name,
+            rng.choice(ACTIVITY_TOPICS)), typeID, typeName, organization,
+            start.isoformat(), requirement='3' if rng.random() < public \
+            else '1', claw=claw and rng.random() < 0.6)
+        event['EndDate'] = (start + datetime.timedelta(
+            minutes=rng.choice((45, 60, 90, 120)))).isoformat()
+        event['Location'] = rng.choice(LOCATIONS)
+        event['Description'] = 'Join us for {0}.'.format(event['Event_Title'])
+        builder.add(event)
+    return builder
+
+def generateNews(rng, count, base, usernames, today):
+    builder = TableBuilder(['SNID', 'ADUN', 'categoryID', 'Subject', 'Body',
+        'Image', 'Accepted', 'Sent', 'thisPastMailing', 'Entered',
+        'categoryName', 'SortOrder', 'ManualExpirationDate'])
+    for row in base['news']:
+        builder.add(row)
+    categories = base['newsCategories']
+    for n in range(count):
+        category = rng.choice(categories)
+        entered = _at(today - datetime.timedelta(days=rng.randint(0, 14)),
+            rng)
+        builder.add({
+            'SNID': n + 1,
+            'ADUN': rng.choice(usernames),
+            'categoryID': category['categoryID'],
+            'Subject': rng.choice(NEWS_SUBJECTS),
+            'Body': 'Contact me if interested. ' * rng.randint(1, 6),
+            'Image': None,
+            'Accepted': rng.random() < 0.9,
+            'Sent': False,
+            'thisPastMailing': False,
+            'Entered': entered.isoformat(),
+            'categoryName': category['categoryName'],
+            'SortOrder': category['SortOrder'],
+            'ManualExpirationDate': (entered + datetime.timedelta(
+                days=14)).isoformat(),
+        })
+    return builder
+
+def generateSchedules(rng, base, idNumbers, share):
+    builder = _builder(base['myschedule'])
+    nextID = max([int(e['EVENT_ID']) for e in base['myschedule']] or [0]) + 1
+    days = [('MON_CDE', 'M'), ('TUE_CDE', 'T'), ('WED_CDE', 'W'),
+        ('THU_CDE', 'R'), ('FRI_CDE', 'F')]
+    for idNumber in idNumbers:
+        if rng.random() >= share:
+            continue
+        for _ in range(rng.randint(1, 3)):
+            beginHour = rng.randint(8, 18)
+            event = { 'EVENT_ID': str(nextID), 'GORDON_ID': str(idNumber),
+                'LOCATION': rng.choice(LOCATIONS),
+                'DESCRIPTION': rng.choice(['Office hours', 'Work study',
+                    'Practice', 'Rehearsal', 'Study group']),
+                'SAT_CDE': None, 'SUN_CDE': None, 'IS_ALLDAY': 0,
+                'BEGIN_TIME': '{0:02d}:00:00'.format(beginHour),
+                'END_TIME': '{0:02d}:00:00'.format(beginHour + 1) }
+            for day, code in days:
+                event[day] = code if rng.random() < 0.5 else None
+            builder.add(event)
+            nextID += 1
+    return builder
+
+def generateWellness(rng, idNumbers, share, today):
+    builder = TableBuilder(['ID_NUM', 'answer', 'timestamp'])
+    for idNumber in idNumbers:
+        if rng.random() < share:
+            builder.add({ 'ID_NUM': idNumber, 'answer': rng.random() < 0.03,
+                'timestamp': _at(today, rng, 6, 12).isoformat() })
+    return builder
+
+def generate(accounts=50000, activities=5000, sessions=8, memberships=2.0,
+        requests=None, events=5000, news=2000, seed=360, today=None):
+    """Generate a dataset around the stand-in fixtures.
+
+    Args:
+        accounts (int): accounts in all, fixture accounts included.
+        activities (int): activities in all, fixture activities included.
+        sessions (int): most recent sessions students have memberships in.
+        memberships (float): mean memberships of a student per session.
+        requests (int): synthetic membership requests (default: one per
+            five accounts).
+        events (int): synthetic events.
+        news (int): synthetic news items.
+        seed (int): seed of every random choice.
+        today (datetime.date): date the sessions and news are relative to.
+
+    Returns:
+        (dict, dict): the tables, as {name: {column: [values]}}, and the
+        small collections for the manifest.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    base = fixtures.fixtures(today)
+    # The last session is the next one, which has not started yet.
+    recent = base['sessions'][-sessions - 1:-1]
+    accountTable, ids = generateAccounts(rng, accounts, base)
+    activityTable, activityCodes = generateActivities(rng, activities, base)
+    synthetic = [idNumber for kind in ids for idNumber in ids[kind]]
+    usernames = accountTable.columns['ADUserName']
+    tables = {
+        'accounts': accountTable,
+        'activities': activityTable,
+        'memberships': generateMemberships(rng, base, activityCodes, ids,
+            recent, memberships),
+        'requests': generateRequests(rng, accounts // 5 if requests is None \
+            else requests, base, activityCodes, ids, recent),
+        'events': generateEvents(rng, events, base, recent),
+        'news': generateNews(rng, news, base, usernames, today),
+        'myschedule': generateSchedules(rng, base, synthetic, 0.2),
+        'wellness': generateWellness(rng, ids['STUDENT'] + ids['FACULTY'] + \
+            ids['STAFF'], 0.6, today),
+    }
+    extra = { name: collection for name, collection in base.items() \
+        if name not in TABLES }
+    extra['scheduleControl'] = { str(idNumber): control for idNumber, \
+        control in extra['scheduleControl'].items() }
+    return { name: table.columns for name, table in tables.items() }, extra
+
+
+def printInfo(dataset):
+    manifest = dataset.manifest
+    print('{0}: {1:.1f} MB, seed {2}, generated {3}'.format(dataset.path,
+        os.path.getsize(dataset.path) / 1e6, manifest.get('seed'),
+        manifest.get('generated')))
+    print('{0:<14} {1:>10}  {2}'.format('TABLE', 'ROWS', 'COLUMNS'))
+    for name, table in dataset.tables.items():
+        print('{0:<14} {1:>10}  {2}'.format(name, len(table), ', '.join(
+            '{0} ({1})'.format(column, table.columns[column].kind) \
+            for column in table.columns)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    generateCommand = commands.add_parser('generate',
+        help='generate a dataset file')
+    generateCommand.add_argument('path', metavar='PATH')
+    generateCommand.add_argument('--accounts', type=int, default=50000,
+        help='accounts, fixtures included (default: %(default)s)')
+    generateCommand.add_argument('--activities', type=int, default=5000,
+        help='activities, fixtures included (default: %(default)s)')
+    generateCommand.add_argument('--sessions', type=int, default=8,
+        help='recent sessions with memberships (default: %(default)s)')
+    generateCommand.add_argument('--memberships', type=float, default=2.0,
+        help='mean memberships per student and session (default: '
+             '%(default)s)')
+    generateCommand.add_argument('--requests', type=int, default=None,
+        help='membership requests (default: one per five accounts)')
+    generateCommand.add_argument('--events', type=int, default=5000,
+        help='events (default: %(default)s)')
+    generateCommand.add_argument('--news', type=int, default=2000,
+        help='news items (default: %(default)s)')
+    generateCommand.add_argument('--seed', type=int, default=360,
+        help='random seed (default: %(default)s)')
+    infoCommand = commands.add_parser('info',
+        help='describe a dataset file')
+    infoCommand.add_argument('path', metavar='PATH')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        start = time.monotonic()
+        tables, extra = generate(args.accounts, args.activities,
+            args.sessions, args.memberships, args.requests, args.events,
+            args.news, args.seed)
+        write(args.path, tables, extra, { 'seed': args.seed,
+            'generated': datetime.datetime.now().replace(microsecond=0)
+            .isoformat() })
+        print('Generated in {0:.1f}s.'.format(time.monotonic() - start))
+    elif args.command == 'info':
+        pass
+    else:
+        parser.print_help()
+        return 2
+    printInfo(Dataset(args.path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
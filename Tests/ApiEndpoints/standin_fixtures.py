@@ -0,0 +1,431 @@
+import datetime
+
+# Stand-in Fixtures
+#
+# The records gordon_360_standin.py serves.  They mirror the train database
+# as far as the endpoint suite can see it: the values asserted in the
+# test_all*_pytest.py files, plus enough surrounding rows (other activities,
+# past members, requests for other clubs) for list and count endpoints to
+# look like the real thing.  fixtures() returns fresh copies, so every
+# stand-in starts from the same state.
+
+STUDENT_ID = 999999097
+LEADER_ID = 999999098
+VALID_ID = 50146557
+
+def makeAccount(idNumber, username, firstName, lastName, accountType, **extra):
+    account = {
+        'ID': idNumber,
+        'ADUserName': username,
+        'FirstName': firstName,
+        'LastName': lastName,
+        'Email': username + '@gordon.edu',
+        'AccountType': accountType,
+        'Barcode': None,
+        'show_pic': 1,
+        'ReadOnly': 0,
+        'account_id': 30000 + idNumber % 1000,
+        'IsMobilePhonePrivate': 0,
+        'facebook': '',
+        'twitter': '',
+        'instagram': '',
+        'linkedin': '',
+        'OnCampusRoom': None,
+        'OnOffCampus': None,
+        'Hall': None,
+    }
+    account.update(extra)
+    return account
+
+# Past A. J. Gordon scholars, so AJG has the member count the suite expects.
+_SCHOLAR_FIRST_NAMES = ['Abigail', 'Benjamin', 'Caleb', 'Deborah', 'Elijah',
+    'Faith', 'Gideon', 'Hannah', 'Isaac', 'Judith', 'Levi', 'Miriam', 'Nathan',
+    'Phoebe', 'Reuben', 'Susanna', 'Tabitha']
+SCHOLAR_COUNT = 85
+
+def _accounts():
+    accounts = [
+        makeAccount(STUDENT_ID, '360.StudentTest', '360', 'StudentTest',
+            'STUDENT', Barcode='21607000485992', show_pic=0,
+            account_id=30578, OnCampusRoom='210', Hall='Tavilla'),
+        makeAccount(LEADER_ID, '360.FacultyTest', '360', '360', 'FACULTY',
+            Barcode='21607000486016', account_id=30580),
+        makeAccount(8330171, 'Chris.Carlson', 'Christopher', 'Carlson',
+            'FACULTY', account_id=10417),
+        makeAccount(50154997, 'Emmy.Short', 'Emmy', 'Short', 'STUDENT',
+            account_id=28791),
+        makeAccount(8400012, 'Michael.Lindsay', 'Michael', 'Lindsay', 'STAFF',
+            account_id=10022),
+        makeAccount(50160112, 'Michael.Anderson', 'Michael', 'Anderson',
+            'STUDENT', account_id=29112),
+        makeAccount(50171234, 'Grace.Michaels', 'Grace', 'Michaels', 'STUDENT',
+            account_id=29634),
+    ]
+    for n in range(SCHOLAR_COUNT):
+        idNumber = VALID_ID if n == 0 else 50140000 + n
+        lastName = 'Scholar{0:02d}'.format(n + 1)
+        firstName = _SCHOLAR_FIRST_NAMES[n % len(_SCHOLAR_FIRST_NAMES)]
+        accounts.append(makeAccount(idNumber, firstName + '.' + lastName,
+            firstName, lastName, 'STUDENT', account_id=27000 + n))
+    _addDirectoryDetails(accounts)
+    return accounts
+
+_CLASSES = ['Freshman', 'Sophomore', 'Junior', 'Senior', 'Graduate Student']
+_HOMETOWNS = [
+    # city, state, country
+    ('Wenham', 'Massachusetts', 'United States of America'),
+    ('Beverly', 'Massachusetts', 'United States of America'),
+    ('East Longmeadow', 'Massachusetts', 'United States of America'),
+    ('Portland', 'Maine', 'United States of America'),
+    ('Nashua', 'New Hampshire', 'United States of America'),
+    ('Toronto', '', 'Canada'),
+    ('Accra', '', 'Ghana'),
+]
+
+def _addDirectoryDetails(accounts):
+    # The fields advanced people search filters on, spread over the lookup
+    # values so every filter matches somebody.
+    lookups = _advancedSearch()
+    pick = lambda values, n: values[n % len(values)]
+    for n, account in enumerate(accounts):
+        city, state, country = pick(_HOMETOWNS, n)
+        account.update({ 'NickName': '', 'MaidenName': '', 'HomeCity': city,
+            'HomeState': state, 'Country': country, 'Class': '',
+            'Major1Description': '', 'Minor1Description': '',
+            'OnCampusDepartment': '', 'BuildingDescription': '' })
+        if account['AccountType'] == 'STUDENT':
+            account['Class'] = pick(_CLASSES, n)
+            account['Major1Description'] = pick(lookups['majors'], n)
+            if n % 3 == 0:
+                account['Minor1Description'] = pick(lookups['minors'], n // 3)
+            if account['Hall'] is None:
+                account['Hall'] = pick(lookups['halls'], n)
+        else:
+            account['OnCampusDepartment'] = pick(lookups['departments'], n)
+            account['BuildingDescription'] = pick(lookups['buildings'], n)
+
+
+# Site admins; they may use every endpoint for every account.
+def _admins():
+    return [
+        { 'ADMIN_ID': 1, 'ID_NUM': 8330171, 'USER_NAME': 'Chris.Carlson',
+            'EMAIL': 'Chris.Carlson@gordon.edu', 'SUPER_ADMIN': True },
+        { 'ADMIN_ID': 2, 'ID_NUM': LEADER_ID, 'USER_NAME': '360.FacultyTest',
+            'EMAIL': '360.facultytest@gordon.edu', 'SUPER_ADMIN': True },
+    ]
+
+
+# Sessions
+
+SESSION_TERMS = [
+    # month code, name, (begin month, day), (end month, day)
+    ('01', 'Spring', (1, 10), (5, 10)),
+    ('05', 'Summer', (5, 15), (8, 20)),
+    ('09', 'Fall', (8, 29), (12, 21)),
+]
+
+def _session(year, term):
+    code, name, begin, end = term
+    academicYear = year if code == '09' else year - 1
+    return {
+        'SessionCode': '{0}{1}'.format(year, code),
+        'SessionDescription': '{0} {1:02d}-{2:02d} Academic Year'.format(name,
+            academicYear % 100, (academicYear + 1) % 100),
+        'SessionBeginDate': datetime.datetime(year, *begin).isoformat(),
+        'SessionEndDate': datetime.datetime(year, *end).isoformat(),
+    }
+
+def _sessions(today):
+    # Every session from Fall 2012 up to the one after the current one, so
+    # the current session is always second to last, as on the real api.
+    sessions = []
+    year = 2012
+    while True:
+        for term in SESSION_TERMS:
+            session = _session(year, term)
+            if session['SessionCode'] < '201209':
+                continue
+            sessions.append(session)
+            if session['SessionBeginDate'] > today.isoformat():
+                return sessions
+        year += 1
+
+
+# Activities
+
+ACTIVITY_TYPES = {
+    'ATH': 'Athletic Club',
+    'CLU': 'Student Club',
+    'GOV': 'Student Government',
+    'LEA': 'Leadership Program',
+    'MED': 'Student Media',
+    'MIN': 'Student Ministry',
+    'MUS': 'Music Group',
+    'ORG': 'Student Organization',
+    'RES': 'Residence Life',
+    'SCH': 'Scholarship',
+    'SLP': 'Service Learning Project',
+    'STU': 'Student Life',
+    'THE': 'Theatre Production',
+}
+
+def makeActivity(code, description, activityType, blurb='', url='',
+        privacy=False, joinInfo='', sessions=None):
+    return {
+        'ActivityCode': code,
+        'ActivityDescription': description,
+        'ActivityImagePath': 'https://360apitrain.gordon.edu/browseable/'
+            'uploads/' + code + '/canvasImage.png',
+        'ActivityBlurb': blurb,
+        'ActivityURL': url,
+        'ActivityType': activityType,
+        'ActivityTypeDescription': ACTIVITY_TYPES[activityType],
+        'Privacy': privacy,
+        'ActivityJoinInfo': joinInfo,
+        # Sessions the activity ran in, or None for every session.
+        'Sessions': sessions,
+    }
+
+def _activities():
+    return [
+        makeActivity('360', '360.gordon.edu', 'STU',
+            'This is me changing the description', 'http://360.gordon.edu',
+            joinInfo='me adding special information'),
+        makeActivity('ACS', 'American Chemical Society', 'CLU',
+            sessions=['201209', '201301', '201309', '201401']),
+        makeActivity('AJG', 'A. J. Gordon Scholars Program', 'LEA',
+            'DOING TESTS, IGNORE', 'http://www.lolcats.com/', privacy=True),
+        makeActivity('BADM', 'Badminton Club', 'ATH'),
+        makeActivity('CHAP', 'Chapel Worship Team', 'MIN'),
+        makeActivity('CHOR', 'College Choir', 'MUS'),
+        makeActivity('PRES', 'Presidential Scholars', 'SCH'),
+        makeActivity('RA', 'Resident Advisors', 'RES'),
+        makeActivity('SCOTTIE', 'Scottie Ambassadors', 'ORG'),
+        makeActivity('SGA', 'Student Government Association', 'GOV'),
+        makeActivity('SLSP', 'Service Learning Spring Break', 'SLP'),
+        makeActivity('TART', 'The Tartan', 'MED'),
+        makeActivity('THEA', 'Theatre Mainstage Production', 'THE'),
+        makeActivity('TRAS', 'Trash Club', 'CLU'),
+    ]
+
+
+# Memberships and Requests
+
+PARTICIPATION = {
+    'ADV': 'Advisor',
+    'CAPT': 'Captain',
+    'CODIR': 'Co-Director',
+    'CORD': 'Coordinator',
+    'DIREC': 'Director',
+    'GUEST': 'Guest',
+    'LEAD': 'Leader',
+    'MEMBR': 'Member',
+    'PART': 'Participant',
+    'PRES': 'President',
+    'VICEC': 'Vice-Chair',
+    'VICEP': 'Vice-President',
+}
+LEADER_PARTICIPATION = {'CAPT', 'CODIR', 'CORD', 'DIREC', 'LEAD', 'PRES',
+    'VICEC', 'VICEP'}
+
+def makeMembership(membershipID, activityCode, sessionCode, idNumber,
+        participation, groupAdmin=False, comment=None):
+    return {
+        'MEMBERSHIP_ID': membershipID,
+        'ACT_CDE': activityCode,
+        'SESS_CDE': sessionCode,
+        'ID_NUM': idNumber,
+        'PART_CDE': participation,
+        'BEGIN_DTE': '2018-08-29T00:00:00',
+        'END_DTE': None,
+        'COMMENT_TXT': comment,
+        'GRP_ADMIN': groupAdmin,
+        'PRIVACY': None,
+    }
+
+def _memberships():
+    memberships = [
+        makeMembership(1, '360', '201809', LEADER_ID, 'LEAD', groupAdmin=True),
+        makeMembership(2, 'AJG', '201809', 8330171, 'ADV', groupAdmin=True),
+        makeMembership(3, 'AJG', '201809', 50154997, 'LEAD', groupAdmin=True),
+        makeMembership(4, 'AJG', '201809', STUDENT_ID, 'MEMBR'),
+        makeMembership(5, 'BADM', '201809', STUDENT_ID, 'MEMBR'),
+        makeMembership(6, 'TRAS', '201809', 50160112, 'PRES', groupAdmin=True),
+    ]
+    # Past AJG cohorts, Fall 2012 through Spring 2018.
+    past = ['{0}{1}'.format(year, month) for year in range(2012, 2019) \
+        for month in ('01', '09') if '201209' <= '{0}{1}'.format(year, month) \
+        < '201809']
+    for n in range(SCHOLAR_COUNT):
+        idNumber = VALID_ID if n == 0 else 50140000 + n
+        memberships.append(makeMembership(len(memberships) + 1, 'AJG',
+            past[n % len(past)], idNumber, 'MEMBR'))
+    return memberships
+
+def makeRequest(requestID, activityCode, sessionCode, idNumber, dateSent):
+    return {
+        'REQUEST_ID': requestID,
+        'ACT_CDE': activityCode,
+        'SESS_CDE': sessionCode,
+        'ID_NUM': idNumber,
+        'PART_CDE': 'MEMBR',
+        'DATE_SENT': dateSent,
+        'COMMENT_TXT': None,
+        'STATUS': 'Pending',
+    }
+
+def _requests():
+    return [
+        makeRequest(1, '360', '201809', 50171234, '2018-09-04T10:12:00'),
+        makeRequest(2, 'BADM', '201809', 50160112, '2018-09-05T14:40:00'),
+        makeRequest(3, 'ACS', '201401', 50140003, '2014-01-21T09:03:00'),
+        makeRequest(4, 'SCOTTIE', '201809', 50171234, '2018-09-11T16:25:00'),
+        makeRequest(5, 'AJG', '201809', 50171234, '2018-09-12T11:00:00'),
+    ]
+
+
+# Schedules
+
+def _myschedule():
+    return [
+        {
+            'EVENT_ID': '10000',
+            'GORDON_ID': str(STUDENT_ID),
+            'LOCATION': 'KOSC 244',
+            'DESCRIPTION': 'DOING TESTS - IGNORE',
+            'MON_CDE': 'M', 'TUE_CDE': 'T', 'WED_CDE': None, 'THU_CDE': 'R',
+            'FRI_CDE': 'F', 'SAT_CDE': None, 'SUN_CDE': None,
+            'IS_ALLDAY': 0,
+            'BEGIN_TIME': '09:00:00',
+            'END_TIME': '17:00:00',
+        },
+        {
+            'EVENT_ID': '1100',
+            'GORDON_ID': str(LEADER_ID),
+            'LOCATION': 'KOSC 244',
+            'DESCRIPTION': 'Office hours',
+            'MON_CDE': 'M', 'TUE_CDE': None, 'WED_CDE': 'W', 'THU_CDE': None,
+            'FRI_CDE': None, 'SAT_CDE': None, 'SUN_CDE': None,
+            'IS_ALLDAY': 0,
+            'BEGIN_TIME': '13:00:00',
+            'END_TIME': '15:00:00',
+        },
+    ]
+
+def _scheduleControl():
+    return {
+        STUDENT_ID: { 'IsSchedulePrivate': True,
+            'Description': 'DOING TESTS - IGNORE' },
+        LEADER_ID: { 'IsSchedulePrivate': False,
+            'Description': 'httpsCoLnSlShSlShgithubdOTcomSlSh' },
+    }
+
+
+# Events
+
+def makeEvent(eventID, name, title, typeID, typeName, organization, start,
+        requirement='1', claw=False):
+    return {
+        'Event_ID': eventID,
+        'Event_Name': name,
+        'Event_Title': title,
+        'Event_Type_Id': typeID,
+        'Event_Type_Name': typeName,
+        'Requirement_Id': requirement,
+        'HasCLAWCredit': claw,
+        'IsPublic': requirement == '3',
+        'Description': '',
+        'StartDate': start,
+        'EndDate': start[:11] + '11:30:00',
+        'Location': 'A. J. & Ann Jenks Chapel',
+        'Organization': organization,
+    }
+
+def _events():
+    return [
+        makeEvent('2911', 'Chapel', 'Chapel: David Kirika', '10',
+            'Chapel/Worship', 'Chapel Office', '2018-09-05T10:25:00',
+            claw=True),
+        makeEvent('2914', 'Chapel', 'Chapel: Convocation', '10', 'Chapel/Worship',
+            'Chapel Office', '2018-09-07T10:25:00', requirement='3',
+            claw=True),
+        makeEvent('3102', 'Symphony Orchestra', 'Fall Orchestra Concert', '11',
+            'Concert', 'Music Department', '2018-10-12T19:30:00',
+            requirement='3', claw=True),
+        makeEvent('3150', 'Lecture', 'Faculty Lecture: Quantum Computing', '12',
+            'Lecture', 'Physics Department', '2018-10-17T15:00:00',
+            claw=True),
+        makeEvent('3201', 'Theatre', 'The Tempest', '14', 'Theatre',
+            'Theatre Department', '2018-11-02T19:00:00', requirement='3'),
+        makeEvent('3350', 'Career Fair', 'Fall Career Fair', '20', 'Fair',
+            'Career Services', '2018-10-03T11:00:00'),
+    ]
+
+def _chapelCredits():
+    # Chapel events the test student attended, by term code.
+    return { 'FA18': ['2911', '2914'] }
+
+
+# Other Lookups
+
+def _halls():
+    return ['Conrad', 'Hilton', 'Tavilla']
+
+def _wellnessQuestion():
+    return {
+        'question': 'Are you experiencing any of the following symptoms '
+            'not caused by a known condition?',
+        'yesPrompt': 'Please stay in your room and contact the Health '
+            'Center.',
+        'noPrompt': 'Thank you for checking in. Have a great day!',
+    }
+
+def _newsCategories():
+    return [
+        { 'categoryID': 1, 'categoryName': 'Lost and Found', 'SortOrder': 1 },
+        { 'categoryID': 2, 'categoryName': 'For Sale', 'SortOrder': 2 },
+        { 'categoryID': 3, 'categoryName': 'Wanted', 'SortOrder': 3 },
+    ]
+
+def _advancedSearch():
+    return {
+        'majors': ['Biology', 'Computer Science', 'English', 'History',
+            'Music', 'Psychology'],
+        'minors': ['Biblical Studies', 'Chemistry', 'Mathematics'],
+        'halls': ['Bromley Hall', 'Ferrin Hall', 'Tavilla Hall'],
+        'states': ['Maine', 'Massachusetts', 'New Hampshire'],
+        'countries': ['Canada', 'Ghana', 'United States of America'],
+        'departments': ['Computer Science', 'Music', 'Physics'],
+        'buildings': ['Jenks Center', 'Ken Olsen Science Center'],
+    }
+
+
+def fixtures(today=None):
+    """Return a fresh copy of every stand-in record.
+
+    Args:
+        today (datetime.date): date that decides the current session
+            (default: today).
+
+    Returns:
+        dict: collections keyed by name.
+    """
+    today = today or datetime.date.today()
+    return {
+        'accounts': _accounts(),
+        'admins': _admins(),
+        'sessions': _sessions(today),
+        'activities': _activities(),
+        'memberships': _memberships(),
+        'requests': _requests(),
+        'myschedule': _myschedule(),
+        'scheduleControl': _scheduleControl(),
+        'events': _events(),
+        'chapelCredits': _chapelCredits(),
+        'halls': _halls(),
+        'wellnessQuestion': _wellnessQuestion(),
+        'newsCategories': _newsCategories(),
+        'news': [],
+        'advancedSearch': _advancedSearch(),
+        'wellness': [],
+    }
@@ -5,6 +5,7 @@ from pytest_components import requests
 from datetime import datetime
 
 import pytest_components as api
+import response_schemas as schemas
 import test_gordon360_pytest as control
 
 class Test_AllAccountTest(control.testCase):
@@ -16,8 +17,8 @@ class Test_AllAccountTest(control.testCase):
 #    Endpoint -- api/accounts/email/{email}
 #    Expected Status Code -- 200 OK
 #    Expected Response Body -- profile of the email person
-    def test_get_student_by_email(self):
-        self.session = self.createAuthorizedSession(control.username, control.password)
+    def test_get_student_by_email(self, student_session):
+        self.session = student_session
         self.url = control.hostURL + 'api/accounts/email/' + control._email + '/'
         response = api.get(self.session, self.url)
 
@@ -38,15 +39,14 @@ class Test_AllAccountTest(control.testCase):
         assert response.json()["show_pic"] == 0
         assert response.json()["ReadOnly"] == 0
         assert response.json()["account_id"] == 30578
-        if "GordonID" in response.json():
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a user can search someone by a word 
 #    Endpoint -- api/accounts/search/:word
 #    Expected Status Code -- 200 OK
 #    Expected Response Body -- any info that has the word
-    def test_get_search_by_string(self):
-        self.session = self.createAuthorizedSession(control.username, control.password)
+    def test_get_search_by_string(self, student_session):
+        self.session = student_session
         self.url = control.hostURL + 'api/accounts/search/' + control.searchString + '/'
         response = api.get(self.session, self.url)
         if not response.status_code == 200:
@@ -63,8 +63,8 @@ class Test_AllAccountTest(control.testCase):
 #    Endpoint -- api/accounts/search/:word/:word2
 #    Expected Status Code -- 200 OK
 #    Expected Response Body -- any info that has both of words 
-    def test_get_search_by_two_string(self):
-        self.session = self.createAuthorizedSession(control.username, control.password)
+    def test_get_search_by_two_string(self, student_session):
+        self.session = student_session
         self.url = control.hostURL + 'api/accounts/search/' + control.searchString + '/' + \
             control.searchString2 + '/'
         response = api.get(self.session, self.url)
@@ -83,8 +83,8 @@ class Test_AllAccountTest(control.testCase):
 #    Endpoint -- api/accounts/username/{username}
 #    Expected Status Code -- 200 OK
 #    Expected Response Body -- profile info of {username}
-    def test_get_search_by_username(self):
-        self.session = self.createAuthorizedSession(control.username, control.password)
+    def test_get_search_by_username(self, student_session):
+        self.session = student_session
         self.url = control.hostURL + 'api/accounts/username/' + control.leader_username + '/'
         response = api.get(self.session, self.url)
         if not response.status_code == 200:
@@ -105,5 +105,4 @@ class Test_AllAccountTest(control.testCase):
         assert response.json()["show_pic"] == 1
         assert response.json()["ReadOnly"] == 0
         assert response.json()["account_id"] == 30580
-        if "GordonID" in response.json():
-            warnings.warn("Security fault, Gordon ID leak")
\ No newline at end of file
+        schemas.validate(response)
\ No newline at end of file
@@ -0,0 +1,315 @@
+import gzip
+import json
+import os
+import statistics
+import time
+import pytest
+
+import route_trie
+import test_gordon360_pytest as control
+
+# Probing every route is slow and says nothing about the rest of the suite, so
+# these tests only run with --caching-check (see conftest.py).
+pytestmark = pytest.mark.caching
+
+# Full fetches and conditional re-fetches made per route; latencies are the
+# median of these.
+SAMPLES = 3
+# Bodies smaller than this are not worth compressing, and are not expected
+# to be.
+GZIP_MIN_BYTES = 1024
+# Level used to estimate what compression would save on routes that do not
+# compress yet, as in gordon_360_payload.py.
+GZIP_LEVEL = 6
+
+# Routes that already answer a conditional re-fetch with 304 Not Modified, and
+# routes that already gzip their bodies.  Every other route is expected to fail
+# its check (xfail); when one starts passing, pytest reports it as XPASS and it
+# belongs in the set below, which from then on guards it against regressing.
+CONDITIONAL_ROUTES = set()
+GZIP_ROUTES = set()
+
+# Lookups that change a few times a year at most, yet are downloaded on every
+# page load.  These are listed first in the report.
+NEAR_STATIC_ROUTES = {
+    'api/activities/session/{id}/types',
+    'api/advanced-search/buildings',
+    'api/advanced-search/countries',
+    'api/advanced-search/departments',
+    'api/advanced-search/halls',
+    'api/advanced-search/majors',
+    'api/advanced-search/minors',
+    'api/advanced-search/states',
+    'api/housing/halls/apartments',
+    'api/jobs/hourTypes',
+    'api/news/categories',
+    'api/sessions',
+    'api/sessions/{id}',
+    'api/wellness/question',
+}
+
+# Sample values of path parameters, by parameter name and, where one name
+# means different things on different routes, by route.
+PARAMETER_VALUES = {
+    'email': control._email,
+    'event_id': control.event_id,
+    'searchString': control.searchString,
+    'secondaryString': control.searchString2,
+    'sess_cde': control.session_code,
+    'session': control.session_code,
+    'sessionCode': control.session_code,
+    'term': control.term_code,
+    'username': control.username,
+}
+ROUTE_PARAMETER_VALUES = {
+    'api/activities/{id}': {'id': control.activity_code_AJG},
+    'api/activities/session/{id}': {'id': control.session_code},
+    'api/activities/session/{id}/types': {'id': control.session_code},
+    'api/activities/{sessionCode}/{id}/status':
+        {'id': control.activity_code_AJG},
+    'api/activities/{id}/open': {'id': control.session_code},
+    'api/activities/{id}/closed': {'id': control.session_code},
+    'api/memberships/student/{id}': {'id': control.my_id_number},
+    'api/memberships/isGroupAdmin/{id}': {'id': control.activity_code_AJG},
+    'api/requests/activity/{id}': {'id': control.activity_code_AJG},
+    'api/sessions/{id}': {'id': control.session_code},
+}
+# Any other {id} under these prefixes is an activity code.
+ACTIVITY_ID_PREFIXES = ('api/emails/activity/', 'api/memberships/activity/')
+
+def cacheableRoutes():
+    """Return every GET route template of the get-route-list.py catalogue.
+
+    Returns:
+        list: sorted templates; empty when the controllers cannot be read,
+        e.g. when the tests were copied out of the repository.
+    """
+    try:
+        catalogue = route_trie.loadCatalogue()
+    except OSError:
+        return []
+    return sorted({route['path'] for route in catalogue
+        if route['method'] == 'GET'})
+
+def routeParameters(conforming):
+    """Parametrize over the cacheable routes, expecting those outside
+    conforming to fail."""
+    expected = pytest.mark.xfail(reason='not yet supported by this route')
+    return [route if route in conforming else
+        pytest.param(route, marks=expected) for route in cacheableRoutes()]
+
+def routeURL(template):
+    """Fill the path parameters of template with sample values.
+
+    Returns:
+        str: the url, or None when a parameter has no sample value.
+    """
+    values = dict(PARAMETER_VALUES)
+    if template.startswith(ACTIVITY_ID_PREFIXES):
+        values['id'] = control.activity_code_AJG
+    values.update(ROUTE_PARAMETER_VALUES.get(template, {}))
+    segments = []
+    for segment in template.split('/'):
+        if segment.startswith('{') and segment.endswith('}'):
+            if segment[1:-1] not in values:
+                return None
+            segment = str(values[segment[1:-1]])
+        segments.append(segment)
+    return control.hostURL + '/'.join(segments)
+
+
+# # # # # # # # # #
+# Measurements    #
+# # # # # # # # # #
+
+# Each route is measured once, by whichever of its tests runs first, and the
+# results are kept here for the report written at the end of the module.
+RESULTS = {}
+
+def fetch(session, url, headers):
+    # Straight through the session, not the pytest_components helpers: these
+    # probes must not count as calls in the latency report, which the
+    # coverage tool and the latency baseline read.
+    start = time.perf_counter()
+    response = session.get(url, headers=headers)
+    elapsed = time.perf_counter() - start
+    return response, wireBytes(response), elapsed
+
+def wireBytes(response):
+    # Bytes of the body as sent, before urllib3 undoes any Content-Encoding.
+    # Replayed responses have no socket behind them, so fall back to the
+    # declared or decoded size.
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        pass
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+def measure(template, sessions):
+    """Fetch template in full and then conditionally, and record what a
+    conditional re-fetch and compression save.
+
+    Args:
+        template (str): the route template.
+        sessions (list): sessions to try in turn, until one is authorized.
+
+    Returns:
+        dict: the measurements, or {'skipped': reason} when the route could
+        not be measured.
+    """
+    if template in RESULTS:
+        return RESULTS[template]
+    url = routeURL(template)
+    if url is None:
+        RESULTS[template] = {'route': template,
+            'skipped': 'No sample value for a parameter of ' + template}
+        return RESULTS[template]
+    for session in sessions:
+        full = [fetch(session, url, {'Accept-Encoding': 'gzip'})
+            for _ in range(SAMPLES)]
+        if full[0][0].status_code not in (401, 403):
+            break
+    response, fullBytes, _ = full[-1]
+    if response.status_code != 200:
+        RESULTS[template] = {'route': template, 'url': url,
+            'skipped': 'GET {0} returned {1}'.format(url,
+                response.status_code)}
+        return RESULTS[template]
+
+    etag = response.headers.get('ETag')
+    lastModified = response.headers.get('Last-Modified')
+    encoding = response.headers.get('Content-Encoding', '')
+    body = response.content
+    result = {
+        'route': template,
+        'url': url,
+        'near_static': template in NEAR_STATIC_ROUTES,
+        'etag': etag is not None,
+        'last_modified': lastModified is not None,
+        'cache_control': response.headers.get('Cache-Control'),
+        'gzip': 'gzip' in encoding.lower(),
+        'body_bytes': len(body),
+        'wire_bytes': fullBytes,
+        'gzip_bytes': len(gzip.compress(body, GZIP_LEVEL)),
+        'full_ms': statistics.median(f[2] for f in full) * 1000,
+        'conditional_status': None,
+    }
+
+    headers = {'Accept-Encoding': 'gzip'}
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    if lastModified is not None:
+        headers['If-Modified-Since'] = lastModified
+    if len(headers) > 1:
+        refetch = [fetch(session, url, headers) for _ in range(SAMPLES)]
+        result['conditional_status'] = refetch[-1][0].status_code
+        result['refetch_bytes'] = refetch[-1][1]
+        result['refetch_ms'] = statistics.median(r[2] for r in refetch) * 1000
+    else:
+        # Without a validator the browser can only fetch the route again.
+        result['refetch_bytes'] = result['wire_bytes']
+        result['refetch_ms'] = result['full_ms']
+    result['saved_bytes'] = result['wire_bytes'] - result['refetch_bytes']
+    result['saved_ms'] = result['full_ms'] - result['refetch_ms']
+    # Bytes downloaded again on every page load that a 304 would avoid, and
+    # bytes compression would have saved on the full fetch.
+    result['wasted_bytes'] = 0 if result['conditional_status'] == 304 \
+        else result['refetch_bytes']
+    result['compressible_bytes'] = 0 if result['gzip'] or \
+        result['body_bytes'] < GZIP_MIN_BYTES else \
+        max(result['wire_bytes'] - result['gzip_bytes'], 0)
+    RESULTS[template] = result
+    return result
+
+
+# # # # # # # # # #
+# Caching Report  #
+# # # # # # # # # #
+
+@pytest.fixture(scope='module', autouse=True)
+def caching_report(request):
+    yield
+    measured = [r for r in RESULTS.values() if 'skipped' not in r]
+    reportPath = request.config.getoption('--caching-report')
+    if not measured:
+        return
+    previous = None
+    if reportPath and os.path.exists(reportPath):
+        try:
+            with open(reportPath) as reportFile:
+                previous = json.load(reportFile)
+        except ValueError:
+            previous = None
+    report = cachingReport(RESULTS.values())
+    if reportPath:
+        with open(reportPath, 'w') as reportFile:
+            json.dump(report, reportFile, indent=1)
+    request.config._cachingReport = (report, previous)
+
+def cachingReport(results):
+    """Summarise the measurements of every route.
+
+    Returns:
+        dict: totals and the per-route results, near-static routes first and
+        then by bytes wasted per page load.
+    """
+    measured = [r for r in results if 'skipped' not in r]
+    routes = sorted(results, key=lambda r: ('skipped' in r,
+        not r.get('near_static'), -r.get('wasted_bytes', 0), r['route']))
+    compressible = [r for r in measured if r['body_bytes'] >= GZIP_MIN_BYTES]
+    return {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'hostURL': control.hostURL,
+        'measured': len(measured),
+        'skipped': len(results) - len(measured),
+        'conditional': sorted(r['route'] for r in measured
+            if r['conditional_status'] == 304),
+        'gzip': sorted(r['route'] for r in compressible if r['gzip']),
+        'compressible': len(compressible),
+        'wasted_bytes': sum(r['wasted_bytes'] for r in measured),
+        'compressible_bytes': sum(r['compressible_bytes'] for r in measured),
+        'routes': routes,
+    }
+
+
+# # # # # # # # # # # # # #
+# CONDITIONAL GET TESTS   #
+# # # # # # # # # # # # # #
+
+class Test_AllCachingTest(control.testCase):
+
+#    Verify that a route hands out a validator and honors it.
+#    Endpoint -- every GET route of get-route-list.py
+#    Expected Status Code -- 200 OK with an ETag or Last-Modified header, then
+#    304 Not Modified when re-fetched with If-None-Match or If-Modified-Since
+    @pytest.mark.parametrize('route', routeParameters(CONDITIONAL_ROUTES))
+    def test_conditional_refetch(self, route, student_session,
+            leader_session):
+        result = measure(route, [student_session, leader_session])
+        if 'skipped' in result:
+            pytest.skip(result['skipped'])
+        assert result['etag'] or result['last_modified'], \
+            'No ETag or Last-Modified header on GET {0}.'.format(result['url'])
+        assert result['conditional_status'] == 304, \
+            'Expected 304 Not Modified for a conditional GET {0}, got {1}.'\
+            .format(result['url'], result['conditional_status'])
+
+#    Verify that a route compresses its body when the client accepts gzip.
+#    Endpoint -- every GET route of get-route-list.py
+#    Expected Status Code -- 200 OK
+#    Expected Response Headers -- Content-Encoding: gzip, for bodies of at
+#    least GZIP_MIN_BYTES
+    @pytest.mark.parametrize('route', routeParameters(GZIP_ROUTES))
+    def test_gzip(self, route, student_session, leader_session):
+        result = measure(route, [student_session, leader_session])
+        if 'skipped' in result:
+            pytest.skip(result['skipped'])
+        if result['body_bytes'] < GZIP_MIN_BYTES:
+            pytest.skip('{0} bytes is too small to be worth compressing.'\
+                .format(result['body_bytes']))
+        assert result['gzip'], 'Expected a gzip body from GET {0} with '\
+            'Accept-Encoding: gzip, got {1} bytes uncompressed.'\
+            .format(result['url'], result['wire_bytes'])
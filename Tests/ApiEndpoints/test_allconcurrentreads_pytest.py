@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+import warnings
+
+import test_gordon360_pytest as control
+
+pytest.importorskip('aiohttp')
+import pytest_components_async as apiAsync
+
+ADVANCED_SEARCH_LOOKUPS = ['majors', 'minors', 'halls', 'states', 'countries',
+    'departments', 'buildings']
+
+class Test_AllConcurrentReadsTest(control.testCase):
+# # # # # # # # # # # # # #
+# CONCURRENT READ TESTS   #
+# # # # # # # # # # # # # #
+
+# Read-only endpoints that do not depend on each other are requested as one
+# concurrent batch instead of one round-trip after another.
+
+#    Verify that a student can get every advanced search lookup list.
+#    Endpoints -- api/advanced-search/{majors, minors, halls, states,
+#    countries, departments, buildings}
+#    Expected Status Code -- 200 OK
+#    Expected Response Body -- A non-empty list for each lookup
+    async def test_get_advanced_search_lookups(self, async_student_session):
+        urls = [control.hostURL + 'api/advanced-search/' + lookup \
+            for lookup in ADVANCED_SEARCH_LOOKUPS]
+        responses = await apiAsync.getMany(async_student_session, urls)
+        for lookup, response in zip(ADVANCED_SEARCH_LOOKUPS, responses):
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK for {0}, got {1}.'\
+                    .format(lookup, response.status_code))
+            try:
+                response.json()
+            except ValueError:
+                pytest.fail('Expected Json response body for {0}, got {1}.'\
+                    .format(lookup, response.text))
+            if not (type(response.json()) is list):
+                pytest.fail('Expected list for {0}, got {1}.'\
+                    .format(lookup, response.text))
+            assert response.json()
+
+#    Verify that a guest can't get the advanced search lookup lists.
+#    Endpoints -- api/advanced-search/{majors, ...}
+#    Expected Status Code -- 401 Unauthorized Error
+#    Expected Response Body -- An authorization denied message
+    async def test_get_guest_advanced_search_lookups(self, async_guest_session):
+        urls = [control.hostURL + 'api/advanced-search/' + lookup \
+            for lookup in ADVANCED_SEARCH_LOOKUPS]
+        responses = await apiAsync.getMany(async_guest_session, urls)
+        for lookup, response in zip(ADVANCED_SEARCH_LOOKUPS, responses):
+            if not response.status_code == 401:
+                pytest.fail('Expected 401 Unauthorized Error for {0}, got {1}.'\
+                    .format(lookup, response.status_code))
+            try:
+                assert response.json()['Message'] == control.AUTHORIZATION_DENIED
+            except ValueError:
+                pytest.fail('Expected Json response body, got {0}.'\
+                    .format(response.text))
+
+#    Verify that the session endpoints agree with each other.
+#    Endpoints -- api/sessions/, api/sessions/current/,
+#    api/sessions/{sessionCode}/, api/sessions/daysLeft/
+#    Expected Status Code -- 200 OK
+#    Expected Response Body -- The current session is in the list of sessions
+    async def test_get_sessions(self, async_student_session):
+        allSessions, current, oneSession, daysLeft = await asyncio.gather(
+            apiAsync.get(async_student_session,
+                control.hostURL + 'api/sessions/'),
+            apiAsync.get(async_student_session,
+                control.hostURL + 'api/sessions/current/'),
+            apiAsync.get(async_student_session,
+                control.hostURL + 'api/sessions/' + control.session_code + '/'),
+            apiAsync.get(async_student_session,
+                control.hostURL + 'api/sessions/daysLeft/'))
+        for response in allSessions, current, oneSession, daysLeft:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK for {0}, got {1}.'\
+                    .format(response.url, response.status_code))
+        sessions = allSessions.json()
+        if not (type(sessions) is list):
+            pytest.fail('Expected list, got {0}.'.format(allSessions.text))
+        assert current.json()["SessionCode"] in \
+            [session["SessionCode"] for session in sessions]
+        assert oneSession.json()["SessionCode"] == control.session_code
+
+#    Verify that a student can read the news feeds.
+#    Endpoints -- api/news/not-expired/, api/news/new/, api/news/categories/
+#    Expected Status Code -- 200 OK
+#    Expected Response Body -- A list for each feed
+    async def test_get_news(self, async_student_session):
+        feeds = ['not-expired', 'new', 'categories']
+        urls = [control.hostURL + 'api/news/' + feed + '/' for feed in feeds]
+        responses = await apiAsync.getMany(async_student_session, urls)
+        for feed, response in zip(feeds, responses):
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK for {0}, got {1}.'\
+                    .format(feed, response.status_code))
+            try:
+                response.json()
+            except ValueError:
+                pytest.fail('Expected Json response body for {0}, got {1}.'\
+                    .format(feed, response.text))
+            if not (type(response.json()) is list):
+                warnings.warn("Response for {0} is not a list.".format(feed))
@@ -5,6 +5,7 @@ from pytest_components import requests
 from datetime import datetime
 
 import pytest_components as api
+import response_schemas as schemas
 import test_gordon360_pytest as control
 
 class Test_AllEventsTest(control.testCase):
@@ -77,18 +78,14 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_events___regular_member(self):
         self.session = self.createAuthorizedSession(control.username, control.password)
         self.url = control.hostURL + 'api/events/25Live/type/10'
-        response = api.get(self.session, self.url)
-
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                response.validate(schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
 
 #    Verify that a user can get all events by multiple type_ID
 #    Endpoint -- api/events/25Live/type/:Event_OR_Type_ID
@@ -97,18 +94,14 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_events_multiple(self):
         self.session = self.createAuthorizedSession(control.username, control.password)
         self.url = control.hostURL + 'api/events/25Live/type/10$11$12$14'
-        response = api.get(self.session, self.url)
-
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                response.validate(schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
 
 #    Verify that a regular member can get all upcoming chapel events 
 #    (category_ID = 85)
@@ -118,17 +111,14 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_claw(self):
         self.session = self.createAuthorizedSession(control.username, control.password)
         self.url = control.hostURL + 'api/events/25Live/CLAW'
-        response = api.get(self.session, self.url)
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                response.validate(schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
 
 #    Verify that a user can get all events in 25Live under predefined 
 #    categories
@@ -138,17 +128,14 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_25Live(self):
         self.session = self.createAuthorizedSession(control.username, control.password)
         self.url = control.hostURL + 'api/events/25Live/All'
-        response = api.get(self.session, self.url)
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                response.validate(schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
 
 #    Verify that a user can get information on specific event on 25Live
 #    Endpoint -- api/events/25Live/:Event_ID (2911 = Chapel)
@@ -158,22 +145,19 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_25Live_by_event_id(self):
         self.session = self.createAuthorizedSession(control.username, control.password)
         self.url = control.hostURL + 'api/events/25Live/2911'
-        response = api.get(self.session, self.url)
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
-        assert response.json()[0]['Organization'] == "Chapel Office"
-        assert response.json()[0]['Event_ID'] == '2911'
-        assert response.json()[0]['Event_Name'] == 'Chapel'
-        assert response.json()[0]['Event_Title'] == 'Chapel: David Kirika'
-        assert response.json()[0]['Event_Type_Name'] == 'Chapel/Worship'
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                first = response.head(1, schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
+        assert first[0]['Organization'] == "Chapel Office"
+        assert first[0]['Event_ID'] == '2911'
+        assert first[0]['Event_Name'] == 'Chapel'
+        assert first[0]['Event_Title'] == 'Chapel: David Kirika'
+        assert first[0]['Event_Type_Name'] == 'Chapel/Worship'
 
 #     Verify that a Guest can only get the public events on 25Live
 #     Endpoint -- api/events/25Live/Public
@@ -182,15 +166,12 @@ class Test_AllEventsTest(control.testCase):
     def test_get_all_public_events(self):
         self.session = self.createGuestSession()
         self.url = control.hostURL + 'api/events/25Live/Public'
-        response = api.get(self.session, self.url)
-        if not response.status_code == 200:
-            pytest.fail('Expect 200 OK, got {0}.'.format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response body, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Expected list, got {0}.'.format(response.json()))
-        for i in range(len(response.json())):
-            assert response.json()[i]['Requirement_Id'] == '3'
\ No newline at end of file
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expect 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                for event in response.items(schemas.checkFor(self.url)):
+                    assert event['Requirement_Id'] == '3'
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
\ No newline at end of file
@@ -0,0 +1,44 @@
+import latency_baseline
+from latency_histogram import LatencyHistogram
+
+ENDPOINT = 'GET api/sessions/current'
+
+def samples(*milliseconds):
+    histogram = LatencyHistogram()
+    for value in milliseconds:
+        histogram.record(value * 1000)
+    return { ENDPOINT: histogram }
+
+
+# # # # # # # # # # # # # #
+# LATENCY GATE TESTS      #
+# # # # # # # # # # # # # #
+
+class Test_AllLatencyBaselineTest:
+
+#    Verify that an endpoint called twice per run fails the gate when its p95
+#    more than doubled, though there are too few samples to test.
+    def test_gate_fails_on_two_sample_regression(self):
+        regressions = latency_baseline.compare(samples(40, 42),
+            samples(120, 125))
+        assert [r.endpoint for r in regressions] == [ENDPOINT]
+        assert regressions[0].pValue is None
+        assert latency_baseline.gateFails(regressions, 'fail')
+        assert not latency_baseline.gateFails(regressions, 'warn')
+
+#    Verify that two samples slower by more than the threshold, but by less
+#    than the small-sample margin, do not fail the gate.
+    def test_gate_passes_on_two_sample_noise(self):
+        regressions = latency_baseline.compare(samples(40, 42),
+            samples(40, 70))
+        assert regressions == []
+        assert not latency_baseline.gateFails(regressions, 'fail')
+
+#    Verify that enough samples are judged by the Mann-Whitney U test at the
+#    usual threshold.
+    def test_gate_fails_on_significant_regression(self):
+        regressions = latency_baseline.compare(samples(40, 41, 42, 43, 44),
+            samples(60, 61, 62, 63, 64))
+        assert [r.endpoint for r in regressions] == [ENDPOINT]
+        assert regressions[0].pValue < latency_baseline.DEFAULT_ALPHA
+        assert latency_baseline.gateFails(regressions, 'fail')
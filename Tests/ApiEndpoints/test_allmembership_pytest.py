@@ -5,6 +5,7 @@ from pytest_components import requests
 from datetime import datetime
 
 import pytest_components as api
+import response_schemas as schemas
 import test_gordon360_pytest as control
 
 class Test_AllMembershipTest(control.testCase):
@@ -20,19 +21,16 @@ class Test_AllMembershipTest(control.testCase):
         self.session = \
             self.createAuthorizedSession(control.leader_username, control.leader_password)
         self.url = control.hostURL + 'api/memberships/'
-        response = api.get(self.session, self.url)
-        if not response.status_code == 200:
-            pytest.fail('Expected 200 OK, got {0}.'\
-                .format(response.status_code))
-        try:
-            response.json()
-        except ValueError:
-            pytest.fail('Expected Json response, got {0}.'\
-                .format(response.text))
-        if not (type(response.json()) is list):
-            pytest.fail('Response was not a list')
-        assert response.json()[0]["ActivityCode"] == control.activity_code_360
-        assert response.json()[0]["ActivityDescription"] == \
+        with api.getStream(self.session, self.url) as response:
+            if not response.status_code == 200:
+                pytest.fail('Expected 200 OK, got {0}.'\
+                    .format(response.status_code))
+            try:
+                first = response.head(1, schemas.checkFor(self.url))
+            except ValueError as e:
+                pytest.fail('Expected Json list, got {0}.'.format(e))
+        assert first[0]["ActivityCode"] == control.activity_code_360
+        assert first[0]["ActivityDescription"] == \
             control.activity_description_360
 
 #    Test retrieving all membership resources as a member
@@ -66,8 +64,7 @@ class Test_AllMembershipTest(control.testCase):
         except ValueError:
             pytest.fail('Expected json response body, got {0}.'\
                 .format(response.text))
-        if "IDNumber" in response.json()[0]:
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a leader can fetch memberships for an activity.
 #    Endpoint -- api/memberships/activity/{activityId}
@@ -89,8 +86,7 @@ class Test_AllMembershipTest(control.testCase):
         if not (type(response.json()) is list):
             pytest.fail('Response was not a list.')
         assert response.json()[0]["ActivityCode"] == control.activity_code_AJG 
-        if "IDNumber" in response.json()[0]:
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a member can fetch memberships for an activity.
 #    Endpoint -- api/memberships/activity/{activityId}
@@ -125,8 +121,7 @@ class Test_AllMembershipTest(control.testCase):
         if not (type(response.json()) is list):
             pytest.fail('Response was not a list.')
         assert response.json()[0]["ActivityCode"] == control.activity_code_AJG 
-        if "IDNumber" in response.json()[0]:
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a regular member can fetch all leaders for a specific activity.
 #    Endpoint -- api/memberships/activity/:id/leaders
@@ -148,8 +143,7 @@ class Test_AllMembershipTest(control.testCase):
                 .format(response.text))
         if not (type(response.json()) is list):
             pytest.fail('Response was not a list.')
-        if "IDNumber" in response.json()[0]:
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a regular member can fetch all advisors for a specific activity.
 #    Endpoint -- api/memberships/activity/:id/advisors
@@ -170,8 +164,7 @@ class Test_AllMembershipTest(control.testCase):
                 .format(response.text))
         if not (type(response.json()) is list):
             pytest.fail('Response was not a list.')
-        if "IDNumber" in response.json()[0]:
-            warnings.warn("Security fault, Gordon ID leak")
+        schemas.validate(response)
 
 #    Verify that a regular member can fetch number of followers for a specific 
 #    activity.
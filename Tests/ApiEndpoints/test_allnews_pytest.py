@@ -5,6 +5,7 @@ from pytest_components import requests
 from datetime import datetime
 
 import pytest_components as api
+import response_schemas as schemas
 import test_gordon360_pytest as control
 
 class Test_AllNewsTest(control.testCase):
@@ -41,10 +42,7 @@ class Test_AllNewsTest(control.testCase):
                 .format(response.status_code))
         if not (type(response.json()) is list):
             warnings.warn("Response is not a list.")
-        if response.json():
-            assert response.json()[0].has_key('categoryName')
-            assert response.json()[0].has_key('ManualExpirationDate')
-            assert response.json()[0].has_key('SortOrder')
+        schemas.validate(response)
 
 #    Verify that a student can get student news entries that have been accepted
 #    and not expired, and is new since 10am the day before.
@@ -94,10 +92,7 @@ class Test_AllNewsTest(control.testCase):
                 .format(response.status_code))
         if not (type(response.json()) is list):
             warnings.warn("Response is not a list.")
-        if response.json():
-            assert response.json()[0].has_key('categoryName')
-            assert response.json()[0].has_key('ManualExpirationDate')
-            assert response.json()[0].has_key('SortOrder')
+        schemas.validate(response)
 
 #    Verify that a faculty user can get student news entries that have been accepted
 #    and not expired, and is new since 10am the day before.
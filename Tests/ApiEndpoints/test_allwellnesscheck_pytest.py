@@ -5,6 +5,7 @@ from pytest_components import requests
 from datetime import datetime
 
 import pytest_components as api
+import response_schemas as schemas
 import test_gordon360_pytest as control
 
 class Test_AllWellnessCheckTest(control.testCase):
@@ -50,9 +51,7 @@ class Test_AllWellnessCheckTest(control.testCase):
                 .format(response.status_code))
         if not (type(response.json()) is list):
             warnings.warn("Response is not a list.")
-        assert response.json()[0].has_key('yesPrompt')
-        assert response.json()[0].has_key('noPrompt')
-        assert response.json()[0].has_key('question')
+        schemas.validate(response)
 
 #    Verify that a student can answer if they are symptomatic (true)
 #    Endpoint -- api/wellness/
@@ -151,9 +150,7 @@ class Test_AllWellnessCheckTest(control.testCase):
                 .format(response.status_code))
         if not (type(response.json()) is list):
             warnings.warn("Response is not a list.")
-        assert response.json()[0].has_key('yesPrompt')
-        assert response.json()[0].has_key('noPrompt')
-        assert response.json()[0].has_key('question')
+        schemas.validate(response)
 
 #    Verify that a faculty user can answer if they are symptomatic (true)
 #    Endpoint -- api/wellness/
@@ -1,4 +1,5 @@
 import pytest
+import os
 import warnings
 import string
 from pytest_components import requests
@@ -66,7 +67,8 @@ FILE_PATH_ID = r'..\..\Gordon360\browseable\profile\Default\ID.png'
 
 # API. Choose only 1. 
 # localhost set up using Visual Studio to enable local testing.
-hostURL = 'https://360ApiTrain.gordon.edu/'
+# GORDON360_HOST_URL overrides it, e.g. to run against gordon_360_standin.py.
+hostURL = os.environ.get('GORDON360_HOST_URL', 'https://360ApiTrain.gordon.edu/')
 # hostURL = 'http://localhost:2477/' 
 
 # Constants
@@ -113,17 +115,9 @@ class testCase:
 
     # Create an authorized session to test authorized calls.
     def createAuthorizedSession(self, userLogin, userPassword):
-        r = requests.post(hostURL+'token', { 'username':userLogin, \
-            'password':userPassword, 'grant_type':'password' })
-        access_token = r.json()["access_token"]
-        authorization_header = "Bearer " + access_token
-        authorized_session = requests.Session()
-        authorized_session.verify = True
-        authorized_session.headers.update({ \
-            "Authorization":authorization_header })
-        return authorized_session
+        # Tokens are shared across the whole run; see api.TokenCache.
+        return api.tokenCache.getSession(hostURL, userLogin, userPassword)
 
     # Create a guest session to test guest calls.
     def createGuestSession(self):
-        authorized_session = requests.Session()
-        return authorized_session
+        return api.getGuestSession()
@@ -3,16 +3,47 @@
 """Prints list of API routes to standard output.
 
 Usage:
-    [python3] get-route-list.py [FILE_LIST]
+    [python3] get-route-list.py [--format text|json|openapi] [--no-cache]
+        [FILE_LIST]
 
-Finds all routes in the API controller source files.  The route type
-('HttpGet', 'HttpPut', etc.) must appear BEFORE the 'Route(...)' statement.
+Finds all routes in the API controller source files.  For the text listing
+the route type ('HttpGet', 'HttpPut', etc.) must appear BEFORE the
+'Route(...)' statement.
+
+--format json prints a catalogue of every route for other tools: HTTP verb,
+full route template, parameters with their C# types, controller file and
+line, and the [Authorize]/[AllowAnonymous]/[StateYourBusiness(...)]
+authorization.  --format openapi prints the same routes as an OpenAPI 3
+paths skeleton.  Both read the attributes of each action in any order and
+skip commented-out code.
 
 FILE_LIST, if supplied, is a whitespace-delimited list of controller file
 paths.  If not supplied then all controller files in Gordon360/ApiControllers/
 directory will be used.
+
+Each file is read once and scanned for all route types in one pass, and the
+routes found are cached in
+.route-list-cache.json keyed by each file's path, modification time and
+size, so unchanged controllers are not parsed again.  --no-cache ignores and
+does not update the cache.
 """
 
+import argparse
+import json
+import os
+import re
+import sys
+
+TAGS = ('HttpGet', 'HttpPut', 'HttpPost', 'HttpDelete')
+CACHE_FILE = '.route-list-cache.json'
+# Bump when the parser changes, so cached results are not reused.
+CACHE_VERSION = 2
+CATALOGUE_VERSION = 1
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_EVENTS = re.compile('|'.join(TAGS + (r'\[Route',)))
+
+
 def findRoutes(controllerFileName, tag="HttpGet"):
     """Returns list of routes matching specified type.
 
@@ -25,16 +56,37 @@ def findRoutes(controllerFileName, tag="HttpGet"):
     """
     with open(controllerFileName, "r") as controllerFile:
         text = controllerFile.read()
+    return findAllRoutes(text)[tag]
+
+def findAllRoutes(text):
+    """Returns the routes of every type in a controller's source, in one pass.
+
+    Each occurrence of a route type is paired with the first '[Route' after
+    it; further occurrences of the same type before that '[Route' are
+    ignored.
+
+    Args:
+        text (str): contents of a controller source file.
+
+    Returns:
+        dict: route type -> list of str, the routes of that type in order.
+    """
     routePrefix = "/" + getRoutePrefix(text)
-    routes = []
-    tagStart = text.find(tag)
-    while tagStart >= 0:
-        routeStart = text.find("[Route", tagStart+1)
-        if routeStart >= 0:
-            routeEnd = text.find("]", routeStart+1)
-            route = getDoubleQuotedText(text[routeStart:routeEnd+1])
-            routes.append(f"      {routePrefix}/{route}")
-        tagStart = text.find(tag, routeStart+1)
+    routes = { tag: [] for tag in TAGS }
+    waiting = set()
+    for match in _EVENTS.finditer(text):
+        event = match.group()
+        if event != '[Route':
+            waiting.add(event)
+            continue
+        if not waiting:
+            continue
+        routeStart = match.start()
+        routeEnd = text.find("]", routeStart+1)
+        route = getDoubleQuotedText(text[routeStart:routeEnd+1])
+        for tag in waiting:
+            routes[tag].append(f"      {routePrefix}/{route}")
+        waiting = set()
     return routes
 
 def getRoutePrefix(text):
@@ -49,22 +101,466 @@ def getDoubleQuotedText(text):
     end = text.find('"', start+1)
     return text[start+1:end]
 
-import os, sys
-if __name__ == "__main__":
-    fileList = sys.argv[1:]
+
+# Route Catalogue
+
+VERB_ATTRIBUTES = { "HttpGet": "GET", "HttpPut": "PUT", "HttpPost": "POST",
+    "HttpDelete": "DELETE", "HttpPatch": "PATCH", "HttpHead": "HEAD",
+    "HttpOptions": "OPTIONS" }
+# Types web api binds from the url rather than the body.
+SIMPLE_TYPES = { "string": ("string", None), "String": ("string", None),
+    "char": ("string", None), "bool": ("boolean", None),
+    "Boolean": ("boolean", None), "int": ("integer", "int32"),
+    "Int32": ("integer", "int32"), "short": ("integer", "int32"),
+    "long": ("integer", "int64"), "Int64": ("integer", "int64"),
+    "double": ("number", "double"), "float": ("number", "float"),
+    "decimal": ("number", None), "DateTime": ("string", "date-time"),
+    "Guid": ("string", "uuid") }
+
+_CODE = re.compile(r'@"(?:""|[^"])*"|"(?:\\.|[^"\\\n])*"'
+    r"|'(?:\\.|[^'\\])'|//[^\n]*|/\*.*?\*/", re.S)
+_ROUTE_PARAMETER = re.compile(r"{\*?(\w+)(?::(\w+))?[^}]*}")
+
+def stripComments(text):
+    """Return text with comments blanked out, keeping line numbers."""
+    def blank(match):
+        code = match.group()
+        if code.startswith("/"):
+            return re.sub(r"[^\n]", " ", code)
+        return code
+    return _CODE.sub(blank, text)
+
+def _skipString(text, i):
+    """Return the index just past the string literal starting at text[i]."""
+    verbatim = text[i] == "@"
+    i += 2 if verbatim else 1
+    while i < len(text):
+        if text[i] == "\\" and not verbatim:
+            i += 2
+        elif text[i] == '"':
+            if verbatim and text[i+1:i+2] == '"':
+                i += 2
+            else:
+                return i + 1
+        else:
+            i += 1
+    return i
+
+def _closing(text, i, opening, closing):
+    """Return the index of the bracket closing the one at text[i]."""
+    depth = 0
+    while i < len(text):
+        c = text[i]
+        if c == '"' or (c == "@" and text[i+1:i+2] == '"'):
+            i = _skipString(text, i)
+            continue
+        if c == opening:
+            depth += 1
+        elif c == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(text)
+
+def _splitTopLevel(text, separator=","):
+    """Split text at separators outside brackets, generics and strings."""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == '"' or (c == "@" and text[i+1:i+2] == '"'):
+            i = _skipString(text, i)
+            continue
+        if c in "([<{":
+            depth += 1
+        elif c in ")]>}":
+            depth -= 1
+        elif c == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+def _literal(value):
+    value = value.strip()
+    if value.startswith('@"'):
+        return value[2:-1].replace('""', '"')
+    if value.startswith('"'):
+        return value[1:-1]
+    # Operation.READ_ALL -> READ_ALL
+    return value.rsplit(".", 1)[-1]
+
+def parseAttributes(body):
+    """Parse the inside of one [...] attribute section.
+
+    Returns:
+        list of (str, list, dict): attribute name, positional arguments and
+        named arguments, with string literals unquoted.
+    """
+    attributes = []
+    for attribute in _splitTopLevel(body):
+        name, _, arguments = attribute.partition("(")
+        name = name.strip().rsplit(".", 1)[-1]
+        if name.endswith("Attribute"):
+            name = name[:-len("Attribute")]
+        positional = []
+        named = {}
+        for argument in _splitTopLevel(arguments.rstrip().rstrip(")")):
+            key, equals, value = argument.partition("=")
+            if equals and re.fullmatch(r"\s*\w+\s*", key):
+                named[key.strip()] = _literal(value)
+            else:
+                positional.append(_literal(argument))
+        attributes.append((name, positional, named))
+    return attributes
+
+def parseParameters(text):
+    """Parse a C# parameter list into [{name, type, source}].
+
+    source is 'body' for [FromBody], 'uri' for [FromUri], else None.
+    """
+    parameters = []
+    for parameter in _splitTopLevel(text):
+        source = None
+        while parameter.startswith("["):
+            end = _closing(parameter, 0, "[", "]")
+            names = [a[0] for a in parseAttributes(parameter[1:end])]
+            if "FromBody" in names:
+                source = "body"
+            elif "FromUri" in names:
+                source = "uri"
+            parameter = parameter[end+1:].strip()
+        parameter = parameter.split("=", 1)[0].strip()
+        words = parameter.split()
+        words = [w for w in words if w not in ("ref", "out", "in", "params",
+            "this")]
+        if len(words) < 2:
+            continue
+        parameters.append({ "name": words[-1], "type": " ".join(words[:-1]),
+            "source": source })
+    return parameters
+
+def _declarations(text):
+    """Yield (attributes, attribute lines, declaration) for every attributed
+    declaration in comment-free C# source."""
+    i = 0
+    while True:
+        i = text.find("[", i)
+        if i < 0:
+            return
+        lineStart = text.rfind("\n", 0, i) + 1
+        if text[lineStart:i].strip():
+            i += 1
+            continue
+        attributes = []
+        lines = []
+        while i < len(text) and text[i] == "[":
+            end = _closing(text, i, "[", "]")
+            line = text.count("\n", 0, i) + 1
+            for attribute in parseAttributes(text[i+1:end]):
+                attributes.append(attribute)
+                lines.append(line)
+            i = end + 1
+            while i < len(text) and text[i].isspace():
+                i += 1
+        end = i
+        depth = 0
+        while end < len(text):
+            c = text[end]
+            if c == "(":
+                depth += 1
+            elif c == ")":
+                depth -= 1
+            elif c in "{;=" and depth == 0:
+                break
+            end += 1
+        yield attributes, lines, text[i:end]
+        i = end
+
+def _attribute(attributes, name):
+    for attribute in attributes:
+        if attribute[0] == name:
+            return attribute
+    return None
+
+def _verbsOf(attributes, action):
+    verbs = [VERB_ATTRIBUTES[a[0]] for a in attributes \
+        if a[0] in VERB_ATTRIBUTES]
+    for name, positional, _ in attributes:
+        if name == "AcceptVerbs":
+            verbs.extend(verb.upper() for verb in positional)
+    if not verbs:
+        # Like web api: a verb prefix on the action name, otherwise POST.
+        for verb in VERB_ATTRIBUTES.values():
+            if action.upper().startswith(verb):
+                return [verb]
+        return ["POST"]
+    return verbs
+
+def _joinRoute(prefix, template):
+    if template.startswith("~/"):
+        return template[2:]
+    return "/".join(part.strip("/") for part in (prefix, template) \
+        if part.strip("/"))
+
+def catalogueRoutes(text):
+    """Returns every route of a controller's source, from its attributes.
+
+    Args:
+        text (str): contents of a controller source file.
+
+    Returns:
+        list of dict: one entry per verb and route template of each action,
+        in source order, with keys method, path, controller, action, line,
+        parameters, body, authorize and authorization.
+    """
+    text = stripComments(text)
+    routes = []
+    controller = None
+    prefix = ""
+    classAuthorize = False
+    for attributes, lines, declaration in _declarations(text):
+        names = [a[0] for a in attributes]
+        match = re.search(r"\bclass\s+(\w+)", declaration)
+        if match:
+            controller = match.group(1)
+            routePrefix = _attribute(attributes, "RoutePrefix")
+            prefix = routePrefix[1][0] if routePrefix and routePrefix[1] \
+                else ""
+            classAuthorize = "Authorize" in names
+            continue
+        match = re.search(r"(\w+)\s*(?:<[^()]*>)?\s*\((.*)\)\s*$",
+            declaration, re.S)
+        if not match or "Route" not in names:
+            continue
+        action = match.group(1)
+        parameters = parseParameters(match.group(2))
+        if "AllowAnonymous" in names:
+            authorize = False
+        else:
+            authorize = classAuthorize or "Authorize" in names
+        business = _attribute(attributes, "StateYourBusiness")
+        authorization = None
+        if business:
+            authorization = { "operation": business[2].get("operation"),
+                "resource": business[2].get("resource") }
+        for (name, positional, named), line in zip(attributes, lines):
+            if name != "Route":
+                continue
+            template = positional[0] if positional else \
+                named.get("template", "")
+            path = _joinRoute(prefix, template)
+            constraints = dict(_ROUTE_PARAMETER.findall(path))
+            routeParameters = []
+            body = None
+            for parameter in parameters:
+                entry = { "name": parameter["name"], "type": parameter["type"] }
+                if parameter["name"] in constraints:
+                    entry["in"] = "path"
+                    entry["constraint"] = constraints[parameter["name"]] \
+                        or None
+                elif parameter["source"] == "body" or \
+                        (parameter["source"] is None and \
+                        parameter["type"].rstrip("?") not in SIMPLE_TYPES):
+                    body = entry
+                    continue
+                else:
+                    entry["in"] = "query"
+                routeParameters.append(entry)
+            for parameterName in constraints:
+                if parameterName not in [p["name"] for p in routeParameters]:
+                    routeParameters.append({ "name": parameterName,
+                        "type": constraints[parameterName] or "string",
+                        "in": "path", "constraint":
+                        constraints[parameterName] or None })
+            for verb in _verbsOf(attributes, action):
+                routes.append({
+                    "method": verb,
+                    "path": path,
+                    "controller": controller,
+                    "action": action,
+                    "line": line,
+                    "parameters": routeParameters,
+                    "body": body,
+                    "authorize": authorize,
+                    "authorization": authorization,
+                })
+    return routes
+
+def _schema(csharpType):
+    csharpType = csharpType.rstrip("?")
+    if csharpType in SIMPLE_TYPES:
+        kind, format = SIMPLE_TYPES[csharpType]
+        return { "type": kind, "format": format } if format else \
+            { "type": kind }
+    if csharpType.endswith("[]") or re.match(r"(I?List|IEnumerable)<",
+            csharpType):
+        return { "type": "array", "items": {}, "x-csharp-type": csharpType }
+    return { "type": "object", "x-csharp-type": csharpType }
+
+def openApi(routes):
+    """Returns an OpenAPI 3 document with one operation per route."""
+    paths = {}
+    for route in routes:
+        path = "/" + re.sub(r"{\*?(\w+)[^}]*}", r"{\1}", route["path"])
+        operation = {
+            "operationId": "{0}.{1}".format(route["controller"],
+                route["action"]),
+            "tags": [re.sub("Controller$", "", route["controller"] or "")],
+            "parameters": [{ "name": p["name"], "in": p["in"],
+                "required": p["in"] == "path", "schema": _schema(p["type"]) } \
+                for p in route["parameters"]],
+            "responses": { "200": { "description": "OK" } },
+            "security": [{ "bearer": [] }] if route["authorize"] else [],
+            "x-source": "{0}:{1}".format(route["file"], route["line"]),
+        }
+        if route["body"]:
+            operation["requestBody"] = { "content": { "application/json": {
+                "schema": _schema(route["body"]["type"]) } } }
+        if route["authorization"]:
+            operation["x-state-your-business"] = route["authorization"]
+        operations = paths.setdefault(path, {})
+        # Two actions on one verb and path are ambiguous in web api too;
+        # keep the first, as a skeleton only needs one.
+        operations.setdefault(route["method"].lower(), operation)
+    return {
+        "openapi": "3.0.3",
+        "info": { "title": "Gordon 360 API", "version": "1.0" },
+        "paths": dict(sorted(paths.items())),
+        "components": { "securitySchemes": {
+            "bearer": { "type": "http", "scheme": "bearer" } } },
+    }
+
+
+# Cache
+
+def loadCache(cachePath):
+    """Return the cached parse results, or {} if there are none."""
+    try:
+        with open(cachePath, "r") as cacheFile:
+            cache = json.load(cacheFile)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+def saveCache(cachePath, files):
+    """Atomically write the parse results to the cache file."""
+    temporaryPath = f"{cachePath}.{os.getpid()}.tmp"
+    try:
+        with open(temporaryPath, "w") as cacheFile:
+            json.dump({ "version": CACHE_VERSION, "files": files }, cacheFile)
+        os.replace(temporaryPath, cachePath)
+    except OSError:
+        # A read-only checkout still gets its routes, just not cached.
+        pass
+
+def fileSignature(fileName):
+    status = os.stat(fileName)
+    return [status.st_mtime_ns, status.st_size]
+
+def parseFile(fileName):
+    with open(fileName, "r") as controllerFile:
+        text = controllerFile.read()
+    return { "routes": findAllRoutes(text), "catalogue": catalogueRoutes(text) }
+
+def parseFiles(fileList, cachePath=None):
+    """Returns the routes of each file, parsing only files not in the cache.
+
+    Args:
+        fileList (list of str): controller file paths.
+        cachePath (str): cache file to read and update, or None for none.
+
+    Returns:
+        dict: file path -> {"routes": route type -> list of routes,
+            "catalogue": catalogueRoutes() of the file}.
+    """
+    cache = loadCache(cachePath) if cachePath else {}
+    results = {}
+    stale = []
+    for fileName in fileList:
+        key = os.path.abspath(fileName)
+        entry = cache.get(key)
+        signature = fileSignature(fileName)
+        if entry is not None and entry["signature"] == signature:
+            results[fileName] = entry["parsed"]
+        else:
+            stale.append((fileName, key, signature))
+    # Parsing is cpu-bound and takes a few ms for all controllers, so it is
+    # done serially: a thread pool only adds its startup cost under the GIL.
+    for fileName, key, signature in stale:
+        parsed = results[fileName] = parseFile(fileName)
+        cache[key] = { "signature": signature, "parsed": parsed }
+    if stale and cachePath:
+        saveCache(cachePath, cache)
+    return results
+
+def routeCatalogue(fileList=None, cachePath=None):
+    """Returns the catalogue of every route in the controller files.
+
+    Args:
+        fileList (list of str): controller files, by default all of them.
+        cachePath (str): parse cache to use, or None for none.
+
+    Returns:
+        list of dict: catalogueRoutes() entries with a "file" key added,
+        relative to the repository root.
+    """
+    if not fileList:
+        fileList = controllerFiles()
+    parsed = parseFiles(fileList, cachePath)
+    return [dict(route, file=os.path.relpath(os.path.abspath(fileName),
+        REPO_ROOT).replace(os.sep, "/")) for fileName in fileList \
+        for route in parsed[fileName]["catalogue"]]
+
+def controllerFiles(controllerDir=None):
+    """Returns the paths of all controller files, sorted."""
+    if controllerDir is None:
+        controllerDir = os.path.join(REPO_ROOT, "Gordon360", "ApiControllers")
+    return [os.path.join(controllerDir, f) \
+        for f in sorted(os.listdir(controllerDir))]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Prints list of API routes to standard output.")
+    parser.add_argument("files", nargs="*", metavar="FILE_LIST",
+        help="controller files (default: all in Gordon360/ApiControllers/)")
+    parser.add_argument("--format", choices=["text", "json", "openapi"],
+        default="text", help="output format (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+        help=f"neither read nor update {CACHE_FILE}")
+    args = parser.parse_args()
+
+    fileList = args.files
     if len(fileList) == 0:
         controllerDir = "Gordon360/ApiControllers/"
         dirList = os.listdir(controllerDir)
         dirList.sort()
         fileList = [f"{controllerDir}{f}" for f in dirList]
+    cachePath = None if args.no_cache else os.path.join(REPO_ROOT, CACHE_FILE)
+    if args.format != "text":
+        routes = routeCatalogue(fileList, cachePath)
+        if args.format == "json":
+            document = { "version": CATALOGUE_VERSION, "routes": routes }
+        else:
+            document = openApi(routes)
+        print(json.dumps(document, indent=1))
+        return
+    parsed = parseFiles(fileList, cachePath)
+    lines = []
     for controllerFileName in fileList:
-        #print(f"\x1b[31m\x1b[1m{os.path.basename(controllerFileName)}\x1b[0m")
-        print(os.path.basename(controllerFileName))
-        for tag in 'HttpGet', 'HttpPut', 'HttpPost', 'HttpDelete':
-            routes = findRoutes(controllerFileName, tag=tag)
+        lines.append(os.path.basename(controllerFileName))
+        for tag in TAGS:
+            routes = parsed[controllerFileName]["routes"][tag]
             if len(routes) > 0:
-                #print(f"\x1b[32m    {tag}\x1b[0m")
-                print(f"    {tag}")
-                for route in routes:
-                    print(route)
+                lines.append(f"    {tag}")
+                lines.extend(routes)
+    print("\n".join(lines))
 
+if __name__ == "__main__":
+    main()